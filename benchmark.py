@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from fractions import Fraction
+
+import wagerbot
+from metrics import QueryProfiler
+from standins import FakeChannel, FakeGuild, FakeInteraction, FakeMember
+
+# Headless benchmarks
+# Drives the wager modal, bet resolution and /stopsession against a throwaway
+# database, with the stand-ins from standins.py in place of the Discord
+# objects those handlers touch. Nothing connects to Discord. Results are
+# printed as JSON so runs can be diffed or checked in CI:
+#
+#     python benchmark.py --users 200 --bets 20 --wagers 5000 --concurrency 16
+
+def percentile(samples, q):
+    """Exact q-quantile of already sorted samples (nearest rank)."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))]
+
+class Phase:
+    """Latencies plus query and commit deltas for one benchmarked operation."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._queries = 0
+        self._commits = 0
+
+    def __enter__(self):
+        self._queries = wagerbot.db.profiler.queries
+        self._commits = wagerbot.db.commits
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        self.queries = wagerbot.db.profiler.queries - self._queries
+        self.commits = wagerbot.db.commits - self._commits
+
+    async def timed(self, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    def report(self):
+        samples = sorted(self.latencies)
+        ops = len(samples)
+        return {
+            "operations": ops,
+            "errors": self.errors,
+            "seconds": round(self.elapsed, 4),
+            "throughput_per_second": round(ops / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+            "queries": self.queries,
+            "queries_per_op": round(self.queries / ops, 2) if ops else 0.0,
+            "commits": self.commits,
+            "commits_per_op": round(self.commits / ops, 3) if ops else 0.0,
+        }
+
+async def run_concurrently(jobs, concurrency):
+    """Await zero-argument coroutine factories with at most `concurrency` in flight."""
+    jobs = iter(jobs)
+
+    async def worker():
+        for job in jobs:
+            await job()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def bench_wagers(bets, members, guild, channel, wagers, concurrency, rng):
+    """Submit `wagers` WagerModals spread across random members, bets and options."""
+    phase = Phase("wager")
+
+    async def submit(member, bet, option_id, label, amount):
+        modal = wagerbot.WagerModal(label, bet.bet_id, is_fun_bet=bet.bet_type == "funbet", option_id=option_id)
+        modal.amount.refresh_state({"value": str(amount)}, None, None)
+        interaction = FakeInteraction(member, guild, channel)
+        await phase.timed(modal.callback(interaction))
+        modal.stop()
+        if not any("Successfully" in str(message) for message in interaction.response.messages):
+            phase.errors += 1
+
+    def jobs():
+        for _ in range(wagers):
+            bet = rng.choice(bets)
+            option_id, label, _ = rng.choice(bet.options)
+            member = rng.choice(members)
+            amount = rng.randint(1, 20)
+            yield lambda m=member, b=bet, o=option_id, l=label, a=amount: submit(m, b, o, l, a)
+
+    with phase:
+        await run_concurrently(jobs(), concurrency)
+    return phase
+
+async def bench_resolve(bets, guild, channel, members, rng):
+    """Resolve every bet through resolve_bet_and_payout, one after another like an admin would."""
+    phase = Phase("resolve")
+    with phase:
+        for bet in bets:
+            winning_option_id = rng.choice(bet.options)[0]
+            interaction = FakeInteraction(members[0], guild, channel)
+            try:
+                await phase.timed(wagerbot.resolve_bet_and_payout(interaction, bet.bet_id, winning_option_id))
+            except wagerbot.SettlementError:
+                phase.errors += 1
+    return phase
+
+async def bench_stopsession(guild, channel, member):
+    """Close the session through the /stopsession handler."""
+    phase = Phase("stopsession")
+    interaction = FakeInteraction(member, guild, channel)
+    with phase:
+        await phase.timed(wagerbot.stopsession.callback(interaction))
+    if not interaction.followup.messages or isinstance(interaction.followup.messages[0], str):
+        phase.errors += 1
+    return phase
+
+def merge_phases(name, phases):
+    merged = Phase(name)
+    merged.queries = merged.commits = 0
+    for phase in phases:
+        merged.latencies.extend(phase.latencies)
+        merged.errors += phase.errors
+        merged.elapsed += phase.elapsed
+        merged.queries += phase.queries
+        merged.commits += phase.commits
+    return merged
+
+async def run_benchmark(users, bets, wagers, rounds=1, concurrency=8, options=2, fun_bets=0.0, pool_bets=0.0, seed=1):
+    """Run `rounds` sessions of setup, wagering, resolution and session close. Returns the report dict."""
+    rng = random.Random(seed)
+    members = [FakeMember(100000 + idx, f"Bench User {idx}") for idx in range(users)]
+    guild = FakeGuild(1, members)
+    channel = FakeChannel()
+
+    await wagerbot.init_db_manager()
+    results = {"wager": [], "resolve": [], "stopsession": []}
+    try:
+        for _ in range(rounds):
+            session_id, _ = await wagerbot.open_session()
+            round_bets = []
+            for idx in range(bets):
+                draw = rng.random()
+                bet_type = "funbet" if draw < fun_bets else "pool" if draw < fun_bets + pool_bets else "moneyline"
+                round_bets.append(await wagerbot.create_bet(
+                    None if bet_type == "funbet" else session_id, guild.id, f"Bench bet {idx}", "benchmark", bet_type,
+                    [(f"Option {opt}", Fraction(options), None) for opt in range(options)],
+                    pool_rake_bp=None if bet_type == "moneyline" else wagerbot.POOL_RAKE_BP
+                ))
+
+            results["wager"].append(await bench_wagers(round_bets, members, guild, channel, wagers, concurrency, rng))
+            results["resolve"].append(await bench_resolve(round_bets, guild, channel, members, rng))
+            results["stopsession"].append(await bench_stopsession(guild, channel, members[0]))
+
+        queue_metrics = wagerbot.notification_queue.metrics()
+        top = wagerbot.db.profiler.top(10)
+    finally:
+        wagerbot.notification_digest.flush_all()
+        await wagerbot.notification_queue.close(timeout=0)
+        await wagerbot.bet_message_updater.close(timeout=0)
+        await wagerbot.close_db_manager()
+
+    return {
+        "parameters": {
+            "users": users,
+            "bets": bets,
+            "wagers": wagers,
+            "rounds": rounds,
+            "concurrency": concurrency,
+            "options": options,
+            "fun_bets": fun_bets,
+            "pool_bets": pool_bets,
+            "seed": seed,
+            "group_commit": os.getenv("DB_GROUP_COMMIT", "0"),
+            "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+        },
+        "operations": {name: merge_phases(name, phases).report() for name, phases in results.items()},
+        "dms_queued": queue_metrics["enqueued"] + queue_metrics["coalesced"],
+        "top_statements": top,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the wager, resolve and session-close paths without Discord.")
+    parser.add_argument("--users", type=int, default=100, help="simulated members (N)")
+    parser.add_argument("--bets", type=int, default=10, help="bets per session (M)")
+    parser.add_argument("--wagers", type=int, default=1000, help="wagers per session (K)")
+    parser.add_argument("--rounds", type=int, default=1, help="sessions to run back to back")
+    parser.add_argument("--concurrency", type=int, default=8, help="wager submissions in flight at once")
+    parser.add_argument("--options", type=int, default=2, help="options per bet")
+    parser.add_argument("--fun-bets", type=float, default=0.0, help="fraction of bets that are wallet fun bets")
+    parser.add_argument("--pool-bets", type=float, default=0.0, help="fraction of bets that are session pool bets")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="database file to use instead of a temporary one (will be modified)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Every statement is counted; nothing is slow enough to be logged
+    wagerbot.query_profiler = QueryProfiler(slow_ms=float("inf"))
+
+    with tempfile.TemporaryDirectory(prefix="wagerbot-bench-") as tmp:
+        wagerbot.DB_FILE = args.db or os.path.join(tmp, "wagerbot.db")
+        report = asyncio.run(run_benchmark(
+            args.users, args.bets, args.wagers, rounds=args.rounds, concurrency=max(1, args.concurrency),
+            options=max(2, args.options), fun_bets=args.fun_bets, pool_bets=args.pool_bets, seed=args.seed
+        ))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
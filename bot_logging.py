@@ -0,0 +1,125 @@
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+# Logging setup
+# Every module logs through the standard logging package under the
+# "wagerbot" logger. Records are handed to a QueueHandler, so the event loop
+# only pays for an enqueue; a listener thread formats them and does the
+# blocking write. Messages use %-style arguments so records below the
+# configured level are never formatted at all.
+
+# Structured fields that can be attached with extra=log_fields(...)
+CONTEXT_FIELDS = ("interaction_id", "user_id", "bet_id", "duration_ms")
+
+log = logging.getLogger("wagerbot")
+
+_listener = None
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line with the context fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """The bot's original "[timestamp] message" console format, plus any context fields."""
+
+    def __init__(self):
+        super().__init__("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        context = " ".join(
+            f"{field}={getattr(record, field)}"
+            for field in CONTEXT_FIELDS
+            if getattr(record, field, None) is not None
+        )
+        return f"{text} ({context})" if context else text
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves tracebacks for the writer thread's formatter.
+
+    The stock prepare() folds the traceback into the message, which would
+    bury it inside "msg" in the JSON output.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        # Arguments may change after the call returns, so resolve them now
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def setup_logging(level=None, log_format=None, path=None):
+    """Route "wagerbot" logs through a queue to a background writer thread.
+
+    Defaults come from LOG_LEVEL (INFO), LOG_FORMAT ("json" or "text",
+    default json) and LOG_FILE (stdout when unset). Safe to call twice.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    log_format = (log_format or os.getenv("LOG_FORMAT", "json")).lower()
+    path = path if path is not None else os.getenv("LOG_FILE")
+
+    if path:
+        handler = logging.FileHandler(path, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(TextFormatter() if log_format == "text" else JsonLinesFormatter())
+
+    records = queue.SimpleQueue()
+    log.addHandler(RecordQueueHandler(records))
+    log.setLevel(getattr(logging, level, logging.INFO))
+    log.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+def log_fields(interaction=None, user_id=None, bet_id=None, duration_ms=None):
+    """Build the extra= mapping for a log call.
+
+    user_id defaults to the Discord id of the interaction's user.
+    """
+    fields = {}
+    if interaction is not None:
+        fields["interaction_id"] = getattr(interaction, "id", None)
+        if user_id is None:
+            user = getattr(interaction, "user", None)
+            fields["user_id"] = getattr(user, "id", None)
+    if user_id is not None:
+        fields["user_id"] = user_id
+    if bet_id is not None:
+        fields["bet_id"] = bet_id
+    if duration_ms is not None:
+        fields["duration_ms"] = round(duration_ms, 3)
+    return fields
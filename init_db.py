@@ -1,125 +1,288 @@
 import os
+import logging
 import aiosqlite
 import asyncio
-from datetime import datetime
+from bot_logging import setup_logging, shutdown_logging
+from odds import OddsError, american_to_decimal, parse_american
+
+log = logging.getLogger("wagerbot.db")
 
 DB_FILE = "wagerbot.db"
 
+# Schema migrations
+# Each migration is (version, name, coroutine taking an open connection).
+# Versions are applied in order, exactly once, and recorded in schema_migrations.
+# Never edit a migration that has shipped - add a new one instead.
+
+async def _migration_baseline_schema(db):
+    """Create the original tables and add the american_odds column to old databases."""
+    # Users table
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        discord_id TEXT,
+        username TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Sessions table
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        description TEXT,
+        created_at DATETIME,
+        is_active INTEGER DEFAULT 0
+    )
+    ''')
+
+    # Bankroll table - adding from_wallet column
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS bankroll (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        session_id INTEGER,
+        balance INTEGER DEFAULT 1000,
+        from_wallet INTEGER DEFAULT 0,
+        UNIQUE(user_id, session_id)
+    )
+    ''')
+
+    # Wallet table
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS wallet (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER UNIQUE,
+        balance INTEGER DEFAULT 1000
+    )
+    ''')
+
+    # Bet table - ensure bet_type support for fun bets
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS bet (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER NULL,    -- NULL allowed for fun bets
+        name TEXT,
+        description TEXT,
+        bet_type TEXT DEFAULT 'moneyline',  -- 'moneyline', 'funbet', etc.
+        is_resolved INTEGER DEFAULT 0
+    )
+    ''')
+
+    # Bet options table - now includes american_odds column
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS bet_options (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        prop_id INTEGER,
+        label TEXT,
+        odds INTEGER DEFAULT 100,
+        is_winner INTEGER DEFAULT 0,
+        american_odds TEXT         -- New column for storing American-style odds format (+150, -120, etc.)
+    )
+    ''')
+
+    # Wagers table - session_id can be NULL for fun bets
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS wagers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        session_id INTEGER NULL,    -- NULL allowed for fun bets
+        prop_id INTEGER,
+        prop_option_id INTEGER,
+        amount INTEGER,
+        odds INTEGER,
+        result TEXT,
+        payout INTEGER,
+        from_wallet INTEGER DEFAULT 0
+    )
+    ''')
+
+    # Databases created before american_odds existed need the column added
+    cursor = await db.execute("PRAGMA table_info(bet_options)")
+    column_names = [column[1] for column in await cursor.fetchall()]
+    if 'american_odds' not in column_names:
+        await db.execute("ALTER TABLE bet_options ADD COLUMN american_odds TEXT")
+
+async def _migration_hot_path_indexes(db):
+    """Index the columns used by wager placement, resolution and leaderboards."""
+    # Concurrent first interactions could create the same discord_id twice.
+    # Fold duplicates into the oldest row so the UNIQUE index can be built.
+    await db.execute('''
+    CREATE TEMP TABLE user_remap AS
+    SELECT u.id AS old_id, k.keep_id
+    FROM users u
+    JOIN (
+        SELECT discord_id, MIN(id) AS keep_id
+        FROM users
+        GROUP BY discord_id
+        HAVING COUNT(*) > 1
+    ) k ON u.discord_id = k.discord_id
+    WHERE u.id <> k.keep_id
+    ''')
+    await db.execute('''
+    UPDATE wagers
+    SET user_id = (SELECT keep_id FROM user_remap WHERE old_id = wagers.user_id)
+    WHERE user_id IN (SELECT old_id FROM user_remap)
+    ''')
+    # Balances are unique per user (and session), so the duplicates' rows are
+    # added into the kept user's row rather than moved onto it
+    await db.execute('''
+    INSERT INTO wallet (user_id, balance)
+    SELECT r.keep_id, SUM(w.balance)
+    FROM wallet w
+    JOIN user_remap r ON r.old_id = w.user_id
+    GROUP BY r.keep_id
+    ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance
+    ''')
+    await db.execute('''
+    INSERT INTO bankroll (user_id, session_id, balance, from_wallet)
+    SELECT r.keep_id, b.session_id, SUM(b.balance), MAX(b.from_wallet)
+    FROM bankroll b
+    JOIN user_remap r ON r.old_id = b.user_id
+    GROUP BY r.keep_id, b.session_id
+    ON CONFLICT(user_id, session_id) DO UPDATE SET
+        balance = balance + excluded.balance,
+        from_wallet = MAX(from_wallet, excluded.from_wallet)
+    ''')
+    for table in ("bankroll", "wallet"):
+        await db.execute(f"DELETE FROM {table} WHERE user_id IN (SELECT old_id FROM user_remap)")
+    await db.execute("DELETE FROM users WHERE id IN (SELECT old_id FROM user_remap)")
+    await db.execute("DROP TABLE user_remap")
+
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_wagers_prop ON wagers(prop_id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_wagers_user_result ON wagers(user_id, result)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_wagers_session_wallet ON wagers(session_id, from_wallet)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_bet_options_prop_label ON bet_options(prop_id, label)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_bankroll_session_balance ON bankroll(session_id, balance)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_active ON sessions(is_active)")
+    await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_discord_id ON users(discord_id)")
+
+async def _migration_bet_guild_scope(db):
+    """Record which guild a bet was created in so lookups can be scoped to it."""
+    # Existing bets keep guild_id NULL and stay visible everywhere
+    await db.execute("ALTER TABLE bet ADD COLUMN guild_id TEXT")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_bet_open ON bet(is_resolved)")
+
+async def _migration_dm_digest(db):
+    """Let users opt into one combined DM for results that land close together."""
+    await db.execute("ALTER TABLE users ADD COLUMN dm_digest INTEGER DEFAULT 0")
+
+async def _migration_exact_option_odds(db):
+    """Store each option's payout multiplier as an exact fraction."""
+    # odds keeps the old "multiplier x 100" integer, which truncated -120 to 183
+    await db.execute("ALTER TABLE bet_options ADD COLUMN payout_num INTEGER")
+    await db.execute("ALTER TABLE bet_options ADD COLUMN payout_den INTEGER")
+
+    cursor = await db.execute("SELECT id, odds, american_odds FROM bet_options")
+    updates = []
+    for option_id, odds, american_odds in await cursor.fetchall():
+        try:
+            multiplier = american_to_decimal(parse_american(american_odds)) if american_odds else None
+        except OddsError:
+            multiplier = None
+        if multiplier is None:
+            updates.append((odds if odds is not None else 100, 100, option_id))
+        else:
+            updates.append((multiplier.numerator, multiplier.denominator, option_id))
+    await db.executemany("UPDATE bet_options SET payout_num = ?, payout_den = ? WHERE id = ?", updates)
+
+async def _migration_parimutuel_pools(db):
+    """Parimutuel bets: per-bet rake and running per-option pool totals."""
+    # pool_rake_bp is the house cut in basis points; NULL marks a fixed-odds bet
+    await db.execute("ALTER TABLE bet ADD COLUMN pool_rake_bp INTEGER")
+    await db.execute("ALTER TABLE bet_options ADD COLUMN pool_total INTEGER NOT NULL DEFAULT 0")
+    await db.execute("ALTER TABLE bet_options ADD COLUMN pool_wagers INTEGER NOT NULL DEFAULT 0")
+    await db.execute('''
+    UPDATE bet_options
+    SET pool_total = staked.total, pool_wagers = staked.wagers
+    FROM (
+        SELECT prop_option_id, SUM(amount) AS total, COUNT(*) AS wagers
+        FROM wagers
+        GROUP BY prop_option_id
+    ) AS staked
+    WHERE bet_options.id = staked.prop_option_id
+    ''')
+
+async def _migration_bet_messages(db):
+    """Remember where each bet was posted so its message can show live totals."""
+    await db.execute("ALTER TABLE bet ADD COLUMN channel_id TEXT")
+    await db.execute("ALTER TABLE bet ADD COLUMN message_id TEXT")
+
+MIGRATIONS = [
+    (1, "baseline schema", _migration_baseline_schema),
+    (2, "hot-path indexes", _migration_hot_path_indexes),
+    (3, "bet guild scope", _migration_bet_guild_scope),
+    (4, "dm digest preference", _migration_dm_digest),
+    (5, "exact option odds", _migration_exact_option_odds),
+    (6, "parimutuel pools", _migration_parimutuel_pools),
+    (7, "bet messages", _migration_bet_messages),
+]
+
+async def run_migrations(db):
+    """Apply every pending migration to an open aiosqlite connection.
+
+    Each migration runs in its own transaction together with the row that
+    records it, so a failed migration leaves the schema at the previous version.
+    Returns the list of versions applied by this call.
+    """
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    await db.commit()
+
+    cursor = await db.execute("SELECT version FROM schema_migrations")
+    applied_versions = {row[0] for row in await cursor.fetchall()}
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied_versions:
+            continue
+
+        log.info("[🔄] Applying migration %s: %s...", version, name)
+        await db.execute("BEGIN")
+        try:
+            await migrate(db)
+            await db.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                (version, name)
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            log.error("[❌] Migration %s failed, rolled back", version)
+            raise
+        applied.append(version)
+
+    if applied:
+        log.info("[✅] Schema is now at version %s", applied[-1])
+    return applied
+
 async def init_database():
-    """Initialize the SQLite database with necessary tables if the file doesn't exist."""
-    
-    # Check if database file already exists
-    if os.path.exists(DB_FILE):
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [💾] Database file already exists, skipping initialization.")
-        
-        # If database exists, check if we need to add the american_odds column
-        async with aiosqlite.connect(DB_FILE) as db:
-            # Check if american_odds column exists
-            cursor = await db.execute("PRAGMA table_info(bet_options)")
-            columns = await cursor.fetchall()
-            column_names = [column[1] for column in columns]
-            
-            if 'american_odds' not in column_names:
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [🔄] Adding american_odds column to bet_options table...")
-                await db.execute("ALTER TABLE bet_options ADD COLUMN american_odds TEXT")
-                await db.commit()
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [✅] american_odds column added successfully!")
-        
-        return False
-    
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [💾] Initializing new database...")
-    
-    # Create new database with all required tables
+    """Create the database if needed and bring its schema up to date.
+
+    Returns True if a new database file was created.
+    """
+    is_new = not os.path.exists(DB_FILE)
+    if is_new:
+        log.info("[💾] Initializing new database...")
+    else:
+        log.info("[💾] Database file already exists, checking for pending migrations.")
+
     async with aiosqlite.connect(DB_FILE) as db:
-        # Users table
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            discord_id TEXT,
-            username TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # Sessions table
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            description TEXT,
-            created_at DATETIME,
-            is_active INTEGER DEFAULT 0
-        )
-        ''')
-
-        # Bankroll table - adding from_wallet column
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS bankroll (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            session_id INTEGER,
-            balance INTEGER DEFAULT 1000,
-            from_wallet INTEGER DEFAULT 0,
-            UNIQUE(user_id, session_id)
-        )
-        ''')
-
-        # Wallet table
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS wallet (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER UNIQUE,
-            balance INTEGER DEFAULT 1000
-        )
-        ''')
-
-        # Bet table - ensure bet_type support for fun bets
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS bet (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NULL,    -- NULL allowed for fun bets
-            name TEXT,
-            description TEXT,
-            bet_type TEXT DEFAULT 'moneyline',  -- 'moneyline', 'funbet', etc.
-            is_resolved INTEGER DEFAULT 0
-        )
-        ''')
-
-        # Bet options table - now includes american_odds column
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS bet_options (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            prop_id INTEGER,
-            label TEXT,
-            odds INTEGER DEFAULT 100,
-            is_winner INTEGER DEFAULT 0,
-            american_odds TEXT         -- New column for storing American-style odds format (+150, -120, etc.)
-        )
-        ''')
-
-        # Wagers table - session_id can be NULL for fun bets
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS wagers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            session_id INTEGER NULL,    -- NULL allowed for fun bets
-            prop_id INTEGER,
-            prop_option_id INTEGER,
-            amount INTEGER,
-            odds INTEGER,
-            result TEXT,
-            payout INTEGER,
-            from_wallet INTEGER DEFAULT 0
-        )
-        ''')
-
-        await db.commit()
-    
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [💾] Database initialization complete!")
-    return True
+        await run_migrations(db)
+
+    log.info("[💾] Database initialization complete!")
+    return is_new
 
 # This allows the file to be run directly if needed
 if __name__ == "__main__":
-    print("Running database initialization directly...")
+    setup_logging(log_format="text")
+    log.info("Running database initialization directly...")
     asyncio.run(init_database())
-    print("Done!")
\ No newline at end of file
+    log.info("Done!")
+    shutdown_logging()
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger("wagerbot.live_messages")
+
+# Debounced message edits
+# Bet messages show running totals that change with every wager. Editing a
+# message per wager would burn through Discord's rate limits during a rush,
+# so wager events only mark the message as out of date here. One background
+# task edits each marked message at most once every `interval` seconds and
+# renders whatever the state is at that moment, so a burst of 100 wagers
+# costs a handful of edits and the last edit always shows the latest totals.
+
+class MessageUpdater:
+    """Coalesces update requests per message into rate-limited edits.
+
+    mark(key, update) records that the message identified by `key` is out of
+    date. `update` is a coroutine function that renders the current state and
+    edits the message; if the key is already waiting, the newer update
+    replaces the older one. The first mark after a quiet period is edited
+    `delay` seconds later so the rest of a burst can join it; after that the
+    key waits until `interval` seconds have passed since its last edit.
+    """
+
+    def __init__(self, interval=5.0, delay=0.5):
+        self.interval = max(0.0, float(interval))
+        self.delay = max(0.0, float(delay))
+
+        self._task = None
+        self._wakeup = None
+        # key -> newest update waiting to run
+        self._pending = {}
+        # key -> loop time the key may be edited again
+        self._due = {}
+        self._closed = False
+
+        self.marked = 0
+        self.coalesced = 0
+        self.edits = 0
+        self.failed = 0
+        self.total_edit_time = 0.0
+
+    def _ensure_task(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="message-updater")
+
+    def mark(self, key, update):
+        """Schedule `update` for the message `key`, replacing any update still waiting for it."""
+        if self._closed:
+            return
+        self._ensure_task()
+        self.marked += 1
+        if key in self._pending:
+            self._pending[key] = update
+            self.coalesced += 1
+            return
+
+        now = asyncio.get_running_loop().time()
+        self._pending[key] = update
+        self._due[key] = max(self._due.get(key, 0.0), now + self.delay)
+        # Forget keys that were edited long enough ago to be due anyway
+        if len(self._due) > 4096:
+            self._due = {k: t for k, t in self._due.items() if t > now or k in self._pending}
+        self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._pending:
+                await self._wakeup.wait()
+                continue
+
+            now = loop.time()
+            next_due = min(self._due[key] for key in self._pending)
+            if next_due > now:
+                # A new key may be due sooner, so wake up on marks as well
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), next_due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for key in [key for key in self._pending if self._due[key] <= now]:
+                update = self._pending.pop(key)
+                self._due[key] = loop.time() + self.interval
+                await self._edit(key, update)
+
+    async def _edit(self, key, update):
+        started = time.monotonic()
+        try:
+            await update()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            log.warning("[⚠️] Failed to update message %s: %s", key, e)
+        else:
+            self.edits += 1
+            self.total_edit_time += time.monotonic() - started
+
+    async def close(self, timeout=5.0):
+        """Run the updates still waiting, ignoring the interval, for up to `timeout` seconds, then stop."""
+        self._closed = True
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+        pending, self._pending = self._pending, {}
+        if pending and timeout > 0:
+            async def flush():
+                for key, update in pending.items():
+                    await self._edit(key, update)
+            try:
+                await asyncio.wait_for(flush(), timeout)
+            except asyncio.TimeoutError:
+                log.info("[✏️] Message updater closed with edits still pending")
+
+    def metrics(self):
+        """Updater counters for diagnostics."""
+        return {
+            "pending": len(self._pending),
+            "marked": self.marked,
+            "coalesced": self.coalesced,
+            "edits": self.edits,
+            "failed": self.failed,
+            "avg_edit_seconds": round(self.total_edit_time / self.edits, 3) if self.edits else 0.0,
+        }
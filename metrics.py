@@ -0,0 +1,293 @@
+import asyncio
+import bisect
+import functools
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+
+log = logging.getLogger("wagerbot.metrics")
+
+# Interaction metrics
+# Every slash command, modal and button handler is timed into a fixed-bucket
+# latency histogram with error and in-flight counts. The numbers are read by
+# /botstats and, when METRICS_PORT is set, served in Prometheus text format
+# on localhost.
+
+# Upper bounds in seconds; Discord fails an interaction that takes 3s to answer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 3.0, 5.0, 10.0)
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf overflow bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Estimate the q-quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for idx, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= target:
+                lower = self.buckets[idx - 1] if idx else 0.0
+                # The overflow bucket has no upper bound; report its lower edge
+                if idx == len(self.buckets):
+                    return lower
+                upper = self.buckets[idx]
+                return lower + (upper - lower) * (target - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+class HandlerStats:
+    """Counters for one instrumented handler."""
+
+    __slots__ = ("histogram", "errors", "in_flight")
+
+    def __init__(self, buckets):
+        self.histogram = Histogram(buckets)
+        self.errors = 0
+        self.in_flight = 0
+
+class MetricsRegistry:
+    """Latency, error and in-flight counts per handler, plus gauges from collectors."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.handlers = {}
+        # name -> callable returning a flat {metric: number} dict
+        self.collectors = {}
+
+    def _stats(self, name):
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = HandlerStats(self.buckets)
+        return stats
+
+    @asynccontextmanager
+    async def track(self, name):
+        """Time the enclosed block as one call of `name`; exceptions count as errors."""
+        stats = self._stats(name)
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield stats
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.histogram.observe(time.perf_counter() - started)
+
+    def instrument(self, name):
+        """Decorator that tracks every call of an async callback under `name`."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                async with self.track(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_error(self, name):
+        """Count an error that the handler's framework caught before track() saw it."""
+        self._stats(name).errors += 1
+
+    def add_collector(self, name, collect):
+        """Export the numeric values of collect() as gauges prefixed with `name`."""
+        self.collectors[name] = collect
+
+    def snapshot(self):
+        """Per-handler summary: calls, errors, in flight and p50/p95/p99/mean in ms."""
+        summary = {}
+        for name, stats in self.handlers.items():
+            histogram = stats.histogram
+            summary[name] = {
+                "calls": histogram.count,
+                "errors": stats.errors,
+                "in_flight": stats.in_flight,
+                "p50_ms": round(histogram.quantile(0.50) * 1000, 1),
+                "p95_ms": round(histogram.quantile(0.95) * 1000, 1),
+                "p99_ms": round(histogram.quantile(0.99) * 1000, 1),
+                "mean_ms": round(histogram.total / histogram.count * 1000, 1) if histogram.count else 0.0,
+            }
+        return summary
+
+    def collect_gauges(self):
+        """Current gauge values from every collector, as {metric name: value}."""
+        gauges = {}
+        for prefix, collect in self.collectors.items():
+            try:
+                values = collect()
+            except Exception:
+                log.exception("Metrics collector %s failed", prefix)
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{prefix}_{key}"] = value
+        return gauges
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP wagerbot_handler_duration_seconds Time spent in interaction handlers.",
+            "# TYPE wagerbot_handler_duration_seconds histogram",
+        ]
+        for name, stats in sorted(self.handlers.items()):
+            label = escape_label(name)
+            histogram = stats.histogram
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'wagerbot_handler_duration_seconds_bucket{{handler="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'wagerbot_handler_duration_seconds_bucket{{handler="{label}",le="+Inf"}} {histogram.count}')
+            lines.append(f'wagerbot_handler_duration_seconds_sum{{handler="{label}"}} {histogram.total:.6f}')
+            lines.append(f'wagerbot_handler_duration_seconds_count{{handler="{label}"}} {histogram.count}')
+
+        lines.append("# HELP wagerbot_handler_errors_total Interaction handlers that raised.")
+        lines.append("# TYPE wagerbot_handler_errors_total counter")
+        for name, stats in sorted(self.handlers.items()):
+            lines.append(f'wagerbot_handler_errors_total{{handler="{escape_label(name)}"}} {stats.errors}')
+
+        lines.append("# HELP wagerbot_handler_in_flight Interaction handlers currently running.")
+        lines.append("# TYPE wagerbot_handler_in_flight gauge")
+        for name, stats in sorted(self.handlers.items()):
+            lines.append(f'wagerbot_handler_in_flight{{handler="{escape_label(name)}"}} {stats.in_flight}')
+
+        for metric, value in sorted(self.collect_gauges().items()):
+            lines.append(f"# TYPE wagerbot_{metric} gauge")
+            lines.append(f"wagerbot_{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+# SQL statements are much faster than handlers, so they get finer buckets
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SQL_SPACE = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(query):
+    """Reduce a statement to its shape: literals become ?, IN lists collapse, whitespace is squeezed."""
+    query = _SQL_STRING.sub("?", query)
+    query = _SQL_NUMBER.sub("?", query)
+    query = _SQL_IN_LIST.sub("(?...)", query)
+    return _SQL_SPACE.sub(" ", query).strip()
+
+class QueryStats:
+    """Counters for one normalized statement."""
+
+    __slots__ = ("histogram", "slow")
+
+    def __init__(self):
+        self.histogram = Histogram(QUERY_BUCKETS)
+        self.slow = 0
+
+class QueryProfiler:
+    """Count, total time and latency histogram per normalized SQL statement.
+
+    record() returns True when a statement took longer than slow_ms so the
+    caller can log it together with its query plan.
+    """
+
+    SORT_KEYS = {
+        "total": lambda row: row["total_ms"],
+        "count": lambda row: row["count"],
+        "p95": lambda row: row["p95_ms"],
+        "mean": lambda row: row["mean_ms"],
+    }
+
+    def __init__(self, slow_ms=50):
+        self.slow_seconds = float(slow_ms) / 1000
+        self.statements = {}
+        self.queries = 0
+        self.slow_queries = 0
+
+    def record(self, query, seconds):
+        statement = normalize_sql(query)
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = QueryStats()
+        stats.histogram.observe(seconds)
+        self.queries += 1
+        if seconds >= self.slow_seconds:
+            stats.slow += 1
+            self.slow_queries += 1
+            return True
+        return False
+
+    def top(self, limit=10, sort="total"):
+        """The `limit` worst statements by total time, call count, p95 or mean."""
+        rows = []
+        for statement, stats in self.statements.items():
+            histogram = stats.histogram
+            rows.append({
+                "statement": statement,
+                "count": histogram.count,
+                "slow": stats.slow,
+                "total_ms": round(histogram.total * 1000, 2),
+                "mean_ms": round(histogram.total / histogram.count * 1000, 3),
+                "p95_ms": round(histogram.quantile(0.95) * 1000, 3),
+            })
+        rows.sort(key=self.SORT_KEYS.get(sort, self.SORT_KEYS["total"]), reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        self.statements.clear()
+        self.queries = 0
+        self.slow_queries = 0
+
+    def metrics(self):
+        """Profiler counters for diagnostics."""
+        return {
+            "statements": len(self.statements),
+            "queries": self.queries,
+            "slow_queries": self.slow_queries,
+        }
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+async def start_metrics_server(registry, port, host="127.0.0.1"):
+    """Serve GET /metrics from `registry` on host:port. Returns the asyncio server.
+
+    Binds to localhost by default; put a real proxy in front of it rather
+    than exposing it directly.
+    """
+
+    async def handle(reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # Drain the headers; the request body is never needed
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render_prometheus().encode()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status, body, content_type = "404 Not Found", b"not found\n", "text/plain"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, int(port))
+    log.info("[📈] Metrics endpoint listening on http://%s:%s/metrics", host, port)
+    return server
@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import random
+import time
+
+log = logging.getLogger("wagerbot.notifications")
+
+# Background delivery of direct messages
+# Settlement can produce hundreds of DMs at once. Instead of firing them all
+# with asyncio.gather, callers enqueue them here and return immediately. A
+# small pool of workers sends them with bounded concurrency, paced globally
+# and per recipient, retrying transient failures with exponential backoff.
+
+class Notification:
+    """One queued message for one recipient."""
+
+    __slots__ = ("route", "text", "send", "attempts", "enqueued_at")
+
+    def __init__(self, route, text, send):
+        self.route = route
+        self.text = text
+        # Coroutine function taking the text, e.g. member.send
+        self.send = send
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+class NotificationQueue:
+    """Rate-limit-aware queue of outgoing direct messages.
+
+    Policies:
+    - concurrency: at most this many sends are in flight at once
+    - rate: global sends per second across all workers
+    - route_interval: minimum seconds between two sends to the same recipient
+    - coalesce: messages for a recipient whose earlier message hasn't been
+      picked up yet are merged into it (up to max_length characters), so a
+      burst becomes one DM instead of several
+    - max_depth: when this many messages are waiting, new ones are dropped
+    - failures that is_retryable(exc) accepts are retried up to max_retries
+      times with exponential backoff and jitter; the rest are dropped
+    """
+
+    def __init__(self, concurrency=4, rate=5.0, route_interval=1.0, max_retries=3,
+                 backoff_base=1.0, backoff_max=30.0, max_depth=5000, max_length=2000,
+                 coalesce=True, is_retryable=None):
+        self.concurrency = max(1, int(concurrency))
+        self.rate = max(0.1, float(rate))
+        self.route_interval = max(0.0, float(route_interval))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.max_depth = max(1, int(max_depth))
+        self.max_length = int(max_length)
+        self.coalesce = coalesce
+        self.is_retryable = is_retryable or (lambda exc: True)
+
+        self._queue = None
+        self._workers = []
+        # route -> notification still waiting in the queue (coalescing target)
+        self._waiting = {}
+        self._retry_handles = set()
+        self._global_next = 0.0
+        self._route_next = {}
+        self._closed = False
+
+        self.started_at = None
+        self.in_flight = 0
+        self.enqueued = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.total_delivery_time = 0.0
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self.started_at = time.monotonic()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"notification-worker-{idx}")
+            for idx in range(self.concurrency)
+        ]
+
+    def depth(self):
+        """Messages waiting to be sent, including ones waiting to be retried."""
+        return (self._queue.qsize() if self._queue else 0) + len(self._retry_handles)
+
+    def enqueue(self, route, text, send):
+        """Queue `text` for delivery through `send`. Returns False if it was dropped."""
+        if self._closed:
+            self.dropped += 1
+            return False
+        self._ensure_workers()
+
+        waiting = self._waiting.get(route) if self.coalesce else None
+        if waiting is not None and len(waiting.text) + 2 + len(text) <= self.max_length:
+            waiting.text = f"{waiting.text}\n\n{text}"
+            self.coalesced += 1
+            return True
+
+        if self.depth() >= self.max_depth:
+            self.dropped += 1
+            return False
+
+        notification = Notification(route, text, send)
+        self._waiting[route] = notification
+        self._queue.put_nowait(notification)
+        self.enqueued += 1
+        return True
+
+    async def _wait_for_slot(self, route):
+        """Sleep until both the global rate and the recipient's pacing allow a send."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._global_next, self._route_next.get(route, 0.0))
+        self._global_next = slot + 1.0 / self.rate
+        self._route_next[route] = slot + self.route_interval
+
+        # Forget recipients whose pacing window has passed
+        if len(self._route_next) > 4096:
+            self._route_next = {r: t for r, t in self._route_next.items() if t > now}
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _worker(self):
+        while True:
+            notification = await self._queue.get()
+            # Once picked up the message can no longer absorb new ones
+            if self._waiting.get(notification.route) is notification:
+                del self._waiting[notification.route]
+
+            self.in_flight += 1
+            try:
+                await self._wait_for_slot(notification.route)
+                notification.attempts += 1
+                await notification.send(notification.text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._handle_failure(notification, e)
+            else:
+                self.sent += 1
+                self.total_delivery_time += time.monotonic() - notification.enqueued_at
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    def _handle_failure(self, notification, exc):
+        if notification.attempts > self.max_retries or not self.is_retryable(exc) or self._closed:
+            self.failed += 1
+            log.warning("[⚠️] Dropping DM to %s after %s attempt(s): %s", notification.route, notification.attempts, exc)
+            return
+
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (notification.attempts - 1))
+        delay *= 1 + random.random() / 2
+        self.retried += 1
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            if self._closed:
+                self.dropped += 1
+                return
+            self._queue.put_nowait(notification)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    async def close(self, timeout=5.0):
+        """Give queued messages up to `timeout` seconds to go out, then stop the workers."""
+        if not self._workers:
+            self._closed = True
+            return
+        with_pending = self.depth() + self.in_flight
+        # Polled rather than Queue.join() so messages waiting on a retry count too
+        deadline = time.monotonic() + timeout
+        while (self.depth() or self.in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._closed = True
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        undelivered = self.depth()
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        self._waiting.clear()
+        self.dropped += undelivered
+        if with_pending:
+            log.info("[📨] Notification queue closed (%s undelivered)", undelivered)
+
+    def metrics(self):
+        """Queue counters for diagnostics."""
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "depth": self.depth(),
+            "in_flight": self.in_flight,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "sent_per_second": round(self.sent / uptime, 3) if uptime else 0.0,
+            "avg_delivery_seconds": round(self.total_delivery_time / self.sent, 3) if self.sent else 0.0,
+        }
+
+class DigestEntry:
+    """Results buffered for one recipient until their digest window closes."""
+
+    __slots__ = ("send", "lines", "net", "handle")
+
+    def __init__(self, send):
+        self.send = send
+        self.lines = []
+        self.net = 0
+        self.handle = None
+
+class NotificationDigest:
+    """Buffers per-recipient result lines and sends them as one message.
+
+    The first result for a recipient opens a window of `window` seconds.
+    When it closes, every line collected for that recipient goes to the
+    NotificationQueue as a single message that ends with the net total.
+    """
+
+    def __init__(self, queue, window=60.0, title="📬 **Your bet results**"):
+        self.queue = queue
+        self.window = max(0.0, float(window))
+        self.title = title
+        self._entries = {}
+        self.buffered = 0
+        self.digests = 0
+
+    def add(self, route, send, line, net):
+        """Buffer one result line and its credit change for a recipient."""
+        entry = self._entries.get(route)
+        if entry is None:
+            entry = DigestEntry(send)
+            entry.handle = asyncio.get_running_loop().call_later(self.window, self.flush, route)
+            self._entries[route] = entry
+        entry.lines.append(line)
+        entry.net += net
+        self.buffered += 1
+
+    def render(self, entry):
+        sign = "+" if entry.net >= 0 else "-"
+        return "\n".join([self.title, *entry.lines, f"**Net: {sign}{abs(entry.net)} credits**"])
+
+    def flush(self, route):
+        """Send a recipient's digest now."""
+        entry = self._entries.pop(route, None)
+        if entry is None:
+            return
+        if entry.handle is not None:
+            entry.handle.cancel()
+        text = self.render(entry)
+        # A long night can exceed Discord's message limit; keep the net total
+        # and as many whole lines as fit, then count the rest
+        if len(text) > self.queue.max_length:
+            lines, entry.lines = entry.lines, []
+            # Room left after the title, the net total and the longest possible note
+            budget = self.queue.max_length - len(self.render(entry)) - len(f"\n…and {len(lines)} more results")
+            for line in lines:
+                if len(line) + 1 > budget:
+                    break
+                entry.lines.append(line)
+                budget -= len(line) + 1
+            entry.lines.append(f"…and {len(lines) - len(entry.lines)} more results")
+            text = self.render(entry)
+        self.queue.enqueue(route, text, entry.send)
+        self.digests += 1
+
+    def flush_all(self):
+        """Send every buffered digest now, e.g. before shutting down."""
+        for route in list(self._entries):
+            self.flush(route)
+
+    def metrics(self):
+        """Digest counters for diagnostics."""
+        return {
+            "open": len(self._entries),
+            "buffered": self.buffered,
+            "digests": self.digests,
+        }
@@ -0,0 +1,115 @@
+from fractions import Fraction
+
+# Odds arithmetic
+# Odds are handled as exact fractions. A bet option's payout multiplier is
+# its decimal odds: the total returned per credit staked, stake included
+# (+150 -> 5/2, -120 -> 11/6). Payouts are floored to whole credits only at
+# the very end, so -120 on 120 credits pays exactly 220.
+
+class OddsError(ValueError):
+    """Odds text that can't be used. The message is safe to show to the user."""
+
+# Decimal odds of a +100 / -100 line
+EVEN = Fraction(2)
+
+def parse_american(text):
+    """Parse American odds such as "+150", "-120" or "150" into an int.
+
+    Raises OddsError unless the value is at least 100 in size.
+    """
+    cleaned = str(text).strip().replace(" ", "")
+    try:
+        american = int(cleaned)
+    except ValueError:
+        raise OddsError(f"⚠️ '{text}' is not a valid odds value. Use a number like +150 or -120.") from None
+    if abs(american) < 100:
+        raise OddsError(f"⚠️ American odds must be +100 or higher, or -100 or lower (got {text}).")
+    return american
+
+def format_american(american):
+    """Display text such as "+150" or "-120" for American odds."""
+    american = Fraction(american)
+    if american.denominator == 1:
+        return f"{int(american):+d}"
+    return f"{float(american):+.2f}"
+
+def american_to_decimal(american):
+    """Exact decimal odds: +150 -> 5/2, -120 -> 11/6."""
+    american = Fraction(american)
+    if abs(american) < 100:
+        raise OddsError(f"⚠️ American odds must be +100 or higher, or -100 or lower (got {american}).")
+    if american > 0:
+        return 1 + american / 100
+    return 1 + 100 / -american
+
+def decimal_to_american(decimal):
+    """Exact American odds for decimal odds above 1: 5/2 -> 150, 11/6 -> -120."""
+    decimal = Fraction(decimal)
+    if decimal <= 1:
+        raise OddsError("⚠️ Decimal odds must be greater than 1.")
+    if decimal >= 2:
+        return (decimal - 1) * 100
+    return -100 / (decimal - 1)
+
+def decimal_to_implied(decimal):
+    """Implied probability of decimal odds: 11/6 -> 6/11."""
+    decimal = Fraction(decimal)
+    if decimal <= 0:
+        raise OddsError("⚠️ Decimal odds must be positive.")
+    return 1 / decimal
+
+def implied_to_decimal(probability):
+    """Decimal odds for an implied probability in (0, 1]: 2/5 -> 5/2."""
+    probability = Fraction(probability)
+    if not 0 < probability <= 1:
+        raise OddsError("⚠️ Probability must be between 0 and 1.")
+    return 1 / probability
+
+def american_to_implied(american):
+    """Implied probability of American odds: -120 -> 6/11."""
+    return decimal_to_implied(american_to_decimal(american))
+
+def multiplier_from_row(num, den):
+    """Payout multiplier from stored (payout_num, payout_den) columns."""
+    return Fraction(num if num is not None else 100, den or 100)
+
+def payout(amount, multiplier):
+    """Credits returned on a winning stake, floored: 120 at 11/6 -> 220."""
+    return amount * multiplier.numerator // multiplier.denominator
+
+def batch_payouts(wagers, winning_option_id, multiplier):
+    """Payouts for every (option_id, amount) wager of a bet in one pass.
+
+    Winners on winning_option_id get payout(amount, multiplier), everyone
+    else 0. Matches the settlement UPDATE in settle_bet exactly.
+    """
+    num, den = multiplier.numerator, multiplier.denominator
+    return [amount * num // den if option_id == winning_option_id else 0 for option_id, amount in wagers]
+
+def pool_multiplier(pool_total, option_total, rake=0):
+    """Parimutuel multiplier: the pool after rake, split over the stakes on one option.
+
+    The net pool is floored to whole credits first, so paying every winner
+    payout(amount, multiplier) never hands out more than the net pool.
+    Returns None while nothing is staked on the option.
+    """
+    if not option_total:
+        return None
+    net_pool = pool_total * (1 - Fraction(rake))
+    return Fraction(net_pool.numerator // net_pool.denominator, option_total)
+
+def rake_from_bp(basis_points):
+    """House cut stored in basis points as a fraction (500 -> 1/20); None stays None."""
+    if basis_points is None:
+        return None
+    return Fraction(basis_points, 10000)
+
+def rake_to_bp(percent):
+    """Basis points for a rake given in percent ("5", "2.5"), which must be in [0, 100)."""
+    try:
+        rake = Fraction(str(percent).strip())
+    except (TypeError, ValueError):
+        raise OddsError(f"⚠️ '{percent}' is not a valid rake percentage.") from None
+    if not 0 <= rake < 100:
+        raise OddsError(f"⚠️ Rake must be at least 0% and below 100% (got {percent}).")
+    return round(rake * 100)
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import nextcord
+
+import wagerbot
+from benchmark import percentile
+from metrics import QueryProfiler
+from standins import FakeChannel, FakeGuild, FakeInteraction, FakeMember, ViewRegistry
+from traces import read_trace
+
+# Trace replay
+# Re-drives a trace recorded with TRACE_FILE through the bot's handlers,
+# offline, against a copy of a database. Events keep their recorded spacing
+# divided by --speed. Each user's events run in order, one after another, so
+# a modal submit always follows the click that opened it; different users
+# overlap just like they did live. --speed 0 instead runs every event to
+# completion before starting the next, as fast as possible, which gives the
+# same ordering (and the same row ids) on every run.
+#
+#     python replay.py trace.jsonl --db wagerbot.db --speed 10
+#
+# Replay against a snapshot taken when the recording started, so bet and
+# option ids in the trace line up with the database.
+
+APPLICATION_COMMAND = nextcord.InteractionType.application_command.value
+COMPONENT = nextcord.InteractionType.component.value
+AUTOCOMPLETE = nextcord.InteractionType.application_command_autocomplete.value
+MODAL_SUBMIT = nextcord.InteractionType.modal_submit.value
+
+def copy_database(source, target):
+    """Consistent copy of a live (WAL) database via the SQLite backup API."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+def slash_commands():
+    """Every slash command of the bot, by name, with its options parsed."""
+    # Adds them to the local command state only; nothing is sent to Discord
+    wagerbot.bot.add_all_application_commands()
+    return {
+        command.name: command
+        for command in wagerbot.bot.get_all_application_commands()
+        if isinstance(command, nextcord.SlashApplicationCommand)
+    }
+
+class Replayer:
+    """Turns trace events back into stand-in interactions and runs their handlers."""
+
+    def __init__(self, events, speed=1.0):
+        self.events = events
+        self.speed = speed
+        self.commands = slash_commands()
+        self.registry = ViewRegistry()
+        self.members = {}
+        self.guilds = {}
+        self.channels = {}
+        self._user_locks = {}
+
+        self.replayed = 0
+        self.errors = 0
+        self.skipped = {}
+        self.lag = []
+        self.latencies = []
+
+    def skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def interaction_for(self, event):
+        member = self.members.get(event["user"])
+        if member is None:
+            member = self.members[event["user"]] = FakeMember(event["user"], event.get("name") or f"User {event['user']}")
+        guild = None
+        if event.get("guild") is not None:
+            guild = self.guilds.get(event["guild"])
+            if guild is None:
+                guild = self.guilds[event["guild"]] = FakeGuild(event["guild"])
+            guild.add_member(member)
+        channel = self.channels.get(event.get("channel"))
+        if channel is None:
+            channel = self.channels[event.get("channel")] = FakeChannel(event.get("channel"), self.registry)
+        return FakeInteraction(
+            member, guild, channel,
+            type=nextcord.InteractionType(event["type"]),
+            data=json.loads(json.dumps(event.get("data") or {})),
+            registry=self.registry
+        )
+
+    async def dispatch(self, event, interaction):
+        """Run the handler for one event. Returns False if the event could not be replayed."""
+        data = interaction.data
+        if event["type"] == APPLICATION_COMMAND:
+            command = self.commands.get(data.get("name"))
+            if command is None:
+                self.skip("unknown_command")
+                return False
+            kwargs = await command.get_slash_kwargs(None, interaction, data.get("options") or [])
+            async with wagerbot.command_metrics.track(f"/{command.name}"):
+                await command.callback(interaction, **kwargs)
+
+        elif event["type"] == AUTOCOMPLETE:
+            command = self.commands.get(data.get("name"))
+            if command is None:
+                self.skip("unknown_command")
+                return False
+            async with wagerbot.command_metrics.track(f"/autocomplete:{command.name}"):
+                await command.call_autocomplete(None, interaction)
+
+        elif event["type"] == COMPONENT:
+            if wagerbot.parse_bet_custom_id(data.get("custom_id")) is not None:
+                await wagerbot.route_bet_component(interaction)
+                return True
+            component = event.get("component") or {}
+            message, item = self.registry.find_item(component.get("label"), component.get("placeholder"))
+            if item is None:
+                self.skip("component_without_view")
+                return False
+            interaction.message = message
+            item.refresh_state(data, None, None)
+            await item.callback(interaction)
+
+        elif event["type"] == MODAL_SUBMIT:
+            modal = self.registry.pop_modal(interaction.user.id)
+            if modal is None:
+                self.skip("modal_without_opener")
+                return False
+            values = [
+                component.get("value", "")
+                for row in data.get("components", [])
+                for component in row.get("components", [])
+            ]
+            for item, value in zip(modal.children, values):
+                item.refresh_state({"value": value}, None, None)
+            try:
+                await modal.callback(interaction)
+            finally:
+                modal.stop()
+
+        else:
+            self.skip(f"type_{event['type']}")
+            return False
+        return True
+
+    async def play(self, event, started):
+        lock = self._user_locks.setdefault(event["user"], asyncio.Lock())
+        if self.speed:
+            delay = started + event["t"] / self.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with lock:
+            begin = time.perf_counter()
+            if self.speed:
+                self.lag.append(max(0.0, begin - (started + event["t"] / self.speed)))
+            interaction = self.interaction_for(event)
+            try:
+                replayed = await self.dispatch(event, interaction)
+            except Exception as e:
+                self.errors += 1
+                wagerbot.log.warning("Replayed %s interaction failed: %r", event["type"], e)
+                return
+            if replayed:
+                self.replayed += 1
+                self.latencies.append(time.perf_counter() - begin)
+
+    async def run(self):
+        started = time.perf_counter()
+        if not self.speed:
+            for event in self.events:
+                await self.play(event, started)
+            return time.perf_counter() - started
+
+        # Start every event in trace order; per-user locks are FIFO, so each
+        # user's events keep their recorded order
+        tasks = []
+        for event in self.events:
+            tasks.append(asyncio.create_task(self.play(event, started)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+async def run_replay(events, speed=1.0):
+    """Replay `events` against wagerbot.DB_FILE and return the report dict."""
+    await wagerbot.init_db_manager()
+    replayer = Replayer(events, speed)
+    try:
+        elapsed = await replayer.run()
+        queries, commits = wagerbot.db.profiler.queries, wagerbot.db.commits
+        top = wagerbot.db.profiler.top(10)
+        bet_embeds = wagerbot.bet_message_updater.metrics()
+    finally:
+        wagerbot.notification_digest.flush_all()
+        await wagerbot.notification_queue.close(timeout=0)
+        await wagerbot.bet_message_updater.close(timeout=0)
+        await wagerbot.close_db_manager()
+
+    latencies = sorted(replayer.latencies)
+    lag = sorted(replayer.lag)
+    recorded = events[-1]["t"] if events else 0.0
+    return {
+        "events": len(events),
+        "replayed": replayer.replayed,
+        "errors": replayer.errors,
+        "skipped": replayer.skipped,
+        "speed": speed,
+        "recorded_seconds": round(recorded, 3),
+        "replay_seconds": round(elapsed, 3),
+        "throughput_per_second": round(replayer.replayed / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "schedule_lag_p99_ms": round(percentile(lag, 0.99) * 1000, 3),
+        "queries": queries,
+        "commits": commits,
+        "handlers": wagerbot.command_metrics.snapshot(),
+        "bet_embeds": bet_embeds,
+        "top_statements": top,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded interaction trace against a copy of the database.")
+    parser.add_argument("trace", help="JSONL trace written with TRACE_FILE")
+    parser.add_argument("--db", help="database to copy before replaying (default: start from an empty one)")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression; 1 = as recorded, 0 = one at a time, no waiting")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    header, events = read_trace(args.trace)
+    if header is None:
+        parser.error(f"{args.trace} is not an interaction trace")
+
+    wagerbot.query_profiler = QueryProfiler(slow_ms=float("inf"))
+
+    with tempfile.TemporaryDirectory(prefix="wagerbot-replay-") as tmp:
+        wagerbot.DB_FILE = os.path.join(tmp, "wagerbot.db")
+        if args.db:
+            copy_database(args.db, wagerbot.DB_FILE)
+        report = asyncio.run(run_replay(events, max(0.0, args.speed)))
+
+    report["trace_started_at"] = header.get("started_at")
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
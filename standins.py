@@ -0,0 +1,188 @@
+import itertools
+
+import nextcord
+
+# Discord stand-ins
+# Minimal objects with the attributes and coroutines the bot's handlers use
+# on interactions, members, guilds, channels and messages, so handlers can be
+# driven offline by benchmark.py and replay.py. Sends are only recorded.
+# Pass a ViewRegistry to keep the views and modals a handler sends, so later
+# clicks and submits can be routed back to them.
+
+_message_ids = itertools.count(1)
+_interaction_ids = itertools.count(1)
+
+class FakeMember:
+    """Guild member / user: an id, a display name and a send() that only counts."""
+
+    def __init__(self, member_id, display_name):
+        self.id = member_id
+        self.display_name = display_name
+        self.name = display_name
+        self.mention = f"<@{member_id}>"
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+class FakeGuild:
+    def __init__(self, guild_id, members=()):
+        self.id = guild_id
+        self._members = {member.id: member for member in members}
+
+    def add_member(self, member):
+        self._members[member.id] = member
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+class FakeMessage:
+    def __init__(self, content=None, embed=None, view=None, registry=None, message_id=None):
+        self.id = message_id if message_id is not None else next(_message_ids)
+        self.content = content
+        self.embed = embed
+        self.view = None
+        self.registry = registry
+        self.edits = 0
+        self._attach(view)
+
+    @property
+    def embeds(self):
+        return [self.embed] if self.embed is not None else []
+
+    def _attach(self, view):
+        if view is not None:
+            self.view = view
+            if self.registry is not None:
+                self.registry.add_view(self, view)
+
+    async def edit(self, content=None, embed=None, view=None, **kwargs):
+        self.content = content if content is not None else self.content
+        self.embed = embed if embed is not None else self.embed
+        self.edits += 1
+        self._attach(view)
+        return self
+
+    async def fetch(self):
+        return self
+
+class FakeChannel:
+    def __init__(self, channel_id=1, registry=None):
+        self.id = channel_id
+        self.registry = registry
+        self.messages = []
+        self.partial_messages = {}
+
+    async def send(self, content=None, embed=None, view=None, **kwargs):
+        message = FakeMessage(content, embed, view, self.registry)
+        self.messages.append(message)
+        return message
+
+    def get_partial_message(self, message_id):
+        """The message with this id, as if it had been fetched; edits to it are only counted."""
+        if message_id not in self.partial_messages:
+            self.partial_messages[message_id] = FakeMessage(message_id=message_id)
+        return self.partial_messages[message_id]
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.messages = []
+        self.modal = None
+        self.choices = None
+        self.deferred = False
+
+    def is_done(self):
+        return self.deferred or bool(self.messages) or self.modal is not None or self.choices is not None
+
+    async def send_message(self, content=None, embed=None, view=None, **kwargs):
+        message = FakeMessage(content, embed, view, self.interaction.registry)
+        self.interaction._original = message
+        self.messages.append(content)
+
+    async def edit_message(self, content=None, embed=None, view=None, **kwargs):
+        if self.interaction.message is not None:
+            await self.interaction.message.edit(content=content, embed=embed, view=view)
+        self.messages.append(content)
+
+    async def send_modal(self, modal):
+        self.modal = modal
+        if self.interaction.registry is not None:
+            self.interaction.registry.add_modal(self.interaction.user.id, modal)
+
+    async def send_autocomplete(self, choices):
+        self.choices = choices
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+class FakeFollowup:
+    def __init__(self, registry=None):
+        self.registry = registry
+        self.messages = []
+        self.partial_messages = {}
+
+    async def send(self, content=None, embed=None, view=None, **kwargs):
+        self.messages.append(content if content is not None else embed)
+        return FakeMessage(content, embed, view, self.registry)
+
+class FakeInteraction:
+    """The parts of nextcord.Interaction the bot's handlers use."""
+
+    def __init__(self, user, guild, channel, type=nextcord.InteractionType.application_command,
+                 data=None, message=None, registry=None):
+        self.id = next(_interaction_ids)
+        self.type = type
+        self.data = data or {}
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild is not None else None
+        self.channel = channel
+        self.channel_id = channel.id if channel is not None else None
+        self.message = message
+        self.registry = registry
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(registry)
+        self._original = None
+
+    async def original_message(self):
+        if self._original is None:
+            raise nextcord.ClientException("No response has been sent")
+        return self._original
+
+class ViewRegistry:
+    """Views and modals sent by handlers, so later interactions can find them again.
+
+    Views get fresh random custom_ids every run, so a recorded click is
+    matched by its button label (or select placeholder) against the most
+    recently sent views. Modals are matched to the next submit from the
+    user they were shown to.
+    """
+
+    def __init__(self, max_views=500):
+        self.max_views = max_views
+        self._views = []
+        self._modals = {}
+
+    def add_view(self, message, view):
+        self._views.append((message, view))
+        if len(self._views) > self.max_views:
+            del self._views[0]
+
+    def add_modal(self, user_id, modal):
+        self._modals[user_id] = modal
+
+    def pop_modal(self, user_id):
+        return self._modals.pop(user_id, None)
+
+    def find_item(self, label=None, placeholder=None):
+        """Return (message, item) for the newest live item with this label or placeholder."""
+        for message, view in reversed(self._views):
+            if view.is_finished():
+                continue
+            for item in view.children:
+                if label is not None and getattr(item, "label", None) == label:
+                    return message, item
+                if placeholder is not None and getattr(item, "placeholder", None) == placeholder:
+                    return message, item
+        return None, None
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# The bot's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Point the bot at an empty database and return run(scenario).
+
+    run() opens the shared DBManager (applying the migrations), loads the
+    open-bet index, awaits scenario() and closes the connection again.
+    Set DB_* environment variables with monkeypatch before calling it.
+    """
+    import wagerbot
+
+    monkeypatch.setattr(wagerbot, "DB_FILE", str(tmp_path / "wagerbot.db"))
+    # Start every test with empty in-memory state as well
+    monkeypatch.setattr(wagerbot, "open_bets", wagerbot.OpenBetIndex())
+    monkeypatch.setattr(wagerbot, "session_state", wagerbot.SessionState())
+    monkeypatch.setattr(wagerbot, "user_cache", wagerbot.UserCache(64))
+    monkeypatch.setattr(wagerbot, "balance_cache", wagerbot.BalanceCache(64))
+
+    def run(scenario):
+        async def main():
+            await wagerbot.init_db_manager()
+            await wagerbot.open_bets.ensure_loaded()
+            try:
+                return await scenario()
+            finally:
+                await wagerbot.close_db_manager()
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,110 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import wagerbot
+
+@pytest.fixture
+def group_commit(monkeypatch):
+    """Group commit on, with a window wide enough for a test's units to share one batch."""
+    def configure(window_ms):
+        monkeypatch.setenv("DB_GROUP_COMMIT", "1")
+        monkeypatch.setenv("DB_GROUP_COMMIT_WINDOW_MS", str(window_ms))
+        monkeypatch.setenv("DB_GROUP_COMMIT_MAX_BATCH", "64")
+    return configure
+
+async def fun_bet_and_users(count):
+    """A wallet fun bet with two options and `count` users, created before any batch of interest."""
+    bet = await wagerbot.create_bet(None, 1, "Fun", "test", "funbet", [("A", 2, None), ("B", 2, None)])
+    users = [
+        await wagerbot.ensure_user_exists(SimpleNamespace(id=2000 + number, display_name=f"U{number}"))
+        for number in range(count)
+    ]
+    return bet, users
+
+async def wager_outcomes(bet, stakes):
+    """Place (user_id, amount) wagers concurrently; returns each result or exception in order."""
+    option_id = bet.options[0][0]
+    return await asyncio.gather(
+        *(wagerbot.place_wager(user_id, bet.bet_id, amount, option_id=option_id) for user_id, amount in stakes),
+        return_exceptions=True
+    )
+
+def test_rejected_unit_rolls_back_alone_and_the_batch_commits(fresh_db, group_commit):
+    group_commit(window_ms=200)
+
+    async def scenario():
+        bet, (alice, bob, carol) = await fun_bet_and_users(3)
+        commits = wagerbot.db.commits
+        outcomes = await wager_outcomes(bet, [(alice, 100), (bob, 5000), (carol, 50)])
+        batch_commits = wagerbot.db.commits - commits
+        wagers = await wagerbot.db.fetchall("SELECT user_id, amount FROM wagers ORDER BY user_id")
+        wallets = dict(await wagerbot.db.fetchall("SELECT user_id, balance FROM wallet"))
+        return (alice, bob, carol), outcomes, batch_commits, wagers, wallets
+
+    (alice, bob, carol), outcomes, batch_commits, wagers, wallets = fresh_db(scenario)
+    assert outcomes[0] == ("A", "wallet")
+    assert isinstance(outcomes[1], wagerbot.WagerError)
+    assert outcomes[2] == ("A", "wallet")
+    # All three units shared one transaction
+    assert batch_commits == 1
+    assert wagers == [(alice, 100), (carol, 50)]
+    # Bob's unit, including the wallet row it created, was rolled back to its savepoint
+    assert wallets == {alice: 900, carol: 950}
+
+def test_failed_batch_commit_reaches_every_waiter(fresh_db, group_commit, monkeypatch):
+    group_commit(window_ms=200)
+    forgotten = []
+    monkeypatch.setattr(wagerbot, "forget_balances", lambda user_id=None: forgotten.append(user_id))
+
+    async def scenario():
+        bet, users = await fun_bet_and_users(3)
+        connection = wagerbot.db.connection
+        commit = connection.commit
+
+        async def failing_commit():
+            raise sqlite3.OperationalError("disk I/O error")
+
+        connection.commit = failing_commit
+        try:
+            outcomes = await wager_outcomes(bet, [(user_id, 10) for user_id in users])
+        finally:
+            connection.commit = commit
+        wagers = await wagerbot.db.fetchone("SELECT COUNT(*) FROM wagers")
+        return users, outcomes, wagers[0]
+
+    users, outcomes, wager_count = fresh_db(scenario)
+    assert all(isinstance(outcome, sqlite3.OperationalError) for outcome in outcomes)
+    # Every caller dropped the balances it had cached from inside the batch
+    assert sorted(forgotten) == sorted(users)
+    assert wager_count == 0
+
+def test_standalone_read_commits_the_open_batch_first(fresh_db, group_commit, tmp_path):
+    # Far longer than the test, so only the read can end the batch
+    group_commit(window_ms=60000)
+
+    def committed_users():
+        with sqlite3.connect(tmp_path / "wagerbot.db") as other:
+            return other.execute("SELECT COUNT(*) FROM users WHERE discord_id = 'batched'").fetchone()[0]
+
+    async def scenario():
+        async def write():
+            async with wagerbot.db.transaction() as tx:
+                await tx.execute("INSERT INTO users (discord_id, username) VALUES ('batched', 'B')")
+
+        writer = asyncio.create_task(write())
+        while not wagerbot.db._batch_waiters:
+            await asyncio.sleep(0)
+        before = committed_users()
+        row = await wagerbot.db.fetchone("SELECT COUNT(*) FROM users WHERE discord_id = 'batched'")
+        after = committed_users()
+        await asyncio.wait_for(writer, 1)
+        return before, row[0], after
+
+    before, read, after = fresh_db(scenario)
+    assert before == 0
+    assert read == 1
+    # The read only returned the row once it was committed
+    assert after == 1
@@ -0,0 +1,36 @@
+from fractions import Fraction
+
+import pytest
+
+from odds import OddsError, american_to_decimal, batch_payouts, payout
+
+@pytest.mark.parametrize("american, decimal", [
+    (150, Fraction(5, 2)),
+    (-120, Fraction(11, 6)),
+    (100, Fraction(2)),
+    (-100, Fraction(2)),
+    (-110, Fraction(21, 11)),
+])
+def test_american_to_decimal_is_exact(american, decimal):
+    assert american_to_decimal(american) == decimal
+
+@pytest.mark.parametrize("american", [0, 50, -99])
+def test_american_to_decimal_rejects_small_odds(american):
+    with pytest.raises(OddsError):
+        american_to_decimal(american)
+
+def test_payout_floors_only_at_the_end():
+    # -120 used to be stored as 183/100 and paid 219
+    assert payout(120, Fraction(11, 6)) == 220
+    assert payout(7, Fraction(11, 6)) == 12
+    assert payout(1, Fraction(2)) == 2
+
+def test_batch_payouts_pays_only_the_winning_option():
+    wagers = [(1, 120), (2, 50), (1, 7)]
+    assert batch_payouts(wagers, 1, Fraction(11, 6)) == [220, 0, 12]
+    assert batch_payouts(wagers, 3, Fraction(11, 6)) == [0, 0, 0]
+
+def test_batch_payouts_matches_payout():
+    multiplier = Fraction(21, 11)
+    wagers = [(1, amount) for amount in range(1, 200)]
+    assert batch_payouts(wagers, 1, multiplier) == [payout(amount, multiplier) for _, amount in wagers]
@@ -0,0 +1,83 @@
+from fractions import Fraction
+from types import SimpleNamespace
+
+import pytest
+
+import wagerbot
+from odds import OddsError, payout, pool_multiplier, rake_from_bp, rake_to_bp
+
+def test_pool_multiplier_splits_the_pool_after_rake():
+    # 301 staked, 5% rake: the net pool is floored to 285 credits
+    multiplier = pool_multiplier(301, 150, Fraction(1, 20))
+    assert multiplier == Fraction(285, 150)
+    assert payout(100, multiplier) + payout(50, multiplier) == 285
+
+def test_pool_multiplier_without_rake_returns_the_whole_pool():
+    assert pool_multiplier(300, 100) == 3
+
+def test_pool_payouts_never_exceed_the_net_pool():
+    stakes = [3, 7, 11, 13]
+    multiplier = pool_multiplier(1000, sum(stakes), Fraction(1, 30))
+    assert sum(payout(stake, multiplier) for stake in stakes) <= 1000 * 29 // 30
+
+def test_pool_multiplier_is_none_when_nobody_backed_the_option():
+    assert pool_multiplier(500, 0, Fraction(1, 20)) is None
+
+@pytest.mark.parametrize("percent, basis_points", [("0", 0), ("5", 500), ("2.5", 250), (" 99.99 ", 9999)])
+def test_rake_to_bp(percent, basis_points):
+    assert rake_to_bp(percent) == basis_points
+    assert rake_from_bp(basis_points) == Fraction(basis_points, 10000)
+
+@pytest.mark.parametrize("percent", ["-1", "100", "150", "five", ""])
+def test_rake_to_bp_rejects_out_of_range(percent):
+    with pytest.raises(OddsError):
+        rake_to_bp(percent)
+
+def test_rake_from_bp_keeps_fixed_odds_bets_unraked():
+    assert rake_from_bp(None) is None
+
+async def pool_bet_with_wagers(stakes, rake_bp):
+    """A session pool bet with options A, B and C and bankroll stakes as (user number, option index, amount)."""
+    session_id, _ = await wagerbot.open_session()
+    bet = await wagerbot.create_bet(
+        session_id, 1, "Pool", "test", "pool", [(label, Fraction(1), None) for label in "ABC"], pool_rake_bp=rake_bp
+    )
+    users = {}
+    for number, option, amount in stakes:
+        if number not in users:
+            users[number] = await wagerbot.ensure_user_exists(SimpleNamespace(id=1000 + number, display_name=f"U{number}"))
+        await wagerbot.place_wager(users[number], bet.bet_id, amount, option_id=bet.options[option][0])
+    return session_id, bet, users
+
+async def bankroll(user_id, session_id):
+    row = await wagerbot.db.fetchone(
+        "SELECT balance FROM bankroll WHERE user_id = ? AND session_id = ?", (user_id, session_id)
+    )
+    return row[0]
+
+def test_settle_pool_bet_pays_winners_pro_rata(fresh_db):
+    async def scenario():
+        session_id, bet, users = await pool_bet_with_wagers([(1, 0, 100), (2, 0, 50), (3, 1, 150), (4, 1, 1)], 500)
+        assert bet.pool_total == 301
+        settlement = await wagerbot.settle_bet(bet.bet_id, bet.options[0][0])
+        results = {row[0]: (row[4], row[5]) for row in settlement.wagers}
+        balances = [await bankroll(users[n], session_id) for n in (1, 2, 3, 4)]
+        return users, results, balances
+
+    users, results, balances = fresh_db(scenario)
+    assert results[users[1]] == (190, "win")
+    assert results[users[2]] == (95, "win")
+    assert results[users[3]] == (0, "lose")
+    assert balances == [1090, 1045, 850, 999]
+
+def test_settle_pool_bet_refunds_everyone_when_nobody_backed_the_winner(fresh_db):
+    async def scenario():
+        session_id, bet, users = await pool_bet_with_wagers([(1, 0, 100), (2, 1, 40)], 500)
+        settlement = await wagerbot.settle_bet(bet.bet_id, bet.options[2][0])
+        results = sorted((row[3], row[4], row[5]) for row in settlement.wagers)
+        balances = [await bankroll(users[n], session_id) for n in (1, 2)]
+        return results, balances
+
+    results, balances = fresh_db(scenario)
+    assert results == [(40, 40, "refund"), (100, 100, "refund")]
+    assert balances == [1000, 1000]
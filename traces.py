@@ -0,0 +1,157 @@
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import nextcord
+
+log = logging.getLogger("wagerbot.traces")
+
+# Interaction traces
+# With TRACE_FILE set, every incoming slash command, autocomplete request,
+# button click and modal submit is appended to a JSONL file: when it arrived
+# (seconds since recording started), who sent it, where, and the command
+# data. Interaction tokens and resolved user/member payloads are never
+# written. replay.py re-drives a trace against a copy of the database.
+#
+# The first line is a header; every other line is one event:
+#   {"t": 12.3456, "type": 3, "user": 1234, "name": "Alice", "guild": 42,
+#    "channel": 7, "data": {"custom_id": "wagerbot:wager:5:9:0", ...}}
+
+TRACE_VERSION = 1
+
+# Only these keys of interaction.data are kept
+TRACE_DATA_KEYS = ("name", "type", "options", "custom_id", "component_type", "values", "components")
+
+def strip_tokens(value):
+    """Copy of a JSON-like value without any key that mentions a token."""
+    if isinstance(value, dict):
+        return {key: strip_tokens(item) for key, item in value.items() if "token" not in str(key).lower()}
+    if isinstance(value, list):
+        return [strip_tokens(item) for item in value]
+    return value
+
+def describe_component(interaction):
+    """Label or placeholder of the clicked component, found on the interaction's message.
+
+    Components of ordinary views get random custom_ids, so replay finds
+    them again by what the user saw rather than by id.
+    """
+    custom_id = (interaction.data or {}).get("custom_id")
+    message = getattr(interaction, "message", None)
+    for row in getattr(message, "components", None) or ():
+        for component in getattr(row, "children", ()):
+            if getattr(component, "custom_id", None) == custom_id:
+                described = {}
+                if getattr(component, "label", None):
+                    described["label"] = component.label
+                if getattr(component, "placeholder", None):
+                    described["placeholder"] = component.placeholder
+                return described or None
+    return None
+
+def interaction_event(interaction, t):
+    """Trace event for one interaction that arrived `t` seconds into the recording."""
+    data = interaction.data or {}
+    user = interaction.user
+    event = {
+        "t": round(t, 4),
+        "type": int(interaction.type.value),
+        "user": user.id if user else None,
+        "name": getattr(user, "display_name", None),
+        "guild": interaction.guild_id,
+        "channel": interaction.channel_id,
+        "data": strip_tokens({key: data[key] for key in TRACE_DATA_KEYS if key in data}),
+    }
+    if interaction.type == nextcord.InteractionType.component:
+        component = describe_component(interaction)
+        if component:
+            event["component"] = component
+    return event
+
+class TraceRecorder:
+    """Appends interaction events to a JSONL file from a background thread.
+
+    record() only builds a dict and enqueues it, so the event loop never
+    waits on the disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.monotonic()
+        self.recorded = 0
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "a", encoding="utf-8")
+        self._write({
+            "trace": TRACE_VERSION,
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        })
+        self._thread = threading.Thread(target=self._writer, name="trace-writer", daemon=True)
+        self._thread.start()
+        log.info("[🎞️] Recording interactions to %s", path)
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+
+    def _writer(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            self._write(entry)
+            # Write everything that queued up meanwhile before flushing once
+            while True:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._file.flush()
+                    return
+                self._write(entry)
+            self._file.flush()
+
+    def record(self, interaction):
+        """Queue one interaction for the trace file."""
+        try:
+            self._queue.put(interaction_event(interaction, time.monotonic() - self.started))
+            self.recorded += 1
+        except Exception:
+            log.exception("Failed to record interaction")
+
+    def close(self):
+        """Write out everything queued and close the file."""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        log.info("[🎞️] Trace closed (%s interactions recorded)", self.recorded)
+
+    def metrics(self):
+        """Recorder counters for diagnostics."""
+        return {"recorded": self.recorded}
+
+def read_trace(path):
+    """Return (header, events) from a trace file, events in arrival order.
+
+    A file appended to across restarts holds several recordings; each one's
+    clock is shifted to start where the previous recording ended.
+    """
+    header = None
+    events = []
+    offset = last = 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "trace" in entry:
+                header = header or entry
+                offset = last
+                continue
+            entry["t"] += offset
+            last = entry["t"]
+            events.append(entry)
+    return header, events
@@ -1,11 +1,28 @@
 import os
 import json
+import asyncio
+import bisect
+import contextlib
+import functools
+import time
+from collections import OrderedDict
+from fractions import Fraction
 import aiosqlite
 import nextcord
-from nextcord.ext import commands
+from nextcord.ext import application_checks, commands
 from nextcord.ui import View, Button, Modal, TextInput, Select
-from datetime import datetime, timezone
+from datetime import datetime
 from dotenv import load_dotenv
+from init_db import run_migrations
+from bot_logging import log, log_fields, setup_logging, shutdown_logging
+from notifications import NotificationDigest, NotificationQueue
+from live_messages import MessageUpdater
+from metrics import MetricsRegistry, QueryProfiler, start_metrics_server
+from traces import TraceRecorder
+from odds import (
+    OddsError, american_to_decimal, batch_payouts, format_american,
+    multiplier_from_row, parse_american, payout, pool_multiplier, rake_from_bp, rake_to_bp
+)
 
 # Intents and bot setup
 intents = nextcord.Intents.default()
@@ -14,7 +31,75 @@ intents.members = True
 
 APPLICATION_ID = os.getenv("DISCORD_APPLICATION_ID")
 
-bot = commands.Bot(intents=intents, application_id=APPLICATION_ID)
+
+class WagerBot(commands.Bot):
+    """Bot that owns the shared database connection for its whole lifetime."""
+
+    metrics_server = None
+
+    async def start(self, *args, **kwargs):
+        global trace_recorder
+        setup_logging()
+        # Open the connection before the gateway connects so no interaction
+        # ever sees db = None
+        await init_db_manager()
+        if os.getenv("METRICS_PORT"):
+            self.metrics_server = await start_metrics_server(
+                command_metrics, os.getenv("METRICS_PORT"), os.getenv("METRICS_HOST", "127.0.0.1")
+            )
+        if os.getenv("TRACE_FILE") and trace_recorder is None:
+            trace_recorder = TraceRecorder(os.getenv("TRACE_FILE"))
+            command_metrics.add_collector("trace", trace_recorder.metrics)
+        await super().start(*args, **kwargs)
+
+    async def process_application_commands(self, interaction):
+        # Time every slash command and autocomplete request. Every other
+        # interaction type passes through here too; buttons and modals are
+        # timed by their own handlers.
+        if interaction.type == nextcord.InteractionType.application_command:
+            name = (interaction.data or {}).get("name", "unknown")
+        elif interaction.type == nextcord.InteractionType.application_command_autocomplete:
+            name = f"autocomplete:{(interaction.data or {}).get('name', 'unknown')}"
+        else:
+            await super().process_application_commands(interaction)
+            return
+        async with command_metrics.track(f"/{name}"):
+            await super().process_application_commands(interaction)
+
+    async def close(self):
+        global trace_recorder
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        # Send buffered digests and give queued DMs a moment to go out while
+        # the HTTP session is still open
+        notification_digest.flush_all()
+        await notification_queue.close(timeout=float(os.getenv("DM_SHUTDOWN_TIMEOUT", 5)))
+        await super().close()
+        if trace_recorder is not None:
+            trace_recorder.close()
+            trace_recorder = None
+        await bet_message_updater.close(timeout=0)
+        await close_db_manager()
+        shutdown_logging()
+
+
+bot = WagerBot(intents=intents, application_id=APPLICATION_ID)
+
+# Latency, error and in-flight counts for every interaction handler
+command_metrics = MetricsRegistry()
+
+@bot.listen("on_application_command_error")
+async def count_command_error(interaction: nextcord.Interaction, error):
+    # nextcord catches command exceptions before they reach track()
+    command_metrics.record_error(f"/{(interaction.data or {}).get('name', 'unknown')}")
+
+# Opt-in interaction trace for replay.py; see traces.py
+trace_recorder = None
+
+@bot.listen("on_interaction")
+async def record_interaction(interaction: nextcord.Interaction):
+    if trace_recorder is not None:
+        trace_recorder.record(interaction)
 
 # Global Vars
 
@@ -36,246 +121,1612 @@ EMOJI_MAP = [
 ]
 
 # Database helper functions
+# These all go through the shared DBManager connection opened at startup.
 
 async def db_execute(query, params=()):
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute(query, params)
-        await db.commit()
+    await db.execute(query, params)
 
 async def db_fetchone(query, params=()):
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute(query, params) as cursor:
-            return await cursor.fetchone()
+    return await db.fetchone(query, params)
 
 async def db_fetchall(query, params=()):
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute(query, params) as cursor:
-            return await cursor.fetchall()
+    return await db.fetchall(query, params)
+
+class SessionState:
+    """In-memory view of which session is active.
+
+    The active session is loaded from the database once and then kept
+    current by open_session() and close_session(), so hot paths don't need
+    a query to find it. Anything that changes sessions.is_active outside
+    those two must call invalidate().
+    """
+
+    def __init__(self):
+        self.active_id = None
+        self.loaded = False
+        self.hits = 0
+        self.loads = 0
+        self.updates = 0
+
+    async def get(self, tx=None):
+        """Return the active session id (or None), loading it on first use.
+
+        Pass tx when already inside a transaction.
+        """
+        if self.loaded:
+            self.hits += 1
+            return self.active_id
+
+        query = "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
+        row = await (tx.fetchone(query) if tx else db_fetchone(query))
+        self.active_id = row[0] if row else None
+        self.loaded = True
+        self.loads += 1
+        return self.active_id
+
+    def set_active(self, session_id):
+        """Record a session change made by the caller's transaction."""
+        self.active_id = session_id
+        self.loaded = True
+        self.updates += 1
+
+    def invalidate(self):
+        """Forget the cached value so the next get() reloads it."""
+        self.active_id = None
+        self.loaded = False
+
+    def metrics(self):
+        """Cache counters for diagnostics."""
+        lookups = self.hits + self.loads
+        return {
+            "active_session_id": self.active_id,
+            "hits": self.hits,
+            "loads": self.loads,
+            "updates": self.updates,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+session_state = SessionState()
 
 async def get_active_session_id():
-    row = await db_fetchone("SELECT id FROM sessions WHERE is_active = 1 ORDER BY created_at DESC LIMIT 1")
-    if row:
-        print(f"[DEBUG] Active Session ID found: {row[0]}")
-        return row[0]
-    print("[DEBUG] No active session found!")
-    return None
+    return await session_state.get()
+
+def is_retryable_dm_error(exc):
+    """Retry server errors and dropped connections; closed DMs and bad requests won't succeed."""
+    if isinstance(exc, nextcord.HTTPException):
+        return exc.status >= 500 or exc.status == 429
+    return isinstance(exc, (OSError, asyncio.TimeoutError))
+
+# DMs are delivered in the background; see notifications.py
+notification_queue = NotificationQueue(
+    concurrency=os.getenv("DM_CONCURRENCY", 4),
+    rate=os.getenv("DM_RATE", 5),
+    route_interval=os.getenv("DM_ROUTE_INTERVAL", 1),
+    max_retries=os.getenv("DM_MAX_RETRIES", 3),
+    max_depth=os.getenv("DM_QUEUE_MAX", 5000),
+    is_retryable=is_retryable_dm_error
+)
+
+# Users who opt in get one combined DM per window instead of one per bet
+notification_digest = NotificationDigest(notification_queue, window=os.getenv("DM_DIGEST_WINDOW", 60))
+
+# Wagers only mark a bet's message as stale; its totals are re-rendered at
+# most once per BET_EMBED_INTERVAL seconds
+bet_message_updater = MessageUpdater(interval=os.getenv("BET_EMBED_INTERVAL", 5))
+
+def queue_dm(member, text):
+    """Queue a direct message to a member; returns False if the queue dropped it."""
+    return notification_queue.enqueue(member.id, text, member.send)
 
 async def resolve_bet_and_payout(interaction: nextcord.Interaction, bet_id: int, winning_option_id: int):
-    """Resolve a bet and handle payouts more efficiently with parallel queries."""
-    
-    session_id = await get_active_session_id()
+    """Settle a bet, notify every participant and post the results embed."""
+    settlement = await settle_bet(bet_id, winning_option_id)
     guild = interaction.guild
 
-    # Execute initial updates in parallel
-    await asyncio.gather(
-        db.execute("UPDATE bet SET is_resolved = 1 WHERE id = ?", (bet_id,)),
-        db.execute("UPDATE bet_options SET is_winner = 1 WHERE id = ?", (winning_option_id,))
-    )
-    
-    # Fetch all required data in parallel
-    wagers, bet_details, winning_option = await asyncio.gather(
-        db.fetchall("SELECT user_id, amount, prop_option_id FROM wagers WHERE prop_id = ?", (bet_id,)),
-        db.fetchone("SELECT name FROM bet WHERE id = ?", (bet_id,)),
-        db.fetchone("SELECT label FROM bet_options WHERE id = ?", (winning_option_id,))
-    )
-    
-    bet_name = bet_details[0] if bet_details else "Unnamed Bet"
-    winning_label = winning_option[0] if winning_option else "Unknown Option"
-
     result_lines = []
-    update_tasks = []
-    message_tasks = []
-    
-    for user_id, amount, prop_option_id in wagers:
-        won = prop_option_id == winning_option_id
-        
+
+    for user_id, discord_id, username, amount, payout, result, dm_digest in settlement.wagers:
+        try:
+            member = guild.get_member(int(discord_id)) if guild and discord_id else None
+        except (TypeError, ValueError):
+            member = None
+        display_name = member.display_name if member else (username or f"User {user_id}")
+        won = result == "win"
+
         if won:
-            # Get odds for this option
-            odds_row = await db.fetchone("SELECT odds FROM bet_options WHERE id = ?", (prop_option_id,))
-            odds = odds_row[0] if odds_row else 100
-            payout = int(amount * (odds / 100))
-            
-            # Queue database updates
-            update_tasks.append(db.execute(
-                "UPDATE bankroll SET balance = balance + ? WHERE user_id = ? AND session_id = ?",
-                (payout, user_id, session_id)
+            result_lines.append(f"🎉 **{display_name}** won {payout} credits!")
+        elif result == "refund":
+            result_lines.append(f"↩️ **{display_name}** got {payout} credits back")
+
+        if not member:
+            continue
+        if dm_digest:
+            if won:
+                line = f"🎉 **{settlement.bet_name}** — {settlement.winning_label}: +{payout - amount} credits"
+            elif result == "refund":
+                line = f"↩️ **{settlement.bet_name}** — nobody backed {settlement.winning_label}: {amount} credits refunded"
+            else:
+                line = f"😔 **{settlement.bet_name}** — {settlement.winning_label} won: -{amount} credits"
+            notification_digest.add(member.id, member.send, line, payout - amount)
+        elif won:
+            queue_dm(member, (
+                f"🎉 **Congratulations!**\n"
+                f"You won the bet: **{settlement.bet_name}**\n"
+                f"Winning Option: {settlement.winning_label}\n"
+                f"Bet Amount: {amount}\n"
+                f"Payout: {payout} credits\n"
+                f"Net Gain: +{payout - amount} credits"
             ))
-            update_tasks.append(db.execute(
-                "UPDATE wagers SET result = 'win', payout = ? WHERE user_id = ? AND prop_id = ?",
-                (payout, user_id, bet_id)
+        elif result == "refund":
+            queue_dm(member, (
+                f"↩️ **Stake refunded**\n"
+                f"Nobody backed the winning option of **{settlement.bet_name}** ({settlement.winning_label}),\n"
+                f"so your {amount} credits were returned."
             ))
-            
-            # Try to get member to send notification
-            try:
-                member = guild.get_member(int(user_id))
-                if member:
-                    message_tasks.append(member.send(
-                        f"🎉 **Congratulations!**\n"
-                        f"You won the bet: **{bet_name}**\n"
-                        f"Winning Option: {winning_label}\n"
-                        f"Bet Amount: {amount}\n"
-                        f"Payout: {payout} credits\n"
-                        f"Net Gain: +{payout - amount} credits"
-                    ))
-                    result_lines.append(f"🎉 **{member.display_name}** won {payout} credits!")
-                else:
-                    result_lines.append(f"🎉 User {user_id} won {payout} credits!")
-            except Exception as e:
-                print(f"[ERROR] Failed to handle win notification for user {user_id}: {e}")
-                result_lines.append(f"🎉 User {user_id} won {payout} credits!")
         else:
-            # Queue losing wager update
-            update_tasks.append(db.execute(
-                "UPDATE wagers SET result = 'lose' WHERE user_id = ? AND prop_id = ?",
-                (user_id, bet_id)
+            queue_dm(member, (
+                f"😔 **Better luck next time!**\n"
+                f"You lost the bet: **{settlement.bet_name}**\n"
+                f"Winning Option: {settlement.winning_label}\n"
+                f"Bet Amount: {amount}\n"
+                f"Net Loss: -{amount} credits"
             ))
-            
-            # Try to send loss notification
-            try:
-                member = guild.get_member(int(user_id))
-                if member:
-                    message_tasks.append(member.send(
-                        f"😔 **Better luck next time!**\n"
-                        f"You lost the bet: **{bet_name}**\n"
-                        f"Winning Option: {winning_label}\n"
-                        f"Bet Amount: {amount}\n"
-                        f"Net Loss: -{amount} credits"
-                    ))
-            except Exception as e:
-                print(f"[ERROR] Failed to handle loss notification for user {user_id}: {e}")
-    
-    # Execute all database updates in parallel
-    if update_tasks:
-        await asyncio.gather(*update_tasks)
-    
-    # Send all notifications in parallel
-    if message_tasks:
-        # We use asyncio.gather with return_exceptions=True to prevent one failed
-        # message from blocking others
-        await asyncio.gather(*message_tasks, return_exceptions=True)
-    
+
     # Create and send the results embed
     embed = nextcord.Embed(
         title="🏁 Bet Resolved!",
         description="\n".join(result_lines) if result_lines else "No participants this time!",
         color=nextcord.Color.green()
     )
-    embed.add_field(name="Bet", value=bet_name, inline=False)
-    embed.add_field(name="Winning Option", value=winning_label, inline=False)
+    embed.add_field(name="Bet", value=settlement.bet_name, inline=False)
+    embed.add_field(name="Winning Option", value=settlement.winning_label, inline=False)
     await interaction.channel.send(embed=embed)
 
+class UserCache:
+    """Bounded LRU map of Discord id -> (internal user id, stored username).
+
+    Tracks hits, misses and evictions so the hit rate can be checked.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max(1, int(max_size))
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, discord_id):
+        """Return (user_id, username) or None, marking the entry as recently used."""
+        entry = self._entries.get(discord_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(discord_id)
+        self.hits += 1
+        return entry
+
+    def put(self, discord_id, user_id, username):
+        """Insert or refresh an entry, evicting the least recently used one if full."""
+        self._entries[discord_id] = (user_id, username)
+        self._entries.move_to_end(discord_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def metrics(self):
+        """Cache counters for diagnostics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+user_cache = UserCache(os.getenv("USER_CACHE_SIZE", 4096))
+
+class BalanceSnapshot:
+    """Available and at-risk (pending wager) credits for one user."""
+
+    __slots__ = ("session_id", "wallet", "wallet_at_risk", "bankroll", "bankroll_at_risk")
+
+    def __init__(self, session_id, wallet, wallet_at_risk, bankroll, bankroll_at_risk):
+        self.session_id = session_id
+        # None means the row doesn't exist yet (it will start at 1000)
+        self.wallet = wallet
+        self.wallet_at_risk = wallet_at_risk
+        self.bankroll = bankroll
+        self.bankroll_at_risk = bankroll_at_risk
+
+class BalanceCache:
+    """Bounded LRU of per-user balance snapshots for the active session.
+
+    Writers call update() inside their transaction with the new balances
+    (taken from RETURNING) and the at-risk deltas, so the cache changes
+    while the write lock is held. Users that aren't cached are skipped and
+    rebuilt with a single query the next time they're read.
+    """
+
+    REBUILD_QUERY = """
+    SELECT
+        (SELECT balance FROM wallet WHERE user_id = ?),
+        (SELECT COALESCE(SUM(amount), 0) FROM wagers
+         WHERE user_id = ? AND result = 'pending' AND from_wallet = 1),
+        (SELECT balance FROM bankroll WHERE user_id = ? AND session_id = ?),
+        (SELECT COALESCE(SUM(amount), 0) FROM wagers
+         WHERE user_id = ? AND result = 'pending' AND from_wallet = 0 AND session_id = ?)
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max(1, int(max_size))
+        self._entries = OrderedDict()
+        # user_id -> True once a write lands while that user's rebuild query is in flight
+        self._rebuilding = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id, session_id):
+        """Return the user's BalanceSnapshot, rebuilding it if missing or from another session."""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.session_id == session_id:
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        self._rebuilding[user_id] = False
+        try:
+            row = await db_fetchone(
+                self.REBUILD_QUERY,
+                (user_id, user_id, user_id, session_id, user_id, session_id)
+            )
+        finally:
+            stale = self._rebuilding.pop(user_id, True)
+
+        entry = BalanceSnapshot(session_id, *row)
+        # A write that raced the query may not be reflected; don't keep it
+        if not stale:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def update(self, user_id, session_id=None, wallet=None, wallet_at_risk=0,
+               bankroll=None, bankroll_at_risk=0):
+        """Apply a change made by the caller's transaction.
+
+        wallet and bankroll are new absolute balances (None = unchanged);
+        the *_at_risk arguments are deltas. Bankroll changes only apply if
+        session_id matches the cached snapshot's session.
+        """
+        if user_id in self._rebuilding:
+            self._rebuilding[user_id] = True
+
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+
+        if wallet is not None:
+            entry.wallet = wallet
+        entry.wallet_at_risk += wallet_at_risk
+        if session_id is not None and session_id == entry.session_id:
+            if bankroll is not None:
+                entry.bankroll = bankroll
+            entry.bankroll_at_risk += bankroll_at_risk
+
+    def invalidate(self, user_id):
+        """Drop one user's snapshot (e.g. after a rolled-back write)."""
+        if user_id in self._rebuilding:
+            self._rebuilding[user_id] = True
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every snapshot (e.g. when a session closes)."""
+        for user_id in self._rebuilding:
+            self._rebuilding[user_id] = True
+        self._entries.clear()
+
+    def metrics(self):
+        """Cache counters for diagnostics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+balance_cache = BalanceCache(os.getenv("BALANCE_CACHE_SIZE", 4096))
+
+class RankingBoard:
+    """Sorted in-memory ranking of balances for one leaderboard.
+
+    Keeps (-balance, user_id) keys in a sorted list next to a user -> balance
+    map. Rank lookups are a bisect (O(log n)), top-K and page reads are
+    slices, and a balance change moves one key (bisect plus a list shift,
+    which is a memmove and cheap at leaderboard sizes). The board loads
+    itself with one query on first use and is then kept current by set().
+    """
+
+    def __init__(self, load_query, params=()):
+        self.load_query = load_query
+        self.params = params
+        self.loaded = False
+        # Bumped on every change so renderers can tell when they're stale
+        self.version = 0
+        self._keys = []
+        self._balances = {}
+        self._load_lock = asyncio.Lock()
+        # Changes that arrive while the load query is in flight, replayed after it
+        self._pending = None
+        self._load_stale = False
+
+    async def ensure_loaded(self):
+        """Load the board from the database if it isn't loaded yet."""
+        if self.loaded:
+            return self
+        async with self._load_lock:
+            if self.loaded:
+                return self
+            self._pending = []
+            self._load_stale = False
+            try:
+                rows = await db_fetchall(self.load_query, self.params)
+            except BaseException:
+                self._pending = None
+                raise
+            if self._load_stale:
+                # A failed write invalidated the board mid-load; serve this
+                # snapshot once but reload on the next call
+                self._pending = None
+                self._balances = {user_id: balance for user_id, balance in rows}
+                self._keys = sorted((-balance, user_id) for user_id, balance in rows)
+                return self
+            self._balances = {user_id: balance for user_id, balance in rows}
+            self._keys = sorted((-balance, user_id) for user_id, balance in rows)
+            self.loaded = True
+            # Balances are absolute, so replaying in order is safe whether or
+            # not the load already saw them
+            pending, self._pending = self._pending, None
+            for user_id, balance in pending:
+                self._set(user_id, balance)
+            self.version += 1
+        return self
+
+    def set(self, user_id, balance):
+        """Record a user's new balance (ignored until the board is loaded)."""
+        if self._pending is not None:
+            self._pending.append((user_id, balance))
+        if self.loaded:
+            self._set(user_id, balance)
+
+    def _set(self, user_id, balance):
+        old_balance = self._balances.get(user_id)
+        if old_balance == balance:
+            return
+        if old_balance is not None:
+            idx = bisect.bisect_left(self._keys, (-old_balance, user_id))
+            del self._keys[idx]
+        bisect.insort(self._keys, (-balance, user_id))
+        self._balances[user_id] = balance
+        self.version += 1
+
+    def page(self, offset, limit):
+        """Return [(rank, user_id, balance)] for ranks offset+1 .. offset+limit."""
+        return [
+            (offset + idx + 1, user_id, -neg_balance)
+            for idx, (neg_balance, user_id) in enumerate(self._keys[offset:offset + limit])
+        ]
+
+    def rank(self, user_id):
+        """Return the user's 1-based rank, or None if they aren't on the board."""
+        balance = self._balances.get(user_id)
+        if balance is None:
+            return None
+        return bisect.bisect_left(self._keys, (-balance, user_id)) + 1
+
+    def balance(self, user_id):
+        return self._balances.get(user_id)
+
+    def invalidate(self):
+        """Drop everything; the next ensure_loaded() reloads from the database."""
+        self.loaded = False
+        self._load_stale = True
+        self._keys = []
+        self._balances = {}
+        self.version += 1
+
+    def __len__(self):
+        return len(self._keys)
+
+class Leaderboards:
+    """The wallet ranking plus the ranking for the active session's bankrolls."""
+
+    def __init__(self):
+        self.wallet = RankingBoard("SELECT user_id, balance FROM wallet")
+        self.session = None
+        self.session_id = None
+
+    def board(self, board_type, session_id=None):
+        """Return the RankingBoard for "wallet" or "session" (None if no session)."""
+        if board_type == "wallet":
+            return self.wallet
+        if session_id is None:
+            return None
+        if self.session_id != session_id:
+            self.session = RankingBoard(
+                "SELECT user_id, balance FROM bankroll WHERE session_id = ?", (session_id,)
+            )
+            self.session_id = session_id
+        return self.session
+
+    def record(self, user_id, session_id=None, wallet=None, bankroll=None):
+        """Record new absolute balances from the caller's transaction."""
+        if wallet is not None:
+            self.wallet.set(user_id, wallet)
+        if bankroll is not None and self.session is not None and session_id == self.session_id:
+            self.session.set(user_id, bankroll)
+
+    def session_closed(self):
+        self.session = None
+        self.session_id = None
+
+    def invalidate(self):
+        self.wallet.invalidate()
+        if self.session is not None:
+            self.session.invalidate()
+
+leaderboards = Leaderboards()
+
+def record_balance_change(user_id, session_id=None, wallet=None, wallet_at_risk=0,
+                          bankroll=None, bankroll_at_risk=0):
+    """Push a balance change made by the caller's transaction to every in-memory view.
+
+    wallet and bankroll are new absolute balances (None = unchanged) and the
+    *_at_risk arguments are deltas; see BalanceCache.update().
+    """
+    balance_cache.update(
+        user_id, session_id,
+        wallet=wallet, wallet_at_risk=wallet_at_risk,
+        bankroll=bankroll, bankroll_at_risk=bankroll_at_risk
+    )
+    leaderboards.record(user_id, session_id, wallet=wallet, bankroll=bankroll)
+
+def forget_balances(user_id=None):
+    """Drop cached balances after a failed write (one user, or everyone)."""
+    if user_id is None:
+        balance_cache.clear()
+    else:
+        balance_cache.invalidate(user_id)
+    leaderboards.invalidate()
+
+class OpenBet:
+    """An unresolved bet as held by the open-bet index."""
+
+    __slots__ = ("bet_id", "session_id", "guild_id", "name", "name_key", "bet_type", "options", "multipliers",
+                 "pool_rake", "pool_totals", "pool_wagers", "pool_total", "message_ids", "message", "embed")
+
+    def __init__(self, bet_id, session_id, guild_id, name, bet_type, options, multipliers=None,
+                 pool_rake=None, pools=None, message_ids=None):
+        self.bet_id = bet_id
+        self.session_id = session_id
+        self.guild_id = guild_id
+        self.name = name or "Unnamed Bet"
+        self.name_key = self.name.casefold()
+        self.bet_type = bet_type
+        # (option_id, label, casefolded label) in creation order
+        self.options = [(option_id, label, label.casefold()) for option_id, label in options]
+        # option_id -> exact payout multiplier (stake included)
+        self.multipliers = multipliers or {}
+        # The house cut of a parimutuel bet (None for fixed odds), and
+        # option_id -> credits staked / number of wagers, kept current by place_wager()
+        self.pool_rake = pool_rake
+        self.pool_totals = {}
+        self.pool_wagers = {}
+        self.pool_total = 0
+        for option_id, (total, wagers) in (pools or {}).items():
+            self.set_pool(option_id, total, wagers)
+        # (channel_id, message_id) of the bet's message, the message to edit
+        # and its embed as last sent; see update_bet_message()
+        self.message_ids = message_ids
+        self.message = None
+        self.embed = None
+
+    @property
+    def is_pool(self):
+        return self.pool_rake is not None
+
+    def set_pool(self, option_id, total, wagers):
+        """Record an option's pool as returned by the wager that last added to it.
+
+        Wagers commit in order, so a higher wager count is always newer
+        state; a stale update arriving late is ignored.
+        """
+        if wagers < self.pool_wagers.get(option_id, 0):
+            return
+        self.pool_total += total - self.pool_totals.get(option_id, 0)
+        self.pool_totals[option_id] = total
+        self.pool_wagers[option_id] = wagers
+
+    def multiplier(self, option_id):
+        """Current payout multiplier of an option, or None if it has none yet.
+
+        Fixed-odds bets return the stored odds. Pool bets return the odds the
+        pool would pay right now, from the running totals, without a query.
+        """
+        if self.pool_rake is None:
+            return self.multipliers.get(option_id)
+        return pool_multiplier(self.pool_total, self.pool_totals.get(option_id, 0), self.pool_rake)
+
+def match_rank(text_key, query_key):
+    """0 for a prefix match, 1 for a substring match, None for no match."""
+    if text_key.startswith(query_key):
+        return 0
+    if query_key in text_key:
+        return 1
+    return None
+
+class OpenBetIndex:
+    """In-memory index of unresolved bets and their options for /wager autocomplete.
+
+    Loaded once with a single joined query, then kept current by create_bet(),
+    the lock and cancel buttons and settle_bet(), so autocomplete never
+    touches the database. place_wager() keeps each bet's pool totals
+    current. Changes made while the load query is in flight are replayed
+    after it.
+    """
+
+    LOAD_QUERY = """
+        SELECT b.id, b.session_id, b.guild_id, b.name, b.bet_type, b.pool_rake_bp, b.channel_id, b.message_id,
+               o.id, o.label, COALESCE(o.payout_num, o.odds), o.payout_den, o.pool_total, o.pool_wagers
+        FROM bet b
+        JOIN bet_options o ON o.prop_id = b.id
+        WHERE b.is_resolved = 0
+        ORDER BY b.id, o.id
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._bets = {}
+        self._load_lock = asyncio.Lock()
+        self._pending = None
+
+    async def ensure_loaded(self):
+        """Load the open bets from the database if they aren't loaded yet."""
+        if self.loaded:
+            return self
+        async with self._load_lock:
+            if self.loaded:
+                return self
+            self._pending = []
+            try:
+                rows = await db_fetchall(self.LOAD_QUERY)
+            except BaseException:
+                self._pending = None
+                raise
+
+            grouped = {}
+            for (bet_id, session_id, guild_id, name, bet_type, rake_bp, channel_id, message_id,
+                 option_id, label, num, den, pool_total, pool_wagers) in rows:
+                message_ids = (channel_id, message_id) if channel_id and message_id else None
+                entry = grouped.setdefault(
+                    bet_id, (session_id, guild_id, name, bet_type, rake_bp, message_ids, [], {}, {})
+                )
+                entry[6].append((option_id, label or ""))
+                entry[7][option_id] = multiplier_from_row(num, den)
+                entry[8][option_id] = (pool_total or 0, pool_wagers or 0)
+            self._bets = {
+                bet_id: OpenBet(
+                    bet_id, session_id, guild_id, name, bet_type, options, multipliers,
+                    pool_rake=rake_from_bp(rake_bp), pools=pools, message_ids=message_ids
+                )
+                for bet_id, (session_id, guild_id, name, bet_type, rake_bp, message_ids, options, multipliers, pools)
+                in grouped.items()
+            }
+            self.loaded = True
+
+            pending, self._pending = self._pending, None
+            for apply in pending:
+                apply()
+        return self
+
+    def add(self, bet):
+        """Index a newly created bet."""
+        self._record(functools.partial(self._apply, bet, bet.bet_id))
+
+    def remove(self, bet_id):
+        """Drop a bet that was locked, cancelled or resolved."""
+        self._record(functools.partial(self._apply, None, bet_id))
+
+    def record_pool(self, bet_id, option_id, total, wagers):
+        """Update an open bet's running pool for one option after a wager."""
+        self._record(functools.partial(self._apply_pool, bet_id, option_id, total, wagers))
+
+    def _record(self, apply):
+        if self._pending is not None:
+            self._pending.append(apply)
+        if self.loaded:
+            apply()
+
+    def _apply(self, bet, bet_id):
+        if bet is None:
+            self._bets.pop(bet_id, None)
+        else:
+            self._bets[bet_id] = bet
+
+    def _apply_pool(self, bet_id, option_id, total, wagers):
+        bet = self._bets.get(bet_id)
+        if bet is not None:
+            bet.set_pool(option_id, total, wagers)
+
+    def get(self, bet_id):
+        return self._bets.get(bet_id)
+
+    def visible(self, bet, session_id, guild_id):
+        """Whether a bet can be wagered on from this guild in the active session."""
+        if bet.guild_id is not None and bet.guild_id != guild_id:
+            return False
+        # Fun bets use wallets and don't depend on the session
+        return bet.bet_type == "funbet" or bet.session_id == session_id
+
+    def search_bets(self, query, session_id, guild_id, limit=25):
+        """Return up to `limit` visible bets matching the query, best matches first.
+
+        Prefix matches on the name or the bet id rank above substring
+        matches; ties go to the newest bet. An empty query lists the newest.
+        """
+        query_key = (query or "").strip().casefold()
+        matches = []
+        for bet in self._bets.values():
+            if not self.visible(bet, session_id, guild_id):
+                continue
+            if not query_key:
+                rank = 0
+            elif str(bet.bet_id).startswith(query_key):
+                rank = 0
+            else:
+                rank = match_rank(bet.name_key, query_key)
+                if rank is None:
+                    continue
+            matches.append((rank, -bet.bet_id, bet))
+        matches.sort(key=lambda match: match[:2])
+        return [bet for _, _, bet in matches[:limit]]
+
+    def search_options(self, bet_id, query, limit=25):
+        """Return up to `limit` (option_id, label) pairs of a bet matching the query."""
+        bet = self._bets.get(bet_id)
+        if bet is None:
+            return []
+        query_key = (query or "").strip().casefold()
+        matches = []
+        for position, (option_id, label, label_key) in enumerate(bet.options):
+            rank = match_rank(label_key, query_key) if query_key else 0
+            if rank is None and str(option_id).startswith(query_key):
+                rank = 0
+            if rank is not None:
+                matches.append((rank, position, option_id, label))
+        matches.sort()
+        return [(option_id, label) for _, _, option_id, label in matches[:limit]]
+
+    def __iter__(self):
+        return iter(list(self._bets.values()))
+
+    def __len__(self):
+        return len(self._bets)
+
+open_bets = OpenBetIndex()
+
 # Ensures a user exists in the database. 
 # If not, inserts them using their Discord ID and username.
 async def ensure_user_exists(discord_user: nextcord.User):
-    """Ensure a user exists in the database with caching."""
+    """Return the internal user id for a Discord user, creating them if needed.
+
+    Served from user_cache after the first lookup. The users row is only
+    written when the display name actually changed.
+    """
     discord_id = str(discord_user.id)
-    
-    # Check cache first
-    if discord_id in user_id_cache:
-        # Update username in case it changed
-        await db.execute(
-            "UPDATE users SET username = ? WHERE discord_id = ?",
-            (discord_user.display_name, discord_id)
+    display_name = discord_user.display_name
+
+    cached = user_cache.get(discord_id)
+    if cached is None:
+        cached = await db.fetchone(
+            "SELECT id, username FROM users WHERE discord_id = ?", (discord_id,)
         )
-        return user_id_cache[discord_id]
+        if cached is None:
+            # New user; the upsert covers two first interactions racing each other
+            async with db.transaction() as tx:
+                cached = await tx.fetchone(
+                    "INSERT INTO users (discord_id, username) VALUES (?, ?) "
+                    "ON CONFLICT(discord_id) DO UPDATE SET username = excluded.username "
+                    "RETURNING id, username",
+                    (discord_id, display_name)
+                )
+        user_cache.put(discord_id, cached[0], cached[1])
 
-    # Not in cache, check database
-    user_row = await db.fetchone(
-        "SELECT id FROM users WHERE discord_id = ?", (discord_id,)
-    )
-    
-    if user_row:
-        # Update username and cache the id
+    user_id, stored_username = cached
+    if stored_username != display_name:
         await db.execute(
-            "UPDATE users SET username = ? WHERE discord_id = ?",
-            (discord_user.display_name, discord_id)
+            "UPDATE users SET username = ? WHERE id = ?",
+            (display_name, user_id)
         )
-        user_id_cache[discord_id] = user_row[0]
-        return user_row[0]
+        user_cache.put(discord_id, user_id, display_name)
 
-    # User doesn't exist, create a new one
-    await db.execute(
-        "INSERT INTO users (discord_id, username) VALUES (?, ?)",
-        (discord_id, discord_user.display_name)
-    )
-    
-    # Get the new ID and cache it
-    new_user_row = await db.fetchone(
-        "SELECT id FROM users WHERE discord_id = ?", (discord_id,)
-    )
-    user_id = new_user_row[0]
-    user_id_cache[discord_id] = user_id
     return user_id
 
+class WagerError(Exception):
+    """A wager was rejected. The message is safe to show to the user."""
+
+async def place_wager(user_id, bet_id, amount, use_wallet=False, option_id=None, option_label=None):
+    """Place a wager atomically and return (option_label, balance_source).
+
+    Every check, the debit, the wager insert and the option's pool total
+    update run in one BEGIN IMMEDIATE
+    transaction with a single commit. The debit only succeeds if the balance
+    still covers the stake, so concurrent clicks cannot overdraw an account.
+    The option is looked up by option_id if given, otherwise by option_label.
+    Fun bets always use the wallet. Raises WagerError if the wager is rejected.
+    """
+    try:
+        async with db.transaction() as tx:
+            bet_row = await tx.fetchone(
+                "SELECT is_resolved, bet_type FROM bet WHERE id = ?", (bet_id,)
+            )
+            if not bet_row:
+                raise WagerError("⚠️ Bet not found.")
+            if bet_row[0]:
+                raise WagerError("⚠️ This bet is already resolved.")
+
+            is_fun_bet = bet_row[1] == "funbet"
+            use_wallet = use_wallet or is_fun_bet
+            # A pool pays losers' stakes to winners, so it can't mix wallet
+            # credits with session bankroll credits
+            if use_wallet and bet_row[1] == "pool":
+                raise WagerError("⚠️ This pool bet only takes wagers from your session bankroll.")
+
+            # Fun bets are never tied to a session
+            session_id = None
+            if not is_fun_bet:
+                session_id = await session_state.get(tx)
+                if session_id is None and not use_wallet:
+                    raise WagerError("⚠️ No active session.")
+
+            if option_id is not None:
+                option_row = await tx.fetchone(
+                    "SELECT id, label FROM bet_options WHERE id = ? AND prop_id = ?",
+                    (option_id, bet_id)
+                )
+            else:
+                option_row = await tx.fetchone(
+                    "SELECT id, label FROM bet_options WHERE prop_id = ? AND label = ?",
+                    (bet_id, option_label)
+                )
+            if not option_row:
+                raise WagerError("⚠️ That option does not exist for this bet.")
+            option_id, option_label = option_row
+
+            # Create the balance row with the default 1000 if needed, then debit
+            # only if it still covers the stake
+            if use_wallet:
+                balance_source = "wallet"
+                await tx.execute(
+                    "INSERT OR IGNORE INTO wallet (user_id, balance) VALUES (?, 1000)",
+                    (user_id,)
+                )
+                debited = await tx.fetchone(
+                    "UPDATE wallet SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance",
+                    (amount, user_id, amount)
+                )
+                if not debited:
+                    balance_row = await tx.fetchone(
+                        "SELECT balance FROM wallet WHERE user_id = ?", (user_id,)
+                    )
+                    raise WagerError(f"⚠️ Insufficient wallet balance. You have {balance_row[0]}.")
+                record_balance_change(user_id, wallet=debited[0], wallet_at_risk=amount)
+            else:
+                balance_source = "bankroll"
+                await tx.execute(
+                    "INSERT OR IGNORE INTO bankroll (user_id, session_id, balance) VALUES (?, ?, 1000)",
+                    (user_id, session_id)
+                )
+                debited = await tx.fetchone(
+                    "UPDATE bankroll SET balance = balance - ? WHERE user_id = ? AND session_id = ? AND balance >= ? RETURNING balance",
+                    (amount, user_id, session_id, amount)
+                )
+                if not debited:
+                    balance_row = await tx.fetchone(
+                        "SELECT balance FROM bankroll WHERE user_id = ? AND session_id = ?",
+                        (user_id, session_id)
+                    )
+                    raise WagerError(f"⚠️ Insufficient bankroll balance. You have {balance_row[0]}.")
+                record_balance_change(user_id, session_id, bankroll=debited[0], bankroll_at_risk=amount)
+
+            await tx.execute(
+                """
+                INSERT INTO wagers 
+                (user_id, session_id, prop_id, prop_option_id, amount, odds, result, payout, from_wallet)
+                VALUES (?, ?, ?, ?, ?, 100, 'pending', 0, ?)
+                """,
+                (user_id, session_id, bet_id, option_id, amount, int(use_wallet))
+            )
+            # Running per-option totals, so pool odds never need to sum wagers
+            pool_row = await tx.fetchone(
+                "UPDATE bet_options SET pool_total = pool_total + ?, pool_wagers = pool_wagers + 1 "
+                "WHERE id = ? RETURNING pool_total, pool_wagers",
+                (amount, option_id)
+            )
+    except WagerError:
+        raise
+    except BaseException:
+        forget_balances(user_id)
+        raise
+
+    open_bets.record_pool(bet_id, option_id, *pool_row)
+    bet_totals_changed(bet_id)
+    return option_label, balance_source
+
+class SettlementError(Exception):
+    """A bet could not be settled. The message is safe to show to the user."""
+
+class SettlementResult:
+    """Outcome of settle_bet(), consumed by the notification and embed code."""
+
+    def __init__(self, bet_id, bet_name, winning_option_id, winning_label, wagers):
+        self.bet_id = bet_id
+        self.bet_name = bet_name
+        self.winning_option_id = winning_option_id
+        self.winning_label = winning_label
+        # One (user_id, discord_id, username, amount, payout, result, dm_digest)
+        # row per wager; result is 'win', 'lose' or 'refund'
+        self.wagers = wagers
+
+async def settle_bet(bet_id, winning_option_id):
+    """Resolve a bet and pay out every wager in one transaction.
+
+    The winner is marked, all pending wagers are won or lost, and winnings are
+    credited to bankrolls and wallets with a handful of set-based statements,
+    regardless of how many wagers the bet has. Pool bets pay the pool after
+    rake to the winning option's backers, pro rata, from the stored option
+    totals; if nobody backed the winner every stake is refunded. Raises
+    SettlementError if the bet or option is unknown or the bet already has a
+    winner.
+    """
+    try:
+        async with db.transaction() as tx:
+            bet_row = await tx.fetchone("SELECT name, pool_rake_bp FROM bet WHERE id = ?", (bet_id,))
+            if not bet_row:
+                raise SettlementError("⚠️ Bet not found.")
+            option_row = await tx.fetchone(
+                "SELECT label, COALESCE(payout_num, odds), payout_den FROM bet_options WHERE id = ? AND prop_id = ?",
+                (winning_option_id, bet_id)
+            )
+            if not option_row:
+                raise SettlementError("⚠️ That option does not exist for this bet.")
+            already_resolved = await tx.fetchone(
+                "SELECT 1 FROM bet_options WHERE prop_id = ? AND is_winner = 1 LIMIT 1",
+                (bet_id,)
+            )
+            if already_resolved:
+                raise SettlementError("⚠️ This bet has already been resolved.")
+
+            bet_name = bet_row[0] or "Unnamed Bet"
+            winning_label = option_row[0]
+            if bet_row[1] is None:
+                multiplier = multiplier_from_row(option_row[1], option_row[2])
+            else:
+                pool_row = await tx.fetchone(
+                    "SELECT SUM(pool_total), SUM(CASE WHEN id = ? THEN pool_total ELSE 0 END) "
+                    "FROM bet_options WHERE prop_id = ?",
+                    (winning_option_id, bet_id)
+                )
+                multiplier = pool_multiplier(pool_row[0], pool_row[1], rake_from_bp(bet_row[1]))
+
+            # Mark the winner (locked bets are already is_resolved = 1)
+            await tx.execute("UPDATE bet SET is_resolved = 1 WHERE id = ?", (bet_id,))
+            await tx.execute(
+                "UPDATE bet_options SET is_winner = (id = ?) WHERE prop_id = ?",
+                (winning_option_id, bet_id)
+            )
+
+            if multiplier is None:
+                # Nobody backed the winning option of a pool bet: everyone gets their stake back
+                settled = await tx.fetchall(
+                    """
+                    UPDATE wagers
+                    SET result = 'refund', payout = amount
+                    WHERE prop_id = ? AND result = 'pending'
+                    RETURNING user_id, session_id, from_wallet, amount
+                    """,
+                    (bet_id,)
+                )
+            else:
+                # Win or lose every pending wager; payout includes the stake and
+                # is floored exactly like odds.payout()
+                settled = await tx.fetchall(
+                    """
+                    UPDATE wagers
+                    SET result = CASE WHEN prop_option_id = ? THEN 'win' ELSE 'lose' END,
+                        payout = CASE WHEN prop_option_id = ? THEN amount * ? / ? ELSE 0 END
+                    WHERE prop_id = ? AND result = 'pending'
+                    RETURNING user_id, session_id, from_wallet, amount
+                    """,
+                    (winning_option_id, winning_option_id, multiplier.numerator, multiplier.denominator, bet_id)
+                )
+            for user_id, session_id, from_wallet, amount in settled:
+                if from_wallet:
+                    record_balance_change(user_id, wallet_at_risk=-amount)
+                else:
+                    record_balance_change(user_id, session_id, bankroll_at_risk=-amount)
+
+            # Credit bankroll winnings and refunds to the session each wager was placed in
+            credited = await tx.fetchall(
+                """
+                UPDATE bankroll
+                SET balance = bankroll.balance + credit.total
+                FROM (
+                    SELECT user_id, session_id, SUM(payout) AS total
+                    FROM wagers
+                    WHERE prop_id = ? AND result IN ('win', 'refund') AND from_wallet = 0
+                    GROUP BY user_id, session_id
+                ) AS credit
+                WHERE bankroll.user_id = credit.user_id AND bankroll.session_id = credit.session_id
+                RETURNING bankroll.user_id, bankroll.session_id, bankroll.balance
+                """,
+                (bet_id,)
+            )
+            for user_id, session_id, new_balance in credited:
+                record_balance_change(user_id, session_id, bankroll=new_balance)
+
+            # Credit wallet winnings and refunds
+            credited = await tx.fetchall(
+                """
+                INSERT INTO wallet (user_id, balance)
+                SELECT user_id, SUM(payout)
+                FROM wagers
+                WHERE prop_id = ? AND result IN ('win', 'refund') AND from_wallet = 1
+                GROUP BY user_id
+                ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance
+                RETURNING user_id, balance
+                """,
+                (bet_id,)
+            )
+            for user_id, new_balance in credited:
+                record_balance_change(user_id, wallet=new_balance)
+
+            wagers = await tx.fetchall(
+                """
+                SELECT w.user_id, u.discord_id, u.username, w.amount, w.payout, w.result,
+                       COALESCE(u.dm_digest, 0)
+                FROM wagers w
+                LEFT JOIN users u ON u.id = w.user_id
+                WHERE w.prop_id = ?
+                ORDER BY w.payout DESC, w.id
+                """,
+                (bet_id,)
+            )
+    except SettlementError:
+        raise
+    except BaseException:
+        forget_balances()
+        raise
+
+    open_bets.remove(bet_id)
+    return SettlementResult(bet_id, bet_name, winning_option_id, winning_label, wagers)
+
+# House cut of new pool bets (/createbet and /funbet), stored on each bet so
+# changing it never affects bets that are already open
+POOL_RAKE_BP = rake_to_bp(os.getenv("POOL_RAKE_PERCENT", "0"))
+
+def pool_rake_note(rake_bp):
+    """Embed footer explaining how a pool bet pays out."""
+    rake = rake_from_bp(rake_bp)
+    cut = f" after a {float(rake * 100):g}% house cut" if rake else ""
+    return f"Pool bet: winners split everything staked{cut}, in proportion to their wagers."
+
+async def create_bet(session_id, guild_id, name, description, bet_type, options, pool_rake_bp=None):
+    """Insert a bet and its options in one transaction and add it to the open-bet index.
+
+    options is a list of (label, multiplier, american_odds) tuples, where
+    multiplier is the exact payout per credit staked (see odds.py). Passing
+    pool_rake_bp makes a parimutuel bet instead: winners split the pool less
+    that many basis points, and the multipliers are unused. Returns the new
+    OpenBet, whose options carry the new option ids and multipliers.
+    """
+    async with db.transaction() as tx:
+        bet_row = await tx.fetchone(
+            """
+            INSERT INTO bet (session_id, guild_id, name, description, bet_type, is_resolved, pool_rake_bp)
+            VALUES (?, ?, ?, ?, ?, 0, ?)
+            RETURNING id
+            """,
+            (session_id, str(guild_id) if guild_id else None, name, description, bet_type, pool_rake_bp)
+        )
+        bet_id = bet_row[0]
+
+        option_ids = []
+        for label, multiplier, american_odds in options:
+            multiplier = Fraction(multiplier)
+            # odds keeps the legacy rounded "multiplier x 100" for older readers
+            option_row = await tx.fetchone(
+                "INSERT INTO bet_options (prop_id, label, odds, american_odds, payout_num, payout_den) "
+                "VALUES (?, ?, ?, ?, ?, ?) RETURNING id",
+                (bet_id, label, round(multiplier * 100), american_odds, multiplier.numerator, multiplier.denominator)
+            )
+            option_ids.append(option_row[0])
+
+    bet = OpenBet(
+        bet_id, session_id, str(guild_id) if guild_id else None, name, bet_type,
+        [(option_id, label) for option_id, (label, _, _) in zip(option_ids, options)],
+        {option_id: Fraction(multiplier) for option_id, (_, multiplier, _) in zip(option_ids, options)},
+        pool_rake=rake_from_bp(pool_rake_bp)
+    )
+    open_bets.add(bet)
+    return bet
+
+async def open_session():
+    """Start a new session unless one is already active.
+
+    Returns (session_id, created); created is False if a session was
+    already active, in which case its id is returned.
+    """
+    try:
+        async with db.transaction() as tx:
+            existing_id = await session_state.get(tx)
+            if existing_id is not None:
+                return existing_id, False
+
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            session_row = await tx.fetchone(
+                "INSERT INTO sessions (name, description, created_at, is_active) VALUES (?, ?, ?, 1) RETURNING id",
+                (f"Session {now}", "New session started.", now)
+            )
+            session_state.set_active(session_row[0])
+    except BaseException:
+        session_state.invalidate()
+        raise
+
+    return session_row[0], True
+
+async def transfer_wallet_to_session(user_id, session_id, amount):
+    """Move wallet credits into a session bankroll in one transaction.
+
+    The wallet is only debited if it covers the amount. Returns the new
+    (wallet, bankroll) balances, or None if the wallet is short.
+    """
+    try:
+        async with db.transaction() as tx:
+            wallet_row = await tx.fetchone(
+                "UPDATE wallet SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance",
+                (amount, user_id, amount)
+            )
+            if not wallet_row:
+                return None
+
+            # Add to session bankroll with wallet flag
+            bankroll_row = await tx.fetchone(
+                "INSERT INTO bankroll (user_id, session_id, balance, from_wallet) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(user_id, session_id) DO UPDATE SET balance = balance + ?, from_wallet = 1 "
+                "RETURNING balance",
+                (user_id, session_id, amount, amount)
+            )
+            record_balance_change(user_id, session_id, wallet=wallet_row[0], bankroll=bankroll_row[0])
+    except BaseException:
+        forget_balances(user_id)
+        raise
+
+    return wallet_row[0], bankroll_row[0]
+
+# Wallet multipliers for users who transferred wallet funds into the session,
+# by final bankroll rank (1st-4th), and for everyone else who transferred
+WALLET_MULTIPLIERS = [2.5, 2.2, 2.0, 1.8]
+DEFAULT_WALLET_MULTIPLIER = 1.6
+
+# Ranks a session's bankrolls and works out what each one pays into the wallet.
+# Shared by the display query and the wallet upsert so both agree exactly.
+SESSION_SETTLEMENT_CTE = f"""
+WITH ranked AS (
+    SELECT
+        user_id,
+        balance,
+        from_wallet,
+        ROW_NUMBER() OVER (ORDER BY balance DESC, user_id) AS rank
+    FROM bankroll
+    WHERE session_id = ?
+),
+settled AS (
+    SELECT
+        rank,
+        user_id,
+        balance,
+        from_wallet,
+        CASE
+            WHEN from_wallet = 0 THEN 1.0
+            {" ".join(f"WHEN rank = {idx + 1} THEN {m}" for idx, m in enumerate(WALLET_MULTIPLIERS))}
+            ELSE {DEFAULT_WALLET_MULTIPLIER}
+        END AS multiplier
+    FROM ranked
+)
+"""
+
+async def close_session():
+    """End the active session and pay every bankroll into the wallets.
+
+    Ranks bankrolls with a window function, applies the wallet-transfer
+    multipliers in a single upsert into wallet, clears the bankrolls and
+    commits once. Returns (session_id, rows) where each row is
+    (rank, user_id, balance, from_wallet, multiplier, bonus, discord_id, username)
+    in rank order, or None if there is no active session.
+    """
+    try:
+        async with db.transaction() as tx:
+            session_id = await session_state.get(tx)
+            if session_id is None:
+                return None
+
+            await tx.execute("UPDATE sessions SET is_active = 0 WHERE id = ?", (session_id,))
+            # Updated while holding the write lock so no wager can slip into
+            # the closed session
+            session_state.set_active(None)
+
+            rows = await tx.fetchall(
+                SESSION_SETTLEMENT_CTE + """
+                SELECT
+                    s.rank, s.user_id, s.balance, s.from_wallet, s.multiplier,
+                    CASE WHEN s.from_wallet THEN CAST(s.balance * s.multiplier AS INTEGER) ELSE s.balance END,
+                    u.discord_id, u.username
+                FROM settled s
+                LEFT JOIN users u ON u.id = s.user_id
+                ORDER BY s.rank
+                """,
+                (session_id,)
+            )
+
+            # Broke users get nothing
+            credited = await tx.fetchall(
+                SESSION_SETTLEMENT_CTE + """
+                INSERT INTO wallet (user_id, balance)
+                SELECT
+                    user_id,
+                    CASE WHEN from_wallet THEN CAST(balance * multiplier AS INTEGER) ELSE balance END
+                FROM settled
+                WHERE balance > 0
+                ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance
+                RETURNING user_id, balance
+                """,
+                (session_id,)
+            )
+
+            await tx.execute("DELETE FROM bankroll WHERE session_id = ?", (session_id,))
+            # Every bankroll is gone and many wallets changed
+            balance_cache.clear()
+            leaderboards.session_closed()
+            for user_id, new_balance in credited:
+                leaderboards.record(user_id, wallet=new_balance)
+    except BaseException:
+        session_state.invalidate()
+        forget_balances()
+        raise
+
+    return session_id, rows
+
 class DBManager:
     """Database manager that maintains a single connection for the bot's lifetime."""
-    
-    def __init__(self, db_file):
+
+    SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+    def __init__(self, db_file, cache_size=-20000, mmap_size=268435456,
+                 synchronous="NORMAL", statement_cache_size=256, busy_timeout=5000,
+                 group_commit=False, group_commit_window_ms=5, group_commit_max_batch=64,
+                 profiler=None):
+        synchronous = str(synchronous).upper()
+        if synchronous not in self.SYNCHRONOUS_MODES:
+            raise ValueError(f"Unsupported synchronous mode: {synchronous}")
+
         self.db_file = db_file
+        self.cache_size = int(cache_size)
+        self.mmap_size = int(mmap_size)
+        self.synchronous = synchronous
+        self.statement_cache_size = int(statement_cache_size)
+        self.busy_timeout = int(busy_timeout)
         self.connection = None
-    
+        # One connection is shared by every coroutine, so statements must not
+        # interleave with somebody else's open transaction
+        self._lock = asyncio.Lock()
+
+        # Group commit: concurrent writes share one transaction that is
+        # committed every window_ms or once max_batch writes are queued
+        self.group_commit = bool(group_commit)
+        self.group_commit_window = int(group_commit_window_ms) / 1000
+        self.group_commit_max_batch = max(1, int(group_commit_max_batch))
+        self._batch_open = False
+        self._batch_waiters = []
+        self._flush_task = None
+
+        # Optional QueryProfiler fed by every statement run through the manager
+        self.profiler = profiler
+        # Transactions committed, including single autocommitted writes
+        self.commits = 0
+
     async def init(self):
-        """Initialize the database connection."""
-        self.connection = await aiosqlite.connect(self.db_file)
+        """Open the connection and apply WAL journaling and the cache pragmas."""
+        # Autocommit mode: single statements commit on their own and
+        # multi-statement work is wrapped explicitly with transaction()
+        self.connection = await aiosqlite.connect(
+            self.db_file,
+            isolation_level=None,
+            cached_statements=self.statement_cache_size
+        )
+        await self.connection.execute("PRAGMA journal_mode = WAL")
+        await self.connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        await self.connection.execute(f"PRAGMA cache_size = {self.cache_size}")
+        await self.connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        await self.connection.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
         return self
-    
+
     async def execute(self, query, params=()):
-        """Execute a query and commit the changes."""
-        await self.connection.execute(query, params)
-        await self.connection.commit()
-    
+        """Execute a single statement in its own transaction."""
+        if self.group_commit:
+            async with self.transaction() as tx:
+                await tx.execute(query, params)
+            return
+        async with self._lock:
+            await run_statement(self.connection, self.profiler, query, params)
+            self.commits += 1
+
     async def fetchone(self, query, params=()):
         """Execute a query and fetch one result."""
-        async with self.connection.execute(query, params) as cursor:
-            return await cursor.fetchone()
-    
+        async with self._lock:
+            await self._commit_batch()
+            return await run_statement(self.connection, self.profiler, query, params, "one")
+
     async def fetchall(self, query, params=()):
         """Execute a query and fetch all results."""
-        async with self.connection.execute(query, params) as cursor:
-            return await cursor.fetchall()
-    
+        async with self._lock:
+            await self._commit_batch()
+            return await run_statement(self.connection, self.profiler, query, params, "all")
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Run a block of statements in one BEGIN IMMEDIATE transaction.
+
+        The write lock is taken up front and everything inside the block is
+        committed once on exit, or rolled back if the block raises:
+
+            async with db.transaction() as tx:
+                row = await tx.fetchone(...)
+                await tx.execute(...)
+
+        In group-commit mode the block becomes a savepoint inside the shared
+        batch transaction, and exiting the block waits for the batch commit.
+        Statements inside the block see the batch's other uncommitted units,
+        which is safe: if the batch rolls back, this unit rolls back with it.
+        Reads outside a transaction (fetchone/fetchall) commit the open batch
+        first, so they never act on writes that could still be rolled back.
+        """
+        if self.group_commit:
+            async with self._grouped_transaction() as tx:
+                yield tx
+            return
+
+        async with self._lock:
+            await self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield Transaction(self.connection, self.profiler)
+                await self.connection.commit()
+                self.commits += 1
+            except BaseException:
+                await self.connection.rollback()
+                raise
+
+    @contextlib.asynccontextmanager
+    async def _grouped_transaction(self):
+        """One unit of work inside the current group-commit batch.
+
+        The unit runs under a SAVEPOINT so a failing unit is rolled back on
+        its own without aborting the rest of the batch. Callers only get
+        control back once the batch containing their unit has committed, so
+        an acknowledged write is always durable.
+        """
+        async with self._lock:
+            if not self._batch_open:
+                await self.connection.execute("BEGIN IMMEDIATE")
+                self._batch_open = True
+                self._flush_task = asyncio.create_task(self._flush_after_window())
+
+            await self.connection.execute("SAVEPOINT grouped_unit")
+            try:
+                yield Transaction(self.connection, self.profiler)
+            except BaseException:
+                await self.connection.execute("ROLLBACK TO grouped_unit")
+                await self.connection.execute("RELEASE grouped_unit")
+                raise
+            await self.connection.execute("RELEASE grouped_unit")
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._batch_waiters.append(waiter)
+            if len(self._batch_waiters) >= self.group_commit_max_batch:
+                await self._commit_batch()
+
+        await waiter
+
+    async def _flush_after_window(self):
+        """Commit the open batch once the group-commit window has elapsed."""
+        await asyncio.sleep(self.group_commit_window)
+        async with self._lock:
+            await self._commit_batch()
+
+    async def _commit_batch(self):
+        """Commit the open batch and wake its waiters. Caller holds the lock."""
+        if not self._batch_open:
+            return
+
+        waiters = self._batch_waiters
+        self._batch_open = False
+        self._batch_waiters = []
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+
+        try:
+            await self.connection.commit()
+            self.commits += 1
+        except Exception as e:
+            with contextlib.suppress(Exception):
+                await self.connection.rollback()
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
     async def close(self):
-        """Close the database connection."""
+        """Commit any pending group-commit batch and close the database connection."""
         if self.connection:
+            async with self._lock:
+                await self._commit_batch()
             await self.connection.close()
             self.connection = None
 
+async def run_statement(connection, profiler, query, params=(), fetch=None):
+    """Run one statement, returning its rows ("one"/"all") or rowcount (fetch=None).
+
+    With a profiler the statement is timed, including fetching its rows, and
+    statements over the slow threshold are logged with their query plan.
+    """
+    if profiler is None:
+        async with connection.execute(query, params) as cursor:
+            if fetch == "one":
+                return await cursor.fetchone()
+            if fetch == "all":
+                return await cursor.fetchall()
+            return cursor.rowcount
+
+    started = time.perf_counter()
+    async with connection.execute(query, params) as cursor:
+        if fetch == "one":
+            result = await cursor.fetchone()
+        elif fetch == "all":
+            result = await cursor.fetchall()
+        else:
+            result = cursor.rowcount
+    elapsed = time.perf_counter() - started
+
+    if profiler.record(query, elapsed):
+        await log_slow_query(connection, query, params, elapsed)
+    return result
+
+async def log_slow_query(connection, query, params, elapsed):
+    """Log a slow statement with its EXPLAIN QUERY PLAN. The caller holds the connection."""
+    try:
+        async with connection.execute(f"EXPLAIN QUERY PLAN {query}", params) as cursor:
+            plan = "\n".join(f"  {row[3]}" for row in await cursor.fetchall()) or "  (no plan steps)"
+    except Exception as e:
+        plan = f"  (no plan: {e})"
+    log.warning(
+        "[🐢] Slow query (%.1f ms): %s\n%s", elapsed * 1000, " ".join(query.split()), plan,
+        extra=log_fields(duration_ms=elapsed * 1000)
+    )
+
+class Transaction:
+    """Statement interface handed out by DBManager.transaction().
+
+    Calls run on the connection that already holds the transaction, so they
+    must only be used inside the ``async with`` block.
+    """
+
+    def __init__(self, connection, profiler=None):
+        self.connection = connection
+        self.profiler = profiler
+
+    async def execute(self, query, params=()):
+        """Execute a statement and return the number of rows it changed."""
+        return await run_statement(self.connection, self.profiler, query, params)
+
+    async def fetchone(self, query, params=()):
+        """Execute a query (or a write with RETURNING) and fetch one result."""
+        return await run_statement(self.connection, self.profiler, query, params, "one")
+
+    async def fetchall(self, query, params=()):
+        """Execute a query (or a write with RETURNING) and fetch all results."""
+        return await run_statement(self.connection, self.profiler, query, params, "all")
+
+# SQL profiling is opt-in; see /dbstats
+query_profiler = (
+    QueryProfiler(slow_ms=os.getenv("DB_SLOW_QUERY_MS", 50))
+    if os.getenv("DB_PROFILE", "0").lower() in ("1", "true", "yes")
+    else None
+)
+
+async def init_db_manager():
+    """Create the shared DBManager from the environment and migrate the schema (once per process)."""
+    global db
+    if db is None:
+        db = await DBManager(
+            DB_FILE,
+            cache_size=os.getenv("DB_CACHE_SIZE", -20000),
+            mmap_size=os.getenv("DB_MMAP_SIZE", 268435456),
+            synchronous=os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+            statement_cache_size=os.getenv("DB_STATEMENT_CACHE_SIZE", 256),
+            group_commit=os.getenv("DB_GROUP_COMMIT", "0").lower() in ("1", "true", "yes"),
+            group_commit_window_ms=os.getenv("DB_GROUP_COMMIT_WINDOW_MS", 5),
+            group_commit_max_batch=os.getenv("DB_GROUP_COMMIT_MAX_BATCH", 64),
+            profiler=query_profiler,
+        ).init()
+        log.info("[💾] Database connection opened (%s, WAL)", DB_FILE)
+        await run_migrations(db.connection)
+    return db
+
+async def close_db_manager():
+    """Shutdown hook: close the shared connection if it is open."""
+    global db
+    if db is not None:
+        await db.close()
+        db = None
+        log.info("[💾] Database connection closed")
+
+def bet_custom_id(action, bet_id, *parts):
+    """Encode a bet component action as "wagerbot:<action>:<bet_id>[:<part>...]".
+
+    The custom_id carries everything needed to handle a click, so bet
+    messages never need a stored view, and they keep working across
+    restarts. See route_bet_component().
+    """
+    return ":".join(["wagerbot", action, str(bet_id), *map(str, parts)])
+
+def parse_bet_custom_id(custom_id):
+    """Decode a custom_id from bet_custom_id() into (action, bet_id, parts), or None."""
+    pieces = (custom_id or "").split(":")
+    if len(pieces) < 3 or pieces[0] != "wagerbot":
+        return None
+    try:
+        return pieces[1], int(pieces[2]), [int(part) for part in pieces[3:]]
+    except ValueError:
+        return None
+
 class WagerButton(Button):
-    def __init__(self, label: str, option_label: str, bet_id: int, use_wallet: bool = False):
-        super().__init__(label=label, style=nextcord.ButtonStyle.primary)
-        self.option_label = option_label
-        self.bet_id = bet_id
-        self.use_wallet = use_wallet
+    """Wager on one option of a bet. Clicks are handled by handle_wager_click()."""
 
-    async def callback(self, interaction: nextcord.Interaction):
-        # 🔥 Debugging prints
-        print(f"[WAGER BUTTON DEBUG] {interaction.user.display_name} pressed button - Option: {self.option_label}, Bet ID: {self.bet_id}")
-        
-        # Check if this is a fun bet (wallet-only)
-        bet_details = await db_fetchone(
-            "SELECT bet_type FROM bet WHERE id = ?", 
-            (self.bet_id,)
+    def __init__(self, label: str, bet_id: int, option_id: int, use_wallet: bool = False):
+        super().__init__(
+            label=label,
+            style=nextcord.ButtonStyle.primary,
+            custom_id=bet_custom_id("wager", bet_id, option_id, int(use_wallet))
         )
-        is_fun_bet = bet_details and bet_details[0] == "funbet"
-        
-        # If it's a fun bet, force wallet usage
-        if is_fun_bet:
-            self.use_wallet = True
-        
-        # Open the modal for wagering
-        modal = WagerModal(self.option_label, self.bet_id, self.use_wallet, is_fun_bet)
-        await interaction.response.send_modal(modal)
+
+async def handle_wager_click(interaction: nextcord.Interaction, bet_id, option_id, use_wallet=0):
+    log.debug("Wager button pressed - option %s", option_id, extra=log_fields(interaction, bet_id=bet_id))
+
+    # Locked, cancelled and resolved bets are no longer in the index
+    bet = (await open_bets.ensure_loaded()).get(bet_id)
+    if bet is None:
+        await interaction.response.send_message("⚠️ This bet is no longer accepting wagers.", ephemeral=True)
+        return
+    option_label = next((label for opt_id, label, _ in bet.options if opt_id == option_id), None)
+    if option_label is None:
+        await interaction.response.send_message("⚠️ That option does not exist for this bet.", ephemeral=True)
+        return
+
+    # Check if this is a fun bet (wallet-only)
+    is_fun_bet = bet.bet_type == "funbet"
+
+    # Open the modal for wagering (fun bets force wallet usage)
+    modal = WagerModal(option_label, bet_id, bool(use_wallet) or is_fun_bet, is_fun_bet, option_id=option_id)
+    await interaction.response.send_modal(modal)
+
+def potential_payout_note(bet_id, option_id, amount):
+    """The "pays N credits" line for a wager confirmation, or "" if the bet isn't indexed."""
+    # Multipliers and pool totals are cached with the open bet, so this needs no query
+    bet = open_bets.get(bet_id)
+    multiplier = bet.multiplier(option_id) if bet else None
+    if multiplier is None:
+        return ""
+    if bet.is_pool:
+        return f"\nWould pay **{payout(amount, multiplier)}** credits at the current pool odds ({float(multiplier):.2f}x)."
+    return f"\nPays **{payout(amount, multiplier)}** credits if it wins."
+
+LIVE_TOTALS_FIELD = "📊 Live Totals"
+
+def set_live_totals(embed, bet):
+    """Add or refresh the field showing a bet's per-option totals on its embed. Returns the embed."""
+    lines = []
+    for idx, (option_id, label, _) in enumerate(bet.options):
+        line = (
+            f"{EMOJI_MAP[idx]} {label}: **{bet.pool_totals.get(option_id, 0)}** credits · "
+            f"{bet.pool_wagers.get(option_id, 0)} wager(s)"
+        )
+        multiplier = bet.multiplier(option_id) if bet.is_pool else None
+        if multiplier is not None:
+            line += f" · pays {float(multiplier):.2f}x"
+        lines.append(line)
+    lines.append(f"**Total: {bet.pool_total} credits from {sum(bet.pool_wagers.values())} wager(s)**")
+    value = "\n".join(lines)[:1024]
+
+    for idx, field in enumerate(embed.fields):
+        if field.name == LIVE_TOTALS_FIELD:
+            embed.set_field_at(idx, name=LIVE_TOTALS_FIELD, value=value, inline=False)
+            return embed
+    embed.add_field(name=LIVE_TOTALS_FIELD, value=value, inline=False)
+    return embed
+
+async def post_bet_message(interaction: nextcord.Interaction, bet, embed, view):
+    """Send a new bet's message and remember where it is so wagers can update its totals."""
+    await interaction.response.send_message(embed=set_live_totals(embed, bet), view=view)
+    try:
+        message = await interaction.original_message()
+    except nextcord.DiscordException as e:
+        log.warning("[⚠️] Could not look up the message of bet %s, its totals won't update: %s", bet.bet_id, e)
+        return
+
+    bet.embed = embed
+    if interaction.channel is not None:
+        bet.message = interaction.channel.get_partial_message(message.id)
+    bet.message_ids = (str(interaction.channel_id), str(message.id))
+    await db_execute(
+        "UPDATE bet SET channel_id = ?, message_id = ? WHERE id = ?",
+        (*bet.message_ids, bet.bet_id)
+    )
+    # Catch up on wagers placed before the ids were known
+    if bet.pool_total:
+        bet_totals_changed(bet.bet_id)
+
+def bet_totals_changed(bet_id):
+    """Queue a debounced edit of an open bet's message after a wager changed its totals."""
+    bet = open_bets.get(bet_id)
+    if bet is None or bet.message_ids is None:
+        return
+    bet_message_updater.mark(bet_id, functools.partial(update_bet_message, bet))
+
+async def update_bet_message(bet):
+    """Edit a bet's message to show its current totals. Run by bet_message_updater."""
+    if bet.message is None:
+        channel_id, message_id = bet.message_ids
+        bet.message = bot.get_partial_messageable(int(channel_id)).get_partial_message(int(message_id))
+    if bet.embed is None:
+        # Bets loaded after a restart fetch their embed once, then keep it
+        message = await bet.message.fetch()
+        if not message.embeds:
+            return
+        bet.embed = message.embeds[0]
+    await bet.message.edit(embed=set_live_totals(bet.embed, bet))
 
 class WagerModal(Modal):
-    def __init__(self, option_label, bet_id, use_wallet=False, is_fun_bet=False):
+    def __init__(self, option_label, bet_id, use_wallet=False, is_fun_bet=False, option_id=None):
         title = f"Wager on '{option_label}'"
         if use_wallet:
             title = f"💰 Wallet Wager on '{option_label}'"
         if is_fun_bet:
             title = f"🎯 Fun Bet: Wager on '{option_label}'"
             
-        super().__init__(title=title)
+        # Unsubmitted modals are dropped from the view store after the timeout
+        super().__init__(title=title, timeout=600)
         self.option_label = option_label
+        self.option_id = option_id
         self.bet_id = bet_id
         self.use_wallet = use_wallet
         self.is_fun_bet = is_fun_bet
@@ -286,6 +1737,7 @@ class WagerModal(Modal):
         )
         self.add_item(self.amount)
 
+    @command_metrics.instrument("modal:wager")
     async def callback(self, interaction: nextcord.Interaction):
         try:
             amount = int(self.amount.value)
@@ -297,131 +1749,38 @@ class WagerModal(Modal):
 
         # 🔥 Always resolve internal user ID safely
         user_id = await ensure_user_exists(interaction.user)
-        print(f"[WAGER DEBUG] User: {interaction.user.display_name} (ID: {interaction.user.id}), Internal User ID: {user_id}")
-
-        # Get session info if applicable
-        session_id = None
-        if not self.is_fun_bet:
-            # 🔥 Find active session
-            session_row = await db_fetchone(
-                "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
+        # 🔥 Checks, debit and wager insert all happen in one transaction
+        started = time.perf_counter()
+        try:
+            _, balance_source = await place_wager(
+                user_id,
+                self.bet_id,
+                amount,
+                use_wallet=self.use_wallet or self.is_fun_bet,
+                option_id=self.option_id,
+                option_label=self.option_label
             )
-            if not session_row:
-                print("[WAGER DEBUG] No active session found")
-                if not self.use_wallet:  # Only block non-wallet bets
-                    await interaction.response.send_message("⚠️ No active session.", ephemeral=True)
-                    return
-            else:
-                session_id = session_row[0]
-                print(f"[WAGER DEBUG] Active Session ID: {session_id}")
-
-        # 🔥 Check bet exists and is not resolved
-        bet_row = await db_fetchone(
-            "SELECT is_resolved FROM bet WHERE id = ?", (self.bet_id,)
-        )
-        if not bet_row:
-            print(f"[WAGER DEBUG] Bet {self.bet_id} not found")
-            await interaction.response.send_message("⚠️ Bet not found.", ephemeral=True)
+        except WagerError as e:
+            log.debug("Wager rejected: %s", e, extra=log_fields(interaction, bet_id=self.bet_id))
+            await interaction.response.send_message(str(e), ephemeral=True)
             return
-        if bet_row[0]:  # Already resolved
-            print(f"[WAGER DEBUG] Bet {self.bet_id} already resolved")
-            await interaction.response.send_message("⚠️ This bet is already resolved.", ephemeral=True)
+        except Exception as e:
+            log.exception("Error during wager", extra=log_fields(interaction, bet_id=self.bet_id))
+            await interaction.response.send_message("An unexpected error occurred while placing your wager.", ephemeral=True)
             return
-
-        # 🔥 Find the option ID for this bet
-        option_row = await db_fetchone(
-            "SELECT id FROM bet_options WHERE prop_id = ? AND label = ?",
-            (self.bet_id, self.option_label)
+        log.debug(
+            "Wager of %s placed from %s", amount, balance_source,
+            extra=log_fields(interaction, bet_id=self.bet_id, duration_ms=(time.perf_counter() - started) * 1000)
         )
-        if not option_row:
-            print(f"[WAGER DEBUG] Option {self.option_label} not found for bet {self.bet_id}")
-            await interaction.response.send_message("⚠️ That option does not exist for this bet.", ephemeral=True)
-            return
-        option_id = option_row[0]
-        print(f"[WAGER DEBUG] Option ID: {option_id}")
-
-        # 🔥 Check balance
-        try:
-            if self.use_wallet or self.is_fun_bet:
-                # Use wallet balance
-                wallet_row = await db_fetchone(
-                    "SELECT balance FROM wallet WHERE user_id = ?", 
-                    (user_id,)
-                )
-                if not wallet_row:
-                    print(f"[WAGER DEBUG] Creating wallet for {interaction.user.display_name}")
-                    await db_execute(
-                        "INSERT INTO wallet (user_id, balance) VALUES (?, ?)", 
-                        (user_id, 1000)
-                    )
-                    balance = 1000
-                else:
-                    balance = wallet_row[0]
-                balance_source = "wallet"
-                print(f"[WAGER DEBUG] Wallet Balance for {interaction.user.display_name}: {balance}")
-            else:
-                # Ensure bankroll entry exists for this session
-                bankroll_row = await db_fetchone(
-                    "SELECT balance FROM bankroll WHERE user_id = ? AND session_id = ?", 
-                    (user_id, session_id)
-                )
-                if not bankroll_row:
-                    # Create a new bankroll entry with default 1000 if it doesn't exist
-                    print(f"[WAGER DEBUG] Creating bankroll for {interaction.user.display_name} in session {session_id}")
-                    await db_execute(
-                        "INSERT INTO bankroll (user_id, session_id, balance) VALUES (?, ?, ?)", 
-                        (user_id, session_id, 1000)
-                    )
-                    balance = 1000
-                else:
-                    balance = bankroll_row[0]
-                balance_source = "bankroll"
-                print(f"[WAGER DEBUG] Bankroll Balance for {interaction.user.display_name} in session {session_id}: {balance}")
-
-            if amount > balance:
-                print(f"[WAGER DEBUG] Insufficient {balance_source} balance for {interaction.user.display_name}. Have {balance}, tried to wager {amount}")
-                await interaction.response.send_message(
-                    f"⚠️ Insufficient {balance_source} balance. You have {balance}.", 
-                    ephemeral=True
-                )
-                return
-
-            # 🔥 Deduct amount
-            if self.use_wallet or self.is_fun_bet:
-                await db_execute(
-                    "UPDATE wallet SET balance = balance - ? WHERE user_id = ?",
-                    (amount, user_id)
-                )
-                print(f"[WAGER DEBUG] Deducted {amount} from wallet for {interaction.user.display_name}")
-            else:
-                await db_execute(
-                    "UPDATE bankroll SET balance = balance - ? WHERE user_id = ? AND session_id = ?",
-                    (amount, user_id, session_id)
-                )
-                print(f"[WAGER DEBUG] Deducted {amount} from bankroll for {interaction.user.display_name} in session {session_id}")
-
-            # 🔥 Insert the wager
-            await db_execute(
-                """
-                INSERT INTO wagers 
-                (user_id, session_id, prop_id, prop_option_id, amount, odds, result, payout, from_wallet)
-                VALUES (?, ?, ?, ?, ?, 100, 'pending', 0, ?)
-                """,
-                (user_id, session_id, self.bet_id, option_id, amount, int(self.use_wallet or self.is_fun_bet))
-            )
-            print(f"[WAGER DEBUG] Wager inserted for {interaction.user.display_name}")
 
-            # Create a response message based on bet type
-            if self.is_fun_bet:
-                message = f"🎯 Successfully placed a fun bet of {amount} credits from your **wallet** on '{self.option_label}'."
-            else:
-                message = f"🎯 Successfully wagered {amount} credits from your **{balance_source}** on '{self.option_label}'."
-                
-            await interaction.response.send_message(message, ephemeral=True)
+        # Create a response message based on bet type
+        if self.is_fun_bet:
+            message = f"🎯 Successfully placed a fun bet of {amount} credits from your **wallet** on '{self.option_label}'."
+        else:
+            message = f"🎯 Successfully wagered {amount} credits from your **{balance_source}** on '{self.option_label}'."
+        message += potential_payout_note(self.bet_id, self.option_id, amount)
 
-        except Exception as e:
-            print(f"[WAGER DEBUG] Error during wager for {interaction.user.display_name}: {e}")
-            await interaction.response.send_message("An unexpected error occurred while placing your wager.", ephemeral=True)
+        await interaction.response.send_message(message, ephemeral=True)
 
 class WalletTransferModal(Modal):
     def __init__(self, session_id, parent_view, user):
@@ -437,38 +1796,26 @@ class WalletTransferModal(Modal):
         )
         self.add_item(self.transfer_amount)
 
+    @command_metrics.instrument("modal:wallet_transfer")
     async def callback(self, interaction: nextcord.Interaction):
         try:
             # Validate transfer amount
             transfer_amount = int(self.transfer_amount.value)
             
-            # Get user's wallet balance
+            if transfer_amount <= 0:
+                raise ValueError
+
+            # Debit the wallet and credit the bankroll atomically
             user_id = await ensure_user_exists(interaction.user)
-            wallet_row = await db_fetchone(
-                "SELECT balance FROM wallet WHERE user_id = ?", 
-                (user_id,)
-            )
-            
-            if not wallet_row or wallet_row[0] < transfer_amount:
+            balances = await transfer_wallet_to_session(user_id, self.session_id, transfer_amount)
+
+            if balances is None:
                 await interaction.response.send_message(
                     "⚠️ Insufficient wallet balance.", 
                     ephemeral=True
                 )
                 return
             
-            # Deduct from wallet
-            await db_execute(
-                "UPDATE wallet SET balance = balance - ? WHERE user_id = ?",
-                (transfer_amount, user_id)
-            )
-            
-            # Add to session bankroll with wallet flag
-            await db_execute(
-                "INSERT INTO bankroll (user_id, session_id, balance, from_wallet) VALUES (?, ?, ?, 1) "
-                "ON CONFLICT(user_id, session_id) DO UPDATE SET balance = balance + ?, from_wallet = 1",
-                (user_id, self.session_id, transfer_amount, transfer_amount)
-            )
-            
             # Register this user with the parent view
             self.parent_view.register_wallet_transfer(interaction.user)
             
@@ -489,7 +1836,7 @@ class WalletTransferModal(Modal):
                 ephemeral=True
             )
         except Exception as e:
-            print(f"Wallet transfer error: {e}")
+            log.exception("Wallet transfer error", extra=log_fields(interaction))
             await interaction.response.send_message(
                 "An unexpected error occurred.", 
                 ephemeral=True
@@ -504,6 +1851,7 @@ class WalletTransferButton(Button):
         self.session_id = session_id
         self.parent_view = parent_view
 
+    @command_metrics.instrument("button:wallet_transfer")
     async def callback(self, interaction: nextcord.Interaction):
         # Store the original message for the parent view if not already set
         if not self.parent_view.message:
@@ -530,20 +1878,20 @@ class TransferOrSkipView(View):
         """Register a user who transferred from wallet"""
         if user not in self.wallet_users:
             self.wallet_users.append(user)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [💰] User {user.display_name} registered for wallet transfer")
+            log.info("[💰] User %s registered for wallet transfer", user.display_name)
     
     def register_skip(self, user):
         """Register a user who skipped transfer"""
         if user not in self.skip_users:
             self.skip_users.append(user)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [⏭️] User {user.display_name} registered for skip")
+            log.info("[⏭️] User %s registered for skip", user.display_name)
 
     async def on_timeout(self):
         # This method is called automatically when the view times out after 2 minutes
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [⏱️] AUTO-TIMEOUT: Transfer option timed out after 2 minutes for session ID {self.session_id}")
+        log.info("[⏱️] AUTO-TIMEOUT: Transfer option timed out after 2 minutes for session ID %s", self.session_id)
         
         if not self.message:
-            print("[ERROR] Could not find message to update on timeout")
+            log.error("Could not find message to update on timeout")
             return
             
         try:
@@ -555,11 +1903,11 @@ class TransferOrSkipView(View):
                 # Update the message with disabled buttons first (as a safety measure)
                 await self.message.edit(view=self)
             except Exception as edit_err:
-                print(f"[ERROR] Could not update buttons before deletion: {edit_err}")
+                log.error("Could not update buttons before deletion: %s", edit_err)
             
             # Now delete the original message completely
             await self.message.delete()
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [🗑️] Deleted timed-out transfer options message")
+            log.info("[🗑️] Deleted timed-out transfer options message")
             
             # Create a summary of who chose what
             # First, create lists of user display names
@@ -610,18 +1958,18 @@ class TransferOrSkipView(View):
             
             # Send the summary message
             await self.message.channel.send(embed=embed)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [✅] Successfully sent choice summary to channel for session ID {self.session_id}")
+            log.info("[✅] Successfully sent choice summary to channel for session ID %s", self.session_id)
             
         except Exception as e:
-            print(f"[ERROR] Failed during timeout handling: {e}")
+            log.error("Failed during timeout handling: %s", e)
 
 
 async def on_timeout(self):
     # This method is called automatically when the view times out after 2 minutes
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [⏱️] AUTO-TIMEOUT: Transfer option timed out after 2 minutes for session ID {self.session_id}")
+    log.info("[⏱️] AUTO-TIMEOUT: Transfer option timed out after 2 minutes for session ID %s", self.session_id)
     
     if not self.message:
-        print("[ERROR] Could not find message to update on timeout")
+        log.error("Could not find message to update on timeout")
         return
         
     try:
@@ -633,11 +1981,11 @@ async def on_timeout(self):
             # Update the message with disabled buttons first (as a safety measure)
             await self.message.edit(view=self)
         except Exception as edit_err:
-            print(f"[ERROR] Could not update buttons before deletion: {edit_err}")
+            log.error("Could not update buttons before deletion: %s", edit_err)
         
         # Now delete the original message completely
         await self.message.delete()
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [🗑️] Deleted timed-out transfer options message")
+        log.info("[🗑️] Deleted timed-out transfer options message")
         
         # Create a summary of who chose what
         # First, create lists of user display names
@@ -688,10 +2036,10 @@ async def on_timeout(self):
         
         # Send the summary message
         await self.message.channel.send(embed=embed)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [✅] Successfully sent choice summary to channel for session ID {self.session_id}")
+        log.info("[✅] Successfully sent choice summary to channel for session ID %s", self.session_id)
         
     except Exception as e:
-        print(f"[ERROR] Failed during timeout handling: {e}")
+        log.error("Failed during timeout handling: %s", e)
 
 
 class SkipTransferButton(Button):
@@ -702,6 +2050,7 @@ class SkipTransferButton(Button):
         )
         self.parent_view = parent_view
 
+    @command_metrics.instrument("button:skip_transfer")
     async def callback(self, interaction: nextcord.Interaction):
         # Store the original message for the parent view if not already set
         if not self.parent_view.message:
@@ -741,14 +2090,12 @@ class CreateBetModal(Modal):
         self.add_item(self.bet_question)
         self.add_item(self.bet_options)
 
+    @command_metrics.instrument("modal:create_bet")
     async def callback(self, interaction: nextcord.Interaction):
-        session_row = await db_fetchone(
-            "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
-        )
-        if not session_row:
+        session_id = await get_active_session_id()
+        if session_id is None:
             await interaction.response.send_message("⚠️ No active session.", ephemeral=True)
             return
-        session_id = session_row[0]
 
         options = [opt.strip() for opt in self.bet_options.value.split("\n") if opt.strip()]
         
@@ -759,21 +2106,12 @@ class CreateBetModal(Modal):
             await interaction.response.send_message("⚠️ You can provide at most 8 options.", ephemeral=True)
             return
 
-        # Insert the bet
-        await db_execute(
-            "INSERT INTO bet (session_id, name, description, bet_type, is_resolved) VALUES (?, ?, ?, ?, 0)",
-            (session_id, self.bet_question.value, "User created bet", "moneyline")
+        # Insert the bet and its options
+        bet = await create_bet(
+            session_id, interaction.guild_id, self.bet_question.value, "User created pool bet", "pool",
+            [(label, Fraction(1), None) for label in options], pool_rake_bp=POOL_RAKE_BP
         )
 
-        bet_row = await db_fetchone("SELECT id FROM bet WHERE name = ? ORDER BY id DESC LIMIT 1", (self.bet_question.value,))
-        bet_id = bet_row[0]
-
-        for label in options:
-            await db_execute(
-                "INSERT INTO bet_options (prop_id, label, odds) VALUES (?, ?, 100)",
-                (bet_id, label)
-            )
-
         description = f"**{self.bet_question.value}**\n"
         for idx, label in enumerate(options):
             description += f"{EMOJI_MAP[idx]} {label}\n"
@@ -783,77 +2121,116 @@ class CreateBetModal(Modal):
             description=description,
             color=nextcord.Color.blue()
         )
+        embed.set_footer(text=f"{pool_rake_note(POOL_RAKE_BP)} Session bankroll only.")
 
-        # Create buttons view - include both bankroll and wallet options
-        view = View(timeout=None)
-
-        # Add bankroll wager buttons
-        for idx, label in enumerate(options):
-            emoji = EMOJI_MAP[idx]
-            view.add_item(WagerButton(label=f"{emoji} {label}", option_label=label, bet_id=bet_id, use_wallet=False))
-
-        # Add a separator (blank) button if needed
-        view.add_item(Button(label="───── Wallet Betting ─────", style=nextcord.ButtonStyle.secondary, disabled=True))
-
-        # Add wallet wager buttons
-        for idx, label in enumerate(options):
-            emoji = EMOJI_MAP[idx]
-            view.add_item(WagerButton(label=f"💰 {emoji} {label}", option_label=label, bet_id=bet_id, use_wallet=True))
-
-        # Add admin control buttons
-        view.add_item(ResolveBetButton(bet_id))
-        view.add_item(LockBetButton(bet_id))
-        view.add_item(CancelBetButton(bet_id))
+        # Create buttons view - bankroll only, so the pool holds one currency
+        view = create_bet_view(bet.bet_id, [(option_id, label) for option_id, label, _ in bet.options], "pool")
 
-        await interaction.response.send_message(embed=embed, view=view)
+        await post_bet_message(interaction, bet, embed, view)
 
 class ResolveBetButton(Button):
+    """Clicks are handled by handle_resolve_click()."""
+
     def __init__(self, bet_id):
-        super().__init__(label="🏁 Resolve Bet", style=nextcord.ButtonStyle.primary)
-        self.bet_id = bet_id
+        super().__init__(label="🏁 Resolve Bet", style=nextcord.ButtonStyle.primary, custom_id=bet_custom_id("resolve", bet_id))
 
-    async def callback(self, interaction: nextcord.Interaction):
-        # Fetch all options for the bet
-        options_rows = await db_fetchall(
-            "SELECT id, label FROM bet_options WHERE prop_id = ?",
-            (self.bet_id,)
-        )
-        if not options_rows:
-            await interaction.response.send_message("⚠️ No options found for this bet.", ephemeral=True)
-            return
+async def handle_resolve_click(interaction: nextcord.Interaction, bet_id):
+    # Fetch all options for the bet (locked bets aren't in the open-bet index)
+    options_rows = await db_fetchall(
+        """
+        SELECT o.id, o.label, COALESCE(o.payout_num, o.odds), o.payout_den, o.pool_total, b.pool_rake_bp
+        FROM bet_options o
+        JOIN bet b ON b.id = o.prop_id
+        WHERE o.prop_id = ?
+        """,
+        (bet_id,)
+    )
+    if not options_rows:
+        await interaction.response.send_message("⚠️ No options found for this bet.", ephemeral=True)
+        return
+    pending = await db_fetchall(
+        "SELECT prop_option_id, amount FROM wagers WHERE prop_id = ? AND result = 'pending'",
+        (bet_id,)
+    )
+    pool_total = sum(row[4] for row in options_rows)
 
-        # Build Select Options
-        select_options = [
-            nextcord.SelectOption(label=label, value=str(option_id))
-            for option_id, label in options_rows
-        ]
+    # Build Select Options, each showing what settling on it would pay out
+    select_options = []
+    for option_id, label, num, den, option_total, rake_bp in options_rows:
+        if rake_bp is None:
+            multiplier = multiplier_from_row(num, den)
+        else:
+            multiplier = pool_multiplier(pool_total, option_total, rake_from_bp(rake_bp))
+        winners = sum(1 for wager_option_id, _ in pending if wager_option_id == option_id)
+        if multiplier is None:
+            description = f"Nobody backed it: refunds {sum(amount for _, amount in pending)} credits"
+        else:
+            payouts = batch_payouts(pending, option_id, multiplier)
+            description = f"Pays {sum(payouts)} credits to {winners} wager(s)"
+        select_options.append(nextcord.SelectOption(
+            label=label,
+            value=str(option_id),
+            description=description
+        ))
 
-        view = ResolveBetView(self.bet_id, select_options)
+    view = ResolveBetView(bet_id, select_options)
 
-        await interaction.response.send_message(
-            "Please select the winning option:",
-            view=view,
-            ephemeral=True
-        )
+    await interaction.response.send_message(
+        "Please select the winning option:",
+        view=view,
+        ephemeral=True
+    )
 
 class LockBetButton(Button):
+    """Clicks are handled by handle_lock_click()."""
+
     def __init__(self, bet_id: int):
-        super().__init__(label="🔒 Lock Bet", style=nextcord.ButtonStyle.success)
-        self.bet_id = bet_id
+        super().__init__(label="🔒 Lock Bet", style=nextcord.ButtonStyle.success, custom_id=bet_custom_id("lock", bet_id))
 
-    async def callback(self, interaction: nextcord.Interaction):
-        await db_execute("UPDATE bet SET is_resolved = 1 WHERE id = ?", (self.bet_id,))
-        await interaction.response.send_message("✅ Bet has been locked (no more wagers).", ephemeral=True)
+async def handle_lock_click(interaction: nextcord.Interaction, bet_id):
+    await db_execute("UPDATE bet SET is_resolved = 1 WHERE id = ?", (bet_id,))
+    open_bets.remove(bet_id)
+    await interaction.response.send_message("✅ Bet has been locked (no more wagers).", ephemeral=True)
 
 class CancelBetButton(Button):
+    """Clicks are handled by handle_cancel_click()."""
+
     def __init__(self, bet_id: int):
-        super().__init__(label="❌ Cancel Bet", style=nextcord.ButtonStyle.danger)
-        self.bet_id = bet_id
+        super().__init__(label="❌ Cancel Bet", style=nextcord.ButtonStyle.danger, custom_id=bet_custom_id("cancel", bet_id))
+
+async def handle_cancel_click(interaction: nextcord.Interaction, bet_id):
+    await db_execute("DELETE FROM bet WHERE id = ?", (bet_id,))
+    await db_execute("DELETE FROM bet_options WHERE prop_id = ?", (bet_id,))
+    open_bets.remove(bet_id)
+    await interaction.response.send_message("❌ Bet cancelled and removed.", ephemeral=True)
+
+BET_COMPONENT_HANDLERS = {
+    "wager": handle_wager_click,
+    "resolve": handle_resolve_click,
+    "lock": handle_lock_click,
+    "cancel": handle_cancel_click,
+}
+
+@bot.listen("on_interaction")
+async def route_bet_component(interaction: nextcord.Interaction):
+    """Handle every bet button click from its custom_id alone."""
+    if interaction.type != nextcord.InteractionType.component:
+        return
+    parsed = parse_bet_custom_id((interaction.data or {}).get("custom_id"))
+    if parsed is None:
+        return
+    action, bet_id, parts = parsed
+    handler = BET_COMPONENT_HANDLERS.get(action)
+    if handler is None:
+        return
 
-    async def callback(self, interaction: nextcord.Interaction):
-        await db_execute("DELETE FROM bet WHERE id = ?", (self.bet_id,))
-        await db_execute("DELETE FROM bet_options WHERE prop_id = ?", (self.bet_id,))
-        await interaction.response.send_message("❌ Bet cancelled and removed.", ephemeral=True)
+    try:
+        async with command_metrics.track(f"button:{action}"):
+            await handler(interaction, bet_id, *parts)
+    except Exception as e:
+        log.exception("Failed to handle '%s' button", action, extra=log_fields(interaction, bet_id=bet_id))
+        if not interaction.response.is_done():
+            await interaction.response.send_message("⚠️ An error occurred while handling that button.", ephemeral=True)
 
 class ResolveBetView(View):
     def __init__(self, bet_id, select_options):
@@ -881,6 +2258,7 @@ class CreateFunBetModal(Modal):
         self.add_item(self.bet_question)
         self.add_item(self.bet_options)
 
+    @command_metrics.instrument("modal:create_funbet")
     async def callback(self, interaction: nextcord.Interaction):
         options = [opt.strip() for opt in self.bet_options.value.split("\n") if opt.strip()]
         
@@ -892,26 +2270,14 @@ class CreateFunBetModal(Modal):
             return
 
         # Get active session (if any)
-        session_row = await db_fetchone(
-            "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
-        )
-        session_id = session_row[0] if session_row else None
+        session_id = await get_active_session_id()
 
-        # Insert the bet
-        await db_execute(
-            "INSERT INTO bet (session_id, name, description, bet_type, is_resolved) VALUES (?, ?, ?, ?, 0)",
-            (session_id, self.bet_question.value, "Fun bet (wallet only)", "funbet")
+        # Insert the bet and its options
+        bet = await create_bet(
+            session_id, interaction.guild_id, self.bet_question.value, "Fun bet (wallet only)", "funbet",
+            [(label, Fraction(1), None) for label in options], pool_rake_bp=POOL_RAKE_BP
         )
 
-        bet_row = await db_fetchone("SELECT id FROM bet WHERE name = ? ORDER BY id DESC LIMIT 1", (self.bet_question.value,))
-        bet_id = bet_row[0]
-
-        for label in options:
-            await db_execute(
-                "INSERT INTO bet_options (prop_id, label, odds) VALUES (?, ?, 100)",
-                (bet_id, label)
-            )
-
         description = f"**💰 WALLET BET: {self.bet_question.value}**\n"
         for idx, label in enumerate(options):
             description += f"{EMOJI_MAP[idx]} {label}\n"
@@ -922,22 +2288,12 @@ class CreateFunBetModal(Modal):
             color=nextcord.Color.gold()
         )
         
-        embed.set_footer(text="This bet uses your wallet balance only (not session bankroll)")
+        embed.set_footer(text=f"This bet uses your wallet balance only (not session bankroll). {pool_rake_note(POOL_RAKE_BP)}")
 
         # Create buttons view for wallet betting
-        view = View(timeout=None)
-
-        # Add wallet wager buttons
-        for idx, label in enumerate(options):
-            emoji = EMOJI_MAP[idx]
-            view.add_item(WagerButton(label=f"💰 {emoji} {label}", option_label=label, bet_id=bet_id, use_wallet=True))
-
-        # Add admin control buttons
-        view.add_item(ResolveBetButton(bet_id))
-        view.add_item(LockBetButton(bet_id))
-        view.add_item(CancelBetButton(bet_id))
+        view = create_bet_view(bet.bet_id, [(option_id, label) for option_id, label, _ in bet.options], "funbet")
 
-        await interaction.response.send_message(embed=embed, view=view)
+        await post_bet_message(interaction, bet, embed, view)
 
 class WinnerSelect(Select):
     def __init__(self, bet_id, options):
@@ -946,34 +2302,24 @@ class WinnerSelect(Select):
         # No need to transform it again
         super().__init__(placeholder="Select the winning option", min_values=1, max_values=1, options=options)
 
+    @command_metrics.instrument("select:winner")
     async def callback(self, interaction: nextcord.Interaction):
         winning_option_id = int(self.values[0])
 
-        # Fetch bet details
-        bet_details = await db_fetchone(
-            "SELECT name, bet_type FROM bet WHERE id = ?", 
-            (self.bet_id,)
-        )
-        bet_name = bet_details[0] if bet_details else "Unnamed Bet"
-        bet_type = bet_details[1] if bet_details else "moneyline"
-        
-        # Check if this is a fun bet (wallet only)
-        is_fun_bet = bet_type == "funbet"
+        # Settlement and notifications can outlast the 3 second response window
+        await interaction.response.defer(ephemeral=True)
 
-        # Fetch winning option label
-        winning_option = await db_fetchone(
-            "SELECT label FROM bet_options WHERE id = ?", 
-            (winning_option_id,)
-        )
-        winning_label = winning_option[0] if winning_option else "Unknown Option"
+        try:
+            await resolve_bet_and_payout(interaction, self.bet_id, winning_option_id)
+        except SettlementError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        except Exception as e:
+            log.exception("Failed to resolve bet", extra=log_fields(interaction, bet_id=self.bet_id))
+            await interaction.followup.send("⚠️ An error occurred while resolving this bet.", ephemeral=True)
+            return
 
-        # Update database: mark winner
-        await db_execute(
-            "UPDATE bet_options SET is_winner = 1 WHERE id = ?", (winning_option_id,)
-        )
-        await db_execute(
-            "UPDATE bet SET is_resolved = 1 WHERE id = ?", (self.bet_id,)
-        )
+        await interaction.followup.send("✅ Bet resolved and payouts sent.", ephemeral=True)
 
 
 class CreateBetWithMoneylineOddsModal(Modal):
@@ -996,57 +2342,27 @@ class CreateBetWithMoneylineOddsModal(Modal):
         self.add_item(self.bet_question)
         self.add_item(self.bet_options)
 
+    @command_metrics.instrument("modal:create_moneyline_bet")
     async def callback(self, interaction: nextcord.Interaction):
-        session_row = await db_fetchone(
-            "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
-        )
-        if not session_row:
+        session_id = await get_active_session_id()
+        if session_id is None:
             await interaction.response.send_message("⚠️ No active session.", ephemeral=True)
             return
-        session_id = session_row[0]
 
-        # Parse options with American odds
+        # Parse "Option|Odds" lines; options without odds get even odds (+100)
         options_with_odds = []
-        for line in self.bet_options.value.split("\n"):
-            if "|" in line.strip():
-                parts = line.strip().split("|", 1)
-                option = parts[0].strip()
-                odds_str = parts[1].strip()
-                
-                # Convert American odds to decimal multiplier
-                try:
-                    # Parse American odds and convert to decimal odds (multiplier)
-                    if odds_str.startswith("+"):
-                        american_odds = int(odds_str[1:])
-                        # For +150, decimal odds = (150/100) + 1 = 2.5
-                        decimal_odds = (american_odds / 100) + 1
-                    elif odds_str.startswith("-"):
-                        american_odds = int(odds_str[1:])
-                        # For -120, decimal odds = (100/120) + 1 = 1.833
-                        decimal_odds = (100 / american_odds) + 1
-                    else:
-                        # Try to parse as a number without sign
-                        try:
-                            american_odds = int(odds_str)
-                            if american_odds > 0:
-                                decimal_odds = (american_odds / 100) + 1
-                            else:
-                                american_odds = abs(american_odds)
-                                decimal_odds = (100 / american_odds) + 1
-                        except ValueError:
-                            # Default to even odds if parsing fails
-                            decimal_odds = 2.0
-                            odds_str = "+100"
-                    
-                    # Store as tuple: (option, american_odds_str, decimal_multiplier)
-                    options_with_odds.append((option, odds_str, decimal_odds))
-                except ValueError:
-                    # If conversion fails, use even odds (+100)
-                    options_with_odds.append((option, "+100", 2.0))
-            elif line.strip():
-                # If no odds specified, use even odds (+100)
-                options_with_odds.append((line.strip(), "+100", 2.0))
-        
+        try:
+            for line in self.bet_options.value.split("\n"):
+                line = line.strip()
+                if not line:
+                    continue
+                label, _, odds_text = line.partition("|")
+                american = parse_american(odds_text) if odds_text.strip() else 100
+                options_with_odds.append((label.strip(), format_american(american), american_to_decimal(american)))
+        except OddsError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+
         if len(options_with_odds) < 2:
             await interaction.response.send_message("⚠️ You must provide at least 2 options.", ephemeral=True)
             return
@@ -1054,23 +2370,15 @@ class CreateBetWithMoneylineOddsModal(Modal):
             await interaction.response.send_message("⚠️ You can provide at most 8 options.", ephemeral=True)
             return
 
-        # Insert the bet
-        await db_execute(
-            "INSERT INTO bet (session_id, name, description, bet_type, is_resolved) VALUES (?, ?, ?, ?, 0)",
-            (session_id, self.bet_question.value, "Bet with American odds", "moneyline")
+        # Each option stores its exact decimal odds as the payout multiplier
+        bet = await create_bet(
+            session_id, interaction.guild_id, self.bet_question.value, "Bet with American odds", "moneyline",
+            [
+                (label, decimal_odds, american_odds_str)
+                for label, american_odds_str, decimal_odds in options_with_odds
+            ]
         )
 
-        bet_row = await db_fetchone("SELECT id FROM bet WHERE name = ? ORDER BY id DESC LIMIT 1", (self.bet_question.value,))
-        bet_id = bet_row[0]
-
-        # Insert options with odds (we store the decimal multiplier in the database)
-        for idx, (label, american_odds_str, decimal_odds) in enumerate(options_with_odds):
-            # Store decimal odds multiplied by 100 (e.g., 2.5 becomes 250)
-            await db_execute(
-                "INSERT INTO bet_options (prop_id, label, odds, american_odds) VALUES (?, ?, ?, ?)",
-                (bet_id, label, int(decimal_odds * 100), american_odds_str)
-            )
-
         # Create description with American odds
         description = f"**{self.bet_question.value}**\n"
         for idx, (label, american_odds_str, decimal_odds) in enumerate(options_with_odds):
@@ -1094,32 +2402,201 @@ class CreateBetWithMoneylineOddsModal(Modal):
         )
 
         # Create buttons view - include both bankroll and wallet options
-        view = View(timeout=None)
+        button_labels = [
+            (option_id, f"{label} ({american_odds_str})")
+            for (option_id, label, _), (_, american_odds_str, _) in zip(bet.options, options_with_odds)
+        ]
+        view = create_bet_view(bet.bet_id, button_labels, "moneyline")
+
+        await post_bet_message(interaction, bet, embed, view)
 
-        # Add bankroll wager buttons
-        for idx, (label, american_odds_str, _) in enumerate(options_with_odds):
-            emoji = EMOJI_MAP[idx]
-            button_label = f"{emoji} {label} ({american_odds_str})"
-            view.add_item(WagerButton(label=button_label, option_label=label, bet_id=bet_id, use_wallet=False))
 
-        # Add a separator (blank) button
-        view.add_item(Button(label="───── Wallet Betting ─────", style=nextcord.ButtonStyle.secondary, disabled=True))
+# Slash commands
 
-        # Add wallet wager buttons
-        for idx, (label, american_odds_str, _) in enumerate(options_with_odds):
-            emoji = EMOJI_MAP[idx]
-            button_label = f"💰 {emoji} {label} ({american_odds_str})"
-            view.add_item(WagerButton(label=button_label, option_label=label, bet_id=bet_id, use_wallet=True))
+LEADERBOARD_PAGE_SIZE = 15
+
+# title, color, footer and empty-board message for each leaderboard type
+LEADERBOARD_STYLES = {
+    "session": (
+        "🏆 Session Bankroll Leaderboard",
+        nextcord.Color.gold(),
+        "Session bankroll shows current session balances only",
+        "No bankroll data found for the current session."
+    ),
+    "wallet": (
+        "💰 Wallet Balance Leaderboard",
+        nextcord.Color.dark_gold(),
+        "Wallet balances persist between sessions",
+        "No wallet data found."
+    ),
+}
+
+def format_leaderboard_line(rank, display_name, balance):
+    # Special formatting for top 3
+    medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(rank)
+    if medal:
+        return f"{medal} **{display_name}** — {balance} credits"
+    return f"{rank}. **{display_name}** — {balance} credits"
+
+async def get_leaderboard_board(board_type):
+    """Return the loaded RankingBoard for a leaderboard type, or None if there's no session."""
+    session_id = await get_active_session_id() if board_type == "session" else None
+    board = leaderboards.board(board_type, session_id)
+    if board is None:
+        return None
+    return await board.ensure_loaded()
+
+class LeaderboardRenderCache:
+    """Bounded LRU of rendered leaderboard pages keyed by (guild id, board type, page).
+
+    An entry is only served while the board it was rendered from is the
+    same object at the same version, so any balance change on that board
+    makes its pages miss. The TTL is a backstop for changes the board
+    doesn't see, like members changing their display names.
+    """
+
+    def __init__(self, max_size=256, ttl=30):
+        self.max_size = max(1, int(max_size))
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key, board):
+        """Return the cached (embed, page, has_prev, has_next) or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        cached_board, version, expires_at, rendered = entry
+        if cached_board is not board or version != board.version or expires_at <= asyncio.get_running_loop().time():
+            del self._entries[key]
+            self.stale += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return rendered
+
+    def put(self, key, board, version, rendered):
+        """Cache a page rendered from the board as it was at `version`."""
+        expires_at = asyncio.get_running_loop().time() + self.ttl
+        self._entries[key] = (board, version, expires_at, rendered)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def metrics(self):
+        """Cache counters for diagnostics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+leaderboard_render_cache = LeaderboardRenderCache(
+    os.getenv("LEADERBOARD_CACHE_SIZE", 256),
+    os.getenv("LEADERBOARD_CACHE_TTL", 30)
+)
+
+def clamp_leaderboard_page(board, page):
+    """Return (page, page_count) with page limited to the board's pages."""
+    page_count = max(1, -(-len(board) // LEADERBOARD_PAGE_SIZE))
+    return min(max(page, 0), page_count - 1), page_count
+
+async def render_leaderboard_page(guild, board, board_type, page):
+    """Render one page of a loaded board. Returns (embed, page, has_prev, has_next) or None if empty."""
+    # Snapshot the version before awaiting so a change during the name
+    # lookup leaves the entry already stale
+    version = board.version
+    title, color, footer, _ = LEADERBOARD_STYLES[board_type]
+    page, page_count = clamp_leaderboard_page(board, page)
+    entries = board.page(page * LEADERBOARD_PAGE_SIZE, LEADERBOARD_PAGE_SIZE)
+    if not entries:
+        return None
+
+    # One primary-key lookup for the names on this page
+    user_ids = [user_id for _, user_id, _ in entries]
+    name_rows = await db_fetchall(
+        f"SELECT id, discord_id, username FROM users WHERE id IN ({', '.join('?' * len(user_ids))})",
+        user_ids
+    )
+    names = {user_id: (discord_id, username) for user_id, discord_id, username in name_rows}
 
-        # Add admin control buttons
-        view.add_item(ResolveBetButton(bet_id))
-        view.add_item(LockBetButton(bet_id))
-        view.add_item(CancelBetButton(bet_id))
+    leaderboard_text = []
+    for rank, user_id, balance in entries:
+        discord_id, username = names.get(user_id, (None, None))
+        # Try to get member object for current username
+        try:
+            member = guild.get_member(int(discord_id)) if guild and discord_id else None
+            display_name = member.display_name if member else (username or f"User {user_id}")
+        except (TypeError, ValueError):
+            display_name = username or f"User {user_id}"
+        leaderboard_text.append(format_leaderboard_line(rank, display_name, balance))
 
-        await interaction.response.send_message(embed=embed, view=view)
+    embed = nextcord.Embed(
+        title=title,
+        description="\n".join(leaderboard_text),
+        color=color
+    )
+    embed.set_footer(text=f"{footer} • Page {page + 1}/{page_count}")
+
+    rendered = (embed, page, page > 0, page + 1 < page_count)
+    key = (guild.id if guild else None, board_type, page)
+    leaderboard_render_cache.put(key, board, version, rendered)
+    return rendered
+
+async def build_leaderboard_page(guild, board_type, page):
+    """Build the embed and paging view for one leaderboard page.
+
+    Served from the render cache when the board hasn't changed since the
+    page was last rendered. Returns (embed, view), or (message, None) if
+    there is nothing to show.
+    """
+    board = await get_leaderboard_board(board_type)
+    if board is None:
+        return "⚠️ No active session found.", None
+
+    # Cached pages are keyed by the clamped page, so clamp before looking up
+    page, _ = clamp_leaderboard_page(board, page)
+    rendered = leaderboard_render_cache.get((guild.id if guild else None, board_type, page), board)
+    if rendered is None:
+        rendered = await render_leaderboard_page(guild, board, board_type, page)
+    if rendered is None:
+        return LEADERBOARD_STYLES[board_type][3], None
+
+    embed, page, has_prev, has_next = rendered
+    view = LeaderboardView(board_type, page, has_prev=has_prev, has_next=has_next)
+    return embed, view
+
+class LeaderboardPageButton(Button):
+    def __init__(self, label, step, disabled):
+        super().__init__(label=label, style=nextcord.ButtonStyle.secondary, disabled=disabled)
+        self.step = step
+
+    @command_metrics.instrument("button:leaderboard_page")
+    async def callback(self, interaction: nextcord.Interaction):
+        view = self.view
+        embed, new_view = await build_leaderboard_page(interaction.guild, view.board_type, view.page + self.step)
+        view.stop()
+        if new_view is None:
+            await interaction.response.edit_message(content=embed, embed=None, view=None)
+            return
+        await interaction.response.edit_message(embed=embed, view=new_view)
 
+class LeaderboardView(View):
+    def __init__(self, board_type, page, has_prev, has_next):
+        super().__init__(timeout=300)
+        self.board_type = board_type
+        self.page = page
 
-# Slash commands
+        self.add_item(LeaderboardPageButton("◀ Prev", -1, disabled=not has_prev))
+        self.add_item(LeaderboardPageButton("Next ▶", 1, disabled=not has_next))
 
 @bot.slash_command(name="leaderboard", description="View the current leaderboard of users by balance")
 async def leaderboard(
@@ -1134,115 +2611,24 @@ async def leaderboard(
     await interaction.response.defer(ephemeral=False)
     
     try:
-        if board_type == "session":
-            # Get active session
-            session_row = await db_fetchone(
-                "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
-            )
-            
-            if not session_row:
-                await interaction.followup.send("⚠️ No active session found.")
-                return
-                
-            session_id = session_row[0]
-            
-            # Get top users by bankroll
-            users = await db_fetchall(
-                """
-                SELECT b.user_id, b.balance, u.username, u.discord_id 
-                FROM bankroll b
-                JOIN users u ON b.user_id = u.id
-                WHERE b.session_id = ?
-                ORDER BY b.balance DESC
-                LIMIT 15
-                """,
-                (session_id,)
-            )
-            
-            if not users:
-                await interaction.followup.send("No bankroll data found for the current session.")
-                return
-                
-            # Create the leaderboard embed
-            embed = nextcord.Embed(
-                title="🏆 Session Bankroll Leaderboard",
-                description="Current session balances ranked from highest to lowest",
-                color=nextcord.Color.gold()
-            )
-            
-            leaderboard_text = []
-            for idx, (user_id, balance, username, discord_id) in enumerate(users):
-                # Try to get member object for current username
-                try:
-                    member = interaction.guild.get_member(int(discord_id))
-                    display_name = member.display_name if member else username
-                except:
-                    display_name = username
-                
-                # Special formatting for top 3
-                if idx == 0:
-                    leaderboard_text.append(f"🥇 **{display_name}** — {balance} credits")
-                elif idx == 1:
-                    leaderboard_text.append(f"🥈 **{display_name}** — {balance} credits")
-                elif idx == 2:
-                    leaderboard_text.append(f"🥉 **{display_name}** — {balance} credits")
-                else:
-                    leaderboard_text.append(f"{idx+1}. **{display_name}** — {balance} credits")
-            
-            embed.description = "\n".join(leaderboard_text)
-            embed.set_footer(text="Session bankroll shows current session balances only")
-            
-            await interaction.followup.send(embed=embed)
-            
-        elif board_type == "wallet":
-            # Get top users by wallet balance
-            users = await db_fetchall(
-                """
-                SELECT w.user_id, w.balance, u.username, u.discord_id 
-                FROM wallet w
-                JOIN users u ON w.user_id = u.id
-                ORDER BY w.balance DESC
-                LIMIT 15
-                """,
-            )
-            
-            if not users:
-                await interaction.followup.send("No wallet data found.")
-                return
-                
-            # Create the leaderboard embed
-            embed = nextcord.Embed(
-                title="💰 Wallet Balance Leaderboard",
-                description="Persistent wallet balances ranked from highest to lowest",
-                color=nextcord.Color.dark_gold()
-            )
-            
-            leaderboard_text = []
-            for idx, (user_id, balance, username, discord_id) in enumerate(users):
-                # Try to get member object for current username
-                try:
-                    member = interaction.guild.get_member(int(discord_id))
-                    display_name = member.display_name if member else username
-                except:
-                    display_name = username
-                
-                # Special formatting for top 3
-                if idx == 0:
-                    leaderboard_text.append(f"🥇 **{display_name}** — {balance} credits")
-                elif idx == 1:
-                    leaderboard_text.append(f"🥈 **{display_name}** — {balance} credits")
-                elif idx == 2:
-                    leaderboard_text.append(f"🥉 **{display_name}** — {balance} credits")
-                else:
-                    leaderboard_text.append(f"{idx+1}. **{display_name}** — {balance} credits")
-            
-            embed.description = "\n".join(leaderboard_text)
-            embed.set_footer(text="Wallet balances persist between sessions")
-            
-            await interaction.followup.send(embed=embed)
+        embed, view = await build_leaderboard_page(interaction.guild, board_type, 0)
+        if view is None:
+            await interaction.followup.send(embed)
+            return
+
+        # Where the caller stands, from the same in-memory ranking
+        user_id = await ensure_user_exists(interaction.user)
+        board = await get_leaderboard_board(board_type)
+        rank = board.rank(user_id)
+        if rank is not None:
+            content = f"📍 Your rank: **#{rank}** of {len(board)} with {board.balance(user_id)} credits"
+        else:
+            content = "📍 You're not on this leaderboard yet."
+
+        await interaction.followup.send(content=content, embed=embed, view=view)
     
     except Exception as e:
-        print(f"[ERROR] Error in leaderboard command: {e}")
+        log.exception("Error in leaderboard command", extra=log_fields(interaction))
         await interaction.followup.send(f"⚠️ An error occurred: {str(e)}")
 
 @bot.slash_command(name="moneylinebet", description="Create a bet with moneyline odds (+/-)")
@@ -1256,18 +2642,18 @@ async def force_sync(interaction: nextcord.Interaction):
         # Acknowledge the interaction immediately to prevent timeout
         await interaction.response.defer(ephemeral=True)
         
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [🔄] Starting command sync requested by {interaction.user.display_name}...")
+        log.info("[🔄] Starting command sync requested by %s...", interaction.user.display_name)
         
         # Try syncing commands
         try:
             await bot.sync_application_commands()
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [✅] Commands synced successfully!")
+            log.info("[✅] Commands synced successfully!")
             
             # Get list of registered commands
             cmds = bot.get_application_commands()
             cmd_list = ", ".join([f"/{cmd.name}" for cmd in cmds])
             
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [📋] Registered commands: {cmd_list}")
+            log.info("[📋] Registered commands: %s", cmd_list)
             
             # Respond with success
             await interaction.followup.send(
@@ -1277,14 +2663,14 @@ async def force_sync(interaction: nextcord.Interaction):
             
         except Exception as e:
             error_msg = f"Error syncing commands: {str(e)}"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [❌] {error_msg}")
+            log.error("[❌] %s", error_msg)
             await interaction.followup.send(f"⚠️ {error_msg}", ephemeral=True)
     
     except nextcord.errors.NotFound as e:
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [❌] Interaction timed out: {str(e)}")
-        print("Commands may still have been synced. Check with Discord.")
+        log.error("[❌] Interaction timed out: %s", e)
+        log.info("Commands may still have been synced. Check with Discord.")
     except Exception as e:
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [❌] Unexpected error in force_sync: {str(e)}")
+        log.error("[❌] Unexpected error in force_sync: %s", e)
 
 
 @bot.slash_command(name="balance", description="Check your Wallet and Bankroll balances")
@@ -1294,33 +2680,12 @@ async def balance(interaction: nextcord.Interaction):
 
     session_id = await get_active_session_id()
 
-    # 🔵 Persistent (wallet) balance
-    persistent_balance_row = await db_fetchone(
-        "SELECT balance FROM wallet WHERE user_id = ?", 
-        (user_id,)
-    )
-    persistent_balance = persistent_balance_row[0] if persistent_balance_row else 1000
-
-    # 🔵 Session (bankroll) balance
-    session_balance_row = await db_fetchone(
-        "SELECT balance FROM bankroll WHERE user_id = ? AND session_id = ?", 
-        (user_id, session_id)
-    )
-    session_balance = session_balance_row[0] if session_balance_row else 1000
-
-    # 🔵 Amount currently wagered from wallet
-    persistent_wagered_row = await db_fetchone(
-        "SELECT SUM(amount) FROM wagers WHERE user_id = ? AND session_id IS NULL AND result = 'pending'", 
-        (user_id,)
-    )
-    persistent_wagered = persistent_wagered_row[0] if persistent_wagered_row and persistent_wagered_row[0] else 0
-
-    # 🔵 Amount currently wagered from  bankroll
-    session_wagered_row = await db_fetchone(
-        "SELECT SUM(amount) FROM wagers WHERE user_id = ? AND session_id = ? AND result = 'pending'", 
-        (user_id, session_id)
-    )
-    session_wagered = session_wagered_row[0] if session_wagered_row and session_wagered_row[0] else 0
+    # 🔵 Wallet and bankroll, available and wagered, from the cached snapshot
+    snapshot = await balance_cache.get(user_id, session_id)
+    persistent_balance = snapshot.wallet if snapshot.wallet is not None else 1000
+    session_balance = snapshot.bankroll if snapshot.bankroll is not None else 1000
+    persistent_wagered = snapshot.wallet_at_risk
+    session_wagered = snapshot.bankroll_at_risk
 
     # 🎨 Create the embed
     embed = nextcord.Embed(
@@ -1340,50 +2705,106 @@ async def balance(interaction: nextcord.Interaction):
 
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
-@bot.slash_command(name="mywagers", description="View your current active wagers")
-async def mywagers(interaction: nextcord.Interaction):
-    # 🔥 Get internal database user ID safely
-    user_id = await ensure_user_exists(interaction.user)
-
-    # 🔥 Fetch active wagers
-    wagers = await db_fetchall(
-        "SELECT prop_id, prop_option_id, amount FROM wagers WHERE user_id = ? AND result = 'pending'",
-        (user_id,)
+MYWAGERS_PAGE_SIZE = 10
+
+async def fetch_pending_wagers_page(user_id, after_id=None, before_id=None, page_size=MYWAGERS_PAGE_SIZE):
+    """Fetch one page of a user's pending wagers with bet and option names.
+
+    Keyset pagination on wager id: pass after_id for the next page or
+    before_id for the previous one. Returns (rows, has_prev, has_next)
+    with rows in ascending id order as (id, bet_name, option_label, amount, from_wallet).
+    """
+    query = """
+        SELECT w.id, b.name, o.label, w.amount, w.from_wallet
+        FROM wagers w
+        LEFT JOIN bet b ON b.id = w.prop_id
+        LEFT JOIN bet_options o ON o.id = w.prop_option_id
+        WHERE w.user_id = ? AND w.result = 'pending' AND w.id {op} ?
+        ORDER BY w.id {order}
+        LIMIT ?
+    """
+    # Fetch one extra row to learn whether another page exists
+    if before_id is not None:
+        rows = await db_fetchall(query.format(op="<", order="DESC"), (user_id, before_id, page_size + 1))
+        has_prev = len(rows) > page_size
+        rows = list(reversed(rows[:page_size]))
+        return rows, has_prev, True
+
+    rows = await db_fetchall(
+        query.format(op=">", order="ASC"),
+        (user_id, after_id if after_id is not None else 0, page_size + 1)
     )
+    return rows[:page_size], after_id is not None, len(rows) > page_size
 
-    if not wagers:
-        await interaction.response.send_message("You have no active wagers.", ephemeral=True)
-        return
+async def build_mywagers_page(user_id, display_name, after_id=None, before_id=None):
+    """Build the /mywagers embed and paging view, or (None, None) if there is nothing to show."""
+    rows, has_prev, has_next = await fetch_pending_wagers_page(user_id, after_id, before_id)
+    if not rows:
+        return None, None
 
     description = ""
-
-    # 🔥 For each wager, fetch bet and option labels
-    for bet_id, option_id, amount in wagers:
-        bet_row = await db_fetchone(
-            "SELECT name FROM bet WHERE id = ?",
-            (bet_id,)
-        )
-        option_row = await db_fetchone(
-            "SELECT label FROM bet_options WHERE id = ?",
-            (option_id,)
-        )
-
-        bet_name = bet_row[0] if bet_row else "Unknown Bet"
-        option_label = option_row[0] if option_row else "Unknown Option"
-
+    for _, bet_name, option_label, amount, from_wallet in rows:
+        source = "💰 wallet" if from_wallet else "bankroll"
         description += (
-            f"🎯 **{bet_name}**\n"
-            f"➔ Option: **{option_label}**\n"
-            f"➔ Amount Wagered: `{amount}` credits\n\n"
+            f"🎯 **{bet_name or 'Unknown Bet'}**\n"
+            f"➔ Option: **{option_label or 'Unknown Option'}**\n"
+            f"➔ Amount Wagered: `{amount}` credits ({source})\n\n"
         )
 
     embed = nextcord.Embed(
-        title=f"🎲 {interaction.user.display_name}'s Active Wagers",
+        title=f"🎲 {display_name}'s Active Wagers",
         description=description,
         color=nextcord.Color.blurple()
     )
+    embed.set_footer(text=f"Showing {len(rows)} wagers • Use the buttons to page through the rest")
 
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    view = MyWagersView(user_id, display_name, rows[0][0], rows[-1][0], has_prev, has_next)
+    return embed, view
+
+class WagerPageButton(Button):
+    def __init__(self, label, direction, disabled):
+        super().__init__(label=label, style=nextcord.ButtonStyle.secondary, disabled=disabled)
+        self.direction = direction
+
+    @command_metrics.instrument("button:mywagers_page")
+    async def callback(self, interaction: nextcord.Interaction):
+        view = self.view
+        if self.direction == "next":
+            embed, new_view = await build_mywagers_page(view.user_id, view.display_name, after_id=view.last_id)
+        else:
+            embed, new_view = await build_mywagers_page(view.user_id, view.display_name, before_id=view.first_id)
+
+        view.stop()
+        if embed is None:
+            await interaction.response.edit_message(content="You have no more active wagers.", embed=None, view=None)
+            return
+        await interaction.response.edit_message(embed=embed, view=new_view)
+
+class MyWagersView(View):
+    def __init__(self, user_id, display_name, first_id, last_id, has_prev, has_next):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.display_name = display_name
+        # Keyset cursors: the first and last wager ids on this page
+        self.first_id = first_id
+        self.last_id = last_id
+
+        self.add_item(WagerPageButton("◀ Prev", "prev", disabled=not has_prev))
+        self.add_item(WagerPageButton("Next ▶", "next", disabled=not has_next))
+
+@bot.slash_command(name="mywagers", description="View your current active wagers")
+async def mywagers(interaction: nextcord.Interaction):
+    # 🔥 Get internal database user ID safely
+    user_id = await ensure_user_exists(interaction.user)
+
+    # 🔥 First page of active wagers, one joined query
+    embed, view = await build_mywagers_page(user_id, interaction.user.display_name)
+
+    if embed is None:
+        await interaction.response.send_message("You have no active wagers.", ephemeral=True)
+        return
+
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 
 @bot.slash_command(name="createbet", description="Start creating a new bet")
@@ -1396,33 +2817,17 @@ async def funbet(interaction: nextcord.Interaction):
 
 @bot.slash_command(name="startsession", description="Start a new betting session")
 async def startsession(interaction: nextcord.Interaction):
-    # Check if an active session already exists
-    existing_session = await db_fetchone(
-        "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
-    )
-    print(f"[DEBUG] Existing active session: {existing_session}")
+    # Start the session unless one already exists
+    session_id, created = await open_session()
 
-    if existing_session:
+    if not created:
         await interaction.response.send_message(
-            f"⚠️ An active session (ID {existing_session[0]}) already exists. You must end it first with `/stopsession`.",
+            f"⚠️ An active session (ID {session_id}) already exists. You must end it first with `/stopsession`.",
             ephemeral=True
         )
         return
 
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    await db_execute(
-        "INSERT INTO sessions (name, description, created_at, is_active) VALUES (?, ?, ?, ?)",
-        (f"Session {now}", "New session started.", now, 1)
-    )
-    
-    # Fetch the newly created session ID
-    session_row = await db_fetchone(
-        "SELECT id FROM sessions WHERE name = ? ORDER BY id DESC LIMIT 1",
-        (f"Session {now}",)
-    )
-    session_id = session_row[0]
-
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [🟢] Started a new session.")
+    log.info("[🟢] Started a new session.")
 
     # Create a detailed embed with multiplier info
     embed = nextcord.Embed(
@@ -1465,102 +2870,53 @@ async def startsession(interaction: nextcord.Interaction):
         # Get the original message
         original_message = await interaction.original_message()
         view.message = original_message
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [✅] Successfully stored message reference for timeout handling")
+        log.info("[✅] Successfully stored message reference for timeout handling")
     except Exception as e:
-        print(f"[ERROR] Could not get original message: {e}")
+        log.error("Could not get original message: %s", e)
         # We'll rely on the buttons to set the message reference when they're clicked
 
 @bot.slash_command(name="stopsession", description="End the current betting session")
 async def stopsession(interaction: nextcord.Interaction):
-    print(f"[DEBUG] stopsession command invoked by {interaction.user.display_name}")
+    log.debug("stopsession command invoked", extra=log_fields(interaction))
     
     # Immediately acknowledge
     await interaction.response.defer(ephemeral=False)
     
     try:
-        session_row = await db_fetchone(
-            "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
-        )
-        if not session_row:
+        # Close the session and move every bankroll into wallets (one commit)
+        closed = await close_session()
+        if not closed:
             await interaction.followup.send("⚠️ No active session to end.")
             return
 
-        session_id = session_row[0]
-        print(f"[DEBUG] Found active session ID: {session_id}")
-
-        # End the session
-        await db_execute("UPDATE sessions SET is_active = 0 WHERE id = ?", (session_id,))
-        print(f"[DEBUG] Session {session_id} marked as inactive")
-
-        # Get user balances
-        users = await db_fetchall(
-            "SELECT user_id, balance, from_wallet FROM bankroll WHERE session_id = ? ORDER BY balance DESC",
-            (session_id,)
-        )
-        print(f"[DEBUG] Found {len(users)} users with bankrolls")
+        session_id, settled = closed
+        log.debug("Session %s closed, settled %s bankrolls", session_id, len(settled))
 
         payouts = []
-        if users:
-            # Multipliers only for wallet transfers
-            wallet_multipliers = [2.5, 2.2, 2.0, 1.8]  # Wallet transfer top 1-4
-            default_wallet_multiplier = 1.6
-
-            for idx, (user_id, balance, from_wallet) in enumerate(users):
-                if balance <= 0:
-                    continue  # Skip broke users
+        for rank, user_id, balance, from_wallet, multiplier, bonus, discord_id, username in settled:
+            if balance <= 0:
+                continue  # Skip broke users
 
-                # Apply multiplier only for wallet users
-                if from_wallet:
-                    multiplier = wallet_multipliers[idx] if idx < len(wallet_multipliers) else default_wallet_multiplier
-                    bonus = int(balance * multiplier)
-                else:
-                    # Regular users just get their balance
-                    multiplier = 1.0
-                    bonus = balance
-
-                # Update wallet
-                wallet_row = await db_fetchone("SELECT balance FROM wallet WHERE user_id = ?", (user_id,))
-                if wallet_row:
-                    await db_execute("UPDATE wallet SET balance = balance + ? WHERE user_id = ?", (bonus, user_id))
-                else:
-                    await db_execute("INSERT INTO wallet (user_id, balance) VALUES (?, ?)", (user_id, bonus))
-
-                # Get username - first try from Discord, then from database
-                username = None
-                try:
-                    # Get the Discord user ID from our database
-                    discord_id_row = await db_fetchone("SELECT discord_id FROM users WHERE id = ?", (user_id,))
-                    if discord_id_row and discord_id_row[0]:
-                        # Use the Discord ID to get the member object
-                        member = interaction.guild.get_member(int(discord_id_row[0]))
-                        if member:
-                            username = member.display_name
-                            print(f"[DEBUG] Found Discord user {username} for user_id {user_id}")
-                except Exception as e:
-                    print(f"[ERROR] Error getting Discord username: {e}")
-                
-                # If Discord lookup failed, fall back to database
-                if not username:
-                    try:
-                        username_row = await db_fetchone("SELECT username FROM users WHERE id = ?", (user_id,))
-                        username = username_row[0] if username_row else f"User {user_id}"
-                        print(f"[DEBUG] Using database username {username} for user_id {user_id}")
-                    except Exception as e:
-                        print(f"[ERROR] Error getting database username: {e}")
-                        username = f"User {user_id}"
-                
-                # Indicate if bonus was from wallet transfer
-                if from_wallet:
-                    wallet_indicator = "💎 "
-                    multiplier_text = f"(x{multiplier})"
-                else:
-                    wallet_indicator = ""
-                    multiplier_text = ""
-                    
-                payouts.append(f"{wallet_indicator}**{idx+1}. {username}** ➔ {balance} bankroll ➔ 🪙 {bonus} added to wallet {multiplier_text}")
+            # Prefer the current Discord display name, then the stored username
+            display_name = None
+            try:
+                member = interaction.guild.get_member(int(discord_id)) if discord_id else None
+                if member:
+                    display_name = member.display_name
+            except Exception as e:
+                log.error("Error getting Discord username: %s", e)
+            if not display_name:
+                display_name = username or f"User {user_id}"
+
+            # Indicate if bonus was from wallet transfer
+            if from_wallet:
+                wallet_indicator = "💎 "
+                multiplier_text = f"(x{multiplier})"
+            else:
+                wallet_indicator = ""
+                multiplier_text = ""
 
-        # Clear bankrolls after rewards
-        await db_execute("DELETE FROM bankroll WHERE session_id = ?", (session_id,))
+            payouts.append(f"{wallet_indicator}**{rank}. {display_name}** ➔ {balance} bankroll ➔ 🪙 {bonus} added to wallet {multiplier_text}")
 
         # 🔥 Session Summary Stats
         total_wagers = await db_fetchone(
@@ -1577,7 +2933,7 @@ async def stopsession(interaction: nextcord.Interaction):
                 u.id as user_id,
                 u.username, 
                 SUM(w.amount) as total_wagered,
-                SUM(CASE WHEN w.result = 'win' THEN w.payout - w.amount ELSE -w.amount END) as net_result
+                SUM(w.payout - w.amount) as net_result
             FROM wagers w
             JOIN users u ON w.user_id = u.id
             WHERE w.session_id = ? AND w.from_wallet = 0
@@ -1588,42 +2944,36 @@ async def stopsession(interaction: nextcord.Interaction):
             (session_id,)
         )
 
-        # 🔥 Biggest Single Bet Win and Loss
-        biggest_win = await db_fetchone(
-            """
-            SELECT 
-                u.username, 
-                w.payout - w.amount as win_amount,
-                b.name as bet_name,
-                bo.label as option_label
-            FROM wagers w
-            JOIN users u ON w.user_id = u.id
-            JOIN bet b ON w.prop_id = b.id
-            JOIN bet_options bo ON w.prop_option_id = bo.id
-            WHERE w.session_id = ? AND w.result = 'win'
-            ORDER BY win_amount DESC
-            LIMIT 1
-            """,
-            (session_id,)
-        )
-
-        biggest_loss = await db_fetchone(
+        # 🔥 Biggest Single Bet Win and Loss (one round-trip for both)
+        extremes = await db_fetchall(
             """
-            SELECT 
-                u.username, 
-                w.amount as loss_amount,
-                b.name as bet_name,
-                bo.label as option_label
-            FROM wagers w
-            JOIN users u ON w.user_id = u.id
-            JOIN bet b ON w.prop_id = b.id
-            JOIN bet_options bo ON w.prop_option_id = bo.id
-            WHERE w.session_id = ? AND w.result = 'lose'
-            ORDER BY loss_amount DESC
-            LIMIT 1
+            SELECT * FROM (
+                SELECT 'win', u.username, w.payout - w.amount, b.name, bo.label
+                FROM wagers w
+                JOIN users u ON w.user_id = u.id
+                JOIN bet b ON w.prop_id = b.id
+                JOIN bet_options bo ON w.prop_option_id = bo.id
+                WHERE w.session_id = ? AND w.result = 'win'
+                ORDER BY w.payout - w.amount DESC
+                LIMIT 1
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'lose', u.username, w.amount, b.name, bo.label
+                FROM wagers w
+                JOIN users u ON w.user_id = u.id
+                JOIN bet b ON w.prop_id = b.id
+                JOIN bet_options bo ON w.prop_option_id = bo.id
+                WHERE w.session_id = ? AND w.result = 'lose'
+                ORDER BY w.amount DESC
+                LIMIT 1
+            )
             """,
-            (session_id,)
+            (session_id, session_id)
         )
+        biggest = {row[0]: row[1:] for row in extremes}
+        biggest_win = biggest.get('win')
+        biggest_loss = biggest.get('lose')
 
         # 🎨 First embed: Rewards
         rewards_embed = nextcord.Embed(
@@ -1667,133 +3017,252 @@ async def stopsession(interaction: nextcord.Interaction):
         await interaction.followup.send(embed=stats_embed)
         
     except Exception as e:
-        print(f"[ERROR] Error in stopsession command: {e}")
+        log.exception("Error in stopsession command", extra=log_fields(interaction))
         await interaction.followup.send(f"⚠️ An error occurred: {str(e)}")
 
-@bot.slash_command(name="wager", description="Place a wager on an active bet")
-async def wager(
+@bot.slash_command(name="dmdigest", description="Get one combined DM of your bet results instead of one per bet")
+async def dmdigest(
     interaction: nextcord.Interaction,
-    bet_id: int,
-    option_id: int,
-    amount: int,
-    use_wallet: bool = False
+    enabled: bool = nextcord.SlashOption(description="Turn digest mode on or off", required=True)
 ):
-    # 🔥 Debugging: Print input parameters
-    print(f"[WAGER DEBUG] User: {interaction.user.id}, Bet ID: {bet_id}, Option ID: {option_id}, Amount: {amount}, Use Wallet: {use_wallet}")
-
-    # 🔥 Always resolve internal user ID safely
     user_id = await ensure_user_exists(interaction.user)
-    print(f"[WAGER DEBUG] Internal User ID: {user_id}")
+    await db_execute("UPDATE users SET dm_digest = ? WHERE id = ?", (int(enabled), user_id))
 
-    # 🔥 Find active session
-    session_row = await db_fetchone(
-        "SELECT id FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
-    )
-    if not session_row:
-        print("[WAGER DEBUG] No active session found")
-        await interaction.response.send_message("⚠️ No active session.", ephemeral=True)
-        return
-    session_id = session_row[0]
-    print(f"[WAGER DEBUG] Active Session ID: {session_id}")
+    if enabled:
+        minutes = notification_digest.window / 60
+        await interaction.response.send_message(
+            f"📬 Digest mode is **on**. Results that land within {minutes:g} minute(s) of each other "
+            f"will arrive as one DM with your net total.",
+            ephemeral=True
+        )
+    else:
+        await interaction.response.send_message("📬 Digest mode is **off**. You'll get one DM per bet.", ephemeral=True)
+
+# Gauges exported next to the handler metrics
+command_metrics.add_collector("session_state", session_state.metrics)
+command_metrics.add_collector("user_cache", user_cache.metrics)
+command_metrics.add_collector("balance_cache", balance_cache.metrics)
+command_metrics.add_collector("leaderboard_cache", leaderboard_render_cache.metrics)
+command_metrics.add_collector("open_bets", lambda: {"count": len(open_bets)})
+command_metrics.add_collector("dm_queue", notification_queue.metrics)
+command_metrics.add_collector("dm_digest", notification_digest.metrics)
+command_metrics.add_collector("bet_embeds", bet_message_updater.metrics)
+if query_profiler is not None:
+    command_metrics.add_collector("db", query_profiler.metrics)
+
+BOTSTATS_MAX_HANDLERS = 15
+
+@bot.slash_command(
+    name="botstats",
+    description="Show interaction latency and error counts (admin only)",
+    default_member_permissions=nextcord.Permissions(administrator=True)
+)
+@application_checks.has_permissions(administrator=True)
+async def botstats(interaction: nextcord.Interaction):
+    snapshot = command_metrics.snapshot()
+    # Busiest handlers first
+    busiest = sorted(snapshot.items(), key=lambda item: item[1]["calls"], reverse=True)[:BOTSTATS_MAX_HANDLERS]
+
+    lines = []
+    for name, stats in busiest:
+        lines.append(
+            f"`{name}` — {stats['calls']} calls · p50 {stats['p50_ms']}ms · p95 {stats['p95_ms']}ms · "
+            f"p99 {stats['p99_ms']}ms · {stats['errors']} errors · {stats['in_flight']} running"
+        )
 
-    # 🔥 Check bet exists and is not resolved
-    bet_row = await db_fetchone(
-        "SELECT is_resolved FROM bet WHERE id = ?", (bet_id,)
+    embed = nextcord.Embed(
+        title="📈 Bot Stats",
+        description="\n".join(lines) if lines else "No interactions handled yet.",
+        color=nextcord.Color.blurple()
     )
-    if not bet_row:
-        print(f"[WAGER DEBUG] Bet {bet_id} not found")
-        await interaction.response.send_message("⚠️ Bet not found.", ephemeral=True)
-        return
-    if bet_row[0]:  # Already resolved
-        print(f"[WAGER DEBUG] Bet {bet_id} already resolved")
-        await interaction.response.send_message("⚠️ This bet is already resolved.", ephemeral=True)
-        return
 
-    # 🔥 Check option exists
-    option_row = await db_fetchone(
-        "SELECT id FROM bet_options WHERE id = ? AND prop_id = ?",
-        (option_id, bet_id)
+    dm = notification_queue.metrics()
+    embed.add_field(
+        name="DM Queue",
+        value=(
+            f"Depth: {dm['depth']} · In flight: {dm['in_flight']}\n"
+            f"Sent: {dm['sent']} ({dm['sent_per_second']}/s) · Retried: {dm['retried']}\n"
+            f"Failed: {dm['failed']} · Dropped: {dm['dropped']} · Coalesced: {dm['coalesced']}"
+        ),
+        inline=False
     )
-    if not option_row:
-        print(f"[WAGER DEBUG] Option {option_id} does not exist for bet {bet_id}")
-        await interaction.response.send_message("⚠️ That option does not exist for this bet.", ephemeral=True)
-        return
-
-    # 🔥 Check balance
-    if use_wallet:
-        # Ensure wallet entry exists
-        wallet_row = await db_fetchone(
-            "SELECT balance FROM wallet WHERE user_id = ?", 
-            (user_id,)
-        )
-        if not wallet_row:
-            print(f"[WAGER DEBUG] Creating wallet for user {user_id}")
-            await db_execute(
-                "INSERT INTO wallet (user_id, balance) VALUES (?, ?)", 
-                (user_id, 1000)
-            )
-            balance = 1000
-        else:
-            balance = wallet_row[0]
-        balance_source = "wallet"
-        print(f"[WAGER DEBUG] Wallet Balance for user {user_id}: {balance}")
-    else:
-        # Ensure bankroll entry exists for this session
-        bankroll_row = await db_fetchone(
-            "SELECT balance FROM bankroll WHERE user_id = ? AND session_id = ?", 
-            (user_id, session_id)
+    live = bet_message_updater.metrics()
+    embed.add_field(
+        name="Live Bet Messages",
+        value=(
+            f"Wagers: {live['marked']} · Edits: {live['edits']} · Coalesced: {live['coalesced']}\n"
+            f"Pending: {live['pending']} · Failed: {live['failed']}"
+        ),
+        inline=False
+    )
+    if trace_recorder is not None:
+        embed.add_field(
+            name="Interaction Trace",
+            value=f"{trace_recorder.metrics()['recorded']} interactions recorded to `{trace_recorder.path}`",
+            inline=False
         )
-        if not bankroll_row:
-            # Create a new bankroll entry with default 1000 if it doesn't exist
-            print(f"[WAGER DEBUG] Creating bankroll for user {user_id} in session {session_id}")
-            await db_execute(
-                "INSERT INTO bankroll (user_id, session_id, balance) VALUES (?, ?, ?)", 
-                (user_id, session_id, 1000)
-            )
-            balance = 1000
-        else:
-            balance = bankroll_row[0]
-        balance_source = "bankroll"
-        print(f"[WAGER DEBUG] Bankroll Balance for user {user_id} in session {session_id}: {balance}")
+    embed.add_field(
+        name="Cache Hit Rates",
+        value=(
+            f"Users: {user_cache.metrics()['hit_rate']:.0%} · "
+            f"Balances: {balance_cache.metrics()['hit_rate']:.0%} · "
+            f"Leaderboards: {leaderboard_render_cache.metrics()['hit_rate']:.0%}"
+        ),
+        inline=False
+    )
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    if amount > balance:
-        print(f"[WAGER DEBUG] Insufficient {balance_source} balance. Have {balance}, tried to wager {amount}")
+DBSTATS_STATEMENT_CHARS = 160
+# Discord rejects embeds whose text adds up to more than this
+EMBED_MAX_CHARS = 6000
+
+@bot.slash_command(
+    name="dbstats",
+    description="Show the most expensive SQL statements (admin only)",
+    default_member_permissions=nextcord.Permissions(administrator=True)
+)
+@application_checks.has_permissions(administrator=True)
+async def dbstats(
+    interaction: nextcord.Interaction,
+    sort: str = nextcord.SlashOption(
+        description="Rank statements by",
+        choices={"Total time": "total", "Call count": "count", "p95 latency": "p95", "Mean latency": "mean"},
+        required=False,
+        default="total"
+    ),
+    limit: int = nextcord.SlashOption(description="How many statements to show", required=False, default=10, min_value=1, max_value=25),
+    reset: bool = nextcord.SlashOption(description="Clear the counters after showing them", required=False, default=False)
+):
+    if query_profiler is None:
         await interaction.response.send_message(
-            f"⚠️ Insufficient {balance_source} balance. You have {balance}.", 
+            "⚠️ SQL profiling is off. Set `DB_PROFILE=1` and restart the bot to enable it.",
             ephemeral=True
         )
         return
 
-    # 🔥 Deduct amount
-    if use_wallet:
-        await db_execute(
-            "UPDATE wallet SET balance = balance - ? WHERE user_id = ?",
-            (amount, user_id)
-        )
-        print(f"[WAGER DEBUG] Deducted {amount} from wallet for user {user_id}")
-    else:
-        await db_execute(
-            "UPDATE bankroll SET balance = balance - ? WHERE user_id = ? AND session_id = ?",
-            (amount, user_id, session_id)
+    rows = query_profiler.top(limit, sort)
+    totals = query_profiler.metrics()
+    embed = nextcord.Embed(
+        title="🗄️ Top SQL Statements",
+        description=(
+            f"{totals['queries']} queries across {totals['statements']} statements, "
+            f"{totals['slow_queries']} over {query_profiler.slow_seconds * 1000:g} ms"
+        ),
+        color=nextcord.Color.blurple()
+    )
+    for idx, row in enumerate(rows, start=1):
+        statement = row["statement"]
+        if len(statement) > DBSTATS_STATEMENT_CHARS:
+            statement = statement[:DBSTATS_STATEMENT_CHARS - 1] + "…"
+        name = (
+            f"{idx}. {row['count']} calls · {row['total_ms']} ms total · "
+            f"mean {row['mean_ms']} ms · p95 {row['p95_ms']} ms · {row['slow']} slow"
         )
-        print(f"[WAGER DEBUG] Deducted {amount} from bankroll for user {user_id} in session {session_id}")
+        value = f"```sql\n{statement}\n```"
+        # Leave room for the footer below
+        if len(embed) + len(name) + len(value) > EMBED_MAX_CHARS - 100:
+            embed.set_footer(text=f"{len(rows) - idx + 1} more statement(s) didn't fit in one message")
+            break
+        embed.add_field(name=name, value=value, inline=False)
+
+    if reset:
+        query_profiler.reset()
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    # 🔥 Insert the wager
-    await db_execute(
-        """
-        INSERT INTO wagers 
-        (user_id, session_id, prop_id, prop_option_id, amount, odds, result, payout, from_wallet)
-        VALUES (?, ?, ?, ?, ?, 100, 'pending', 0, ?)
-        """,
-        (user_id, session_id, bet_id, option_id, amount, int(use_wallet))
+def parse_id(value):
+    """Parse an id typed into a string option, or None if it isn't a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@bot.slash_command(name="wager", description="Place a wager on an active bet")
+async def wager(
+    interaction: nextcord.Interaction,
+    bet_id: str = nextcord.SlashOption(
+        name="bet_id",
+        description="The bet to wager on (start typing its name)",
+        required=True,
+        autocomplete=True
+    ),
+    option_id: str = nextcord.SlashOption(
+        name="option_id",
+        description="The option to back (start typing its label)",
+        required=True,
+        autocomplete=True
+    ),
+    amount: int = nextcord.SlashOption(description="How many credits to wager", required=True),
+    use_wallet: bool = nextcord.SlashOption(description="Wager from your wallet instead of your bankroll", required=False, default=False)
+):
+    # 🔥 Debugging: Print input parameters
+    log.debug(
+        "/wager option %s, amount %s, use_wallet %s", option_id, amount, use_wallet,
+        extra=log_fields(interaction, bet_id=bet_id)
+    )
+
+    if amount <= 0:
+        await interaction.response.send_message("Invalid amount. Please enter a positive number.", ephemeral=True)
+        return
+
+    # Autocomplete fills in ids, but the fields also accept a typed number
+    bet_id = parse_id(bet_id)
+    option_id = parse_id(option_id)
+    if bet_id is None or option_id is None:
+        await interaction.response.send_message("⚠️ Pick a bet and an option from the suggestions.", ephemeral=True)
+        return
+
+    # 🔥 Always resolve internal user ID safely
+    user_id = await ensure_user_exists(interaction.user)
+
+    # 🔥 Checks, debit and wager insert all happen in one transaction
+    started = time.perf_counter()
+    try:
+        _, balance_source = await place_wager(
+            user_id,
+            bet_id,
+            amount,
+            use_wallet=use_wallet,
+            option_id=option_id
+        )
+    except WagerError as e:
+        log.debug("Wager rejected: %s", e, extra=log_fields(interaction, bet_id=bet_id))
+        await interaction.response.send_message(str(e), ephemeral=True)
+        return
+    log.debug(
+        "Wager of %s placed from %s", amount, balance_source,
+        extra=log_fields(interaction, bet_id=bet_id, duration_ms=(time.perf_counter() - started) * 1000)
     )
-    print(f"[WAGER DEBUG] Wager inserted for user {user_id}")
 
     await interaction.response.send_message(
-        f"🎯 Successfully wagered {amount} credits from your **{balance_source}**.",
+        f"🎯 Successfully wagered {amount} credits from your **{balance_source}**."
+        + potential_payout_note(bet_id, option_id, amount),
         ephemeral=True
     )
 
+@wager.on_autocomplete("bet_id")
+async def wager_bet_autocomplete(interaction: nextcord.Interaction, bet_id: str):
+    index = await open_bets.ensure_loaded()
+    session_id = await get_active_session_id()
+    guild_id = str(interaction.guild_id) if interaction.guild_id else None
+    choices = {}
+    for bet in index.search_bets(bet_id, session_id, guild_id):
+        # Discord limits choice names to 100 characters
+        choices[f"#{bet.bet_id} {bet.name}"[:100]] = str(bet.bet_id)
+    await interaction.response.send_autocomplete(choices)
+
+@wager.on_autocomplete("option_id")
+async def wager_option_autocomplete(interaction: nextcord.Interaction, option_id: str, bet_id: str):
+    index = await open_bets.ensure_loaded()
+    bet = index.get(parse_id(bet_id))
+    session_id = await get_active_session_id()
+    guild_id = str(interaction.guild_id) if interaction.guild_id else None
+    choices = {}
+    if bet is not None and index.visible(bet, session_id, guild_id):
+        for opt_id, label in index.search_options(bet.bet_id, option_id):
+            choices[label[:100]] = str(opt_id)
+    await interaction.response.send_autocomplete(choices)
+
 @bot.slash_command(name="debug_commands", description="Check what commands Discord knows about")
 async def debug_commands(interaction: nextcord.Interaction):
     """Debug command to see what commands Discord knows about"""
@@ -1856,51 +3325,34 @@ async def debug_commands(interaction: nextcord.Interaction):
 
 
 def create_bet_view(bet_id, options, bet_type="moneyline"):
-    """Factory function to create consistent bet views for both new and restored bets."""
-    view = View(timeout=None)
+    """Build the buttons for a bet message.
+
+    options is a list of (option_id, button label). Every button is routed
+    by its custom_id, so the view is built only to be sent and is never
+    kept in the bot's view store (prevent_update=False).
+    """
+    view = View(timeout=None, prevent_update=False)
     
     # Add appropriate buttons based on bet type
-    if bet_type == "funbet":
-        # Fun bet (wallet only)
-        for idx, option in enumerate(options):
-            label = option[0] if isinstance(option, tuple) else option
-            emoji = EMOJI_MAP[idx]
-            view.add_item(WagerButton(
-                label=f"💰 {emoji} {label}", 
-                option_label=label, 
-                bet_id=bet_id, 
-                use_wallet=True
-            ))
-    else:
-        # Regular bet (bankroll + wallet)
+    if bet_type != "funbet":
+        # Regular bet (bankroll + wallet); pool bets are bankroll only
         # Add bankroll wager buttons
-        for idx, option in enumerate(options):
-            label = option[0] if isinstance(option, tuple) else option
-            emoji = EMOJI_MAP[idx]
-            view.add_item(WagerButton(
-                label=f"{emoji} {label}", 
-                option_label=label, 
-                bet_id=bet_id, 
-                use_wallet=False
-            ))
+        for idx, (option_id, label) in enumerate(options):
+            view.add_item(WagerButton(f"{EMOJI_MAP[idx]} {label}", bet_id, option_id, use_wallet=False))
 
+    if bet_type == "moneyline":
         # Add a separator button
         view.add_item(Button(
             label="───── Wallet Betting ─────", 
             style=nextcord.ButtonStyle.secondary, 
-            disabled=True
+            disabled=True,
+            custom_id=bet_custom_id("separator", bet_id)
         ))
 
-        # Add wallet wager buttons
-        for idx, option in enumerate(options):
-            label = option[0] if isinstance(option, tuple) else option
-            emoji = EMOJI_MAP[idx]
-            view.add_item(WagerButton(
-                label=f"💰 {emoji} {label}", 
-                option_label=label, 
-                bet_id=bet_id, 
-                use_wallet=True
-            ))
+    # Add wallet wager buttons (fun bets are wallet only)
+    if bet_type != "pool":
+        for idx, (option_id, label) in enumerate(options):
+            view.add_item(WagerButton(f"💰 {EMOJI_MAP[idx]} {label}", bet_id, option_id, use_wallet=True))
 
     # Always add admin control buttons
     view.add_item(ResolveBetButton(bet_id))
@@ -1909,31 +3361,37 @@ def create_bet_view(bet_id, options, bet_type="moneyline"):
     
     return view
 
+open_bets_warmup_task = None
+
+async def warm_open_bets():
+    """Load the open-bet index so the first autocomplete and button click are served from memory.
+
+    Bet buttons are routed by custom_id, so unlike persistent views nothing
+    has to be re-registered per bet after a restart.
+    """
+    started = time.perf_counter()
+    try:
+        index = await open_bets.ensure_loaded()
+    except Exception as e:
+        log.error("[❌] Error loading open bets: %s", e)
+        return
+    log.info("[✅] Loaded %s open bets in %.1f ms", len(index), (time.perf_counter() - started) * 1000)
+
 @bot.event
 async def on_ready():
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{now}] [🔧] Initializing bot...")
-
-    # Initialize database structure
-    async with aiosqlite.connect(DB_FILE) as db:
-        # Users table
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            discord_id TEXT,
-            username TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        # Add your other table creation code here
-        # ...
-        await db.commit()
-    
-    print(f"[{now}] [💾] Database initialization complete")
+    global open_bets_warmup_task
+    log.info("[🔧] Initializing bot...")
+
+    # Load open bets in the background while commands sync. on_ready fires
+    # again after reconnects, but the index only needs loading once.
+    if open_bets_warmup_task is None:
+        open_bets_warmup_task = asyncio.create_task(warm_open_bets())
+
+    # Schema migrations already ran in init_db_manager() before connecting
 
     # Clean up old deprecated commands - with proper Route import
     try:
-        print(f"[{now}] [🧹] Cleaning up deprecated commands...")
+        log.info("[🧹] Cleaning up deprecated commands...")
         
         # Import Route properly
         try:
@@ -1953,74 +3411,38 @@ async def on_ready():
                 if cmd.get('name') in deprecated_names:
                     cmd_id = cmd.get('id')
                     cmd_name = cmd.get('name')
-                    print(f"[{now}] [🗑️] Removing deprecated command: /{cmd_name}")
+                    log.info("[🗑️] Removing deprecated command: /%s", cmd_name)
                     try:
                         await bot.http.request(
                             Route('DELETE', '/applications/{app_id}/commands/{cmd_id}', 
                                   app_id=app_id, cmd_id=cmd_id)
                         )
-                        print(f"[{now}] [✅] Successfully removed /{cmd_name}")
+                        log.info("[✅] Successfully removed /%s", cmd_name)
                     except Exception as del_err:
-                        print(f"[{now}] [❌] Failed to remove /{cmd_name}: {del_err}")
+                        log.error("[❌] Failed to remove /%s: %s", cmd_name, del_err)
         except ImportError:
-            print(f"[{now}] [⚠️] Could not import Route from nextcord.http")
-            print(f"[{now}] [ℹ️] This is not critical, continuing with sync...")
+            log.warning("[⚠️] Could not import Route from nextcord.http")
+            log.info("[ℹ️] This is not critical, continuing with sync...")
         except Exception as fetch_err:
-            print(f"[{now}] [⚠️] Could not fetch commands for cleanup: {str(fetch_err)}")
-            print(f"[{now}] [ℹ️] This is not critical, continuing with sync...")
+            log.warning("[⚠️] Could not fetch commands for cleanup: %s", fetch_err)
+            log.info("[ℹ️] This is not critical, continuing with sync...")
             
     except Exception as e:
-        print(f"[{now}] [❌] Error during command cleanup: {str(e)}")
+        log.error("[❌] Error during command cleanup: %s", e)
 
     # Sync all commands
     try:
-        print(f"[{now}] [🔄] Syncing commands...")
+        log.info("[🔄] Syncing commands...")
         await bot.sync_application_commands()
         
         cmds = bot.get_application_commands()
-        print(f"[{now}] [✅] Synced {len(cmds)} commands: {', '.join(['/' + cmd.name for cmd in cmds])}")
-    except Exception as e:
-        print(f"[{now}] [❌] Error syncing commands: {str(e)}")
-    
-    # RESTORE ACTIVE BET HANDLERS
-    print(f"[{now}] [🔄] Restoring active bet handlers...")
-    
-    try:
-        # Fetch all unresolved bets
-        active_bets = await db_fetchall(
-            "SELECT id, bet_type FROM bet WHERE is_resolved = 0"
-        )
-        print(f"[{now}] [📊] Found {len(active_bets)} unresolved bets")
-        
-        restored_count = 0
-        for bet_id, bet_type in active_bets:
-            try:
-                # Fetch bet options
-                options_data = await db_fetchall(
-                    "SELECT label FROM bet_options WHERE prop_id = ?",
-                    (bet_id,)
-                )
-                
-                # Extract option labels
-                options = [row[0] for row in options_data]
-                
-                # Create and register the view
-                view = create_bet_view(bet_id, options, bet_type)
-                bot.add_view(view)
-                restored_count += 1
-                
-            except Exception as e:
-                print(f"[{now}] [❌] Failed to restore bet ID {bet_id}: {e}")
-                continue
-        
-        print(f"[{now}] [✅] Successfully restored {restored_count}/{len(active_bets)} bet handlers")
-        
+        log.info("[✅] Synced %s commands: %s", len(cmds), ', '.join(['/' + cmd.name for cmd in cmds]))
     except Exception as e:
-        print(f"[{now}] [❌] Error during bet handler restoration: {str(e)}")
-   
+        log.error("[❌] Error syncing commands: %s", e)
     
     # Now print the ready message at the end
-    print(f"[{now}] [🫼] Bot is online and ready!")
+    log.info("[🫼] Bot is online and ready!")
 
 # Run the bot
-bot.run(os.getenv("DISCORD_BOT_TOKEN"))
+if __name__ == "__main__":
+    bot.run(os.getenv("DISCORD_BOT_TOKEN"))